@@ -0,0 +1,224 @@
+"""
+Admission Control
+=================
+
+Bulkheads por modelo: un máximo de ejecuciones simultáneas y una cola de
+espera acotada, para que una ráfaga contra un modelo caro no deje sin
+recursos a los baratos.
+
+- Con hueco libre, la petición entra directamente
+- Sin hueco, espera en una cola FIFO hasta que se libere uno o venza su plazo
+  (cabecera X-Execution-Timeout, en ms, como execution_timeout de la UI)
+- Con la cola llena se rechaza de inmediato (429); si vence el plazo mientras
+  espera, también (503). En ambos casos con Retry-After estimado
+
+Sirve tanto a hilos (Flask) como a corrutinas (Quart): cada espera es un
+``Waiter`` y quien libera un hueco se lo cede directamente al primero de la cola.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+
+
+class Rejected(Exception):
+    """Petición rechazada por el control de admisión"""
+
+    def __init__(self, status_code, reason, retry_after):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """Espera de un hilo"""
+
+    def __init__(self):
+        self.granted = False
+        self._event = threading.Event()
+
+    def grant(self):
+        self.granted = True
+        self._event.set()
+
+    def wait(self, timeout):
+        self._event.wait(timeout)
+
+
+class _AsyncWaiter:
+    """Espera de una corrutina; el hueco se puede ceder desde otro hilo"""
+
+    def __init__(self):
+        self.granted = False
+        self._loop = asyncio.get_running_loop()
+        self._future = self._loop.create_future()
+
+    def grant(self):
+        self.granted = True
+        self._loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self._future.done():
+            self._future.set_result(True)
+
+    async def wait(self, timeout):
+        try:
+            await asyncio.wait_for(asyncio.shield(self._future), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class Bulkhead:
+    """Límite de ejecuciones simultáneas de un modelo, con cola de espera acotada"""
+
+    def __init__(self, name, max_in_flight, max_queue=0, default_timeout=30.0):
+        self.name = name
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_queue = max(0, int(max_queue))
+        self.default_timeout = default_timeout
+
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self.in_flight = 0
+
+        # Estadísticas
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.service_total = 0.0
+        self.completed = 0
+
+    # ------------------------------------------------------------------
+    # Hilos
+    # ------------------------------------------------------------------
+
+    def acquire(self, timeout=None):
+        """Ocupa un hueco o lanza Rejected. Devuelve el instante de admisión"""
+        waiter = self._enter(_Waiter)
+        if waiter is not None:
+            start = time.perf_counter()
+            waiter.wait(self._timeout(timeout))
+            self._leave_queue(waiter, start)
+        return time.perf_counter()
+
+    # ------------------------------------------------------------------
+    # Corrutinas
+    # ------------------------------------------------------------------
+
+    async def acquire_async(self, timeout=None):
+        """Como acquire(), sin bloquear el event loop"""
+        waiter = self._enter(_AsyncWaiter)
+        if waiter is not None:
+            start = time.perf_counter()
+            try:
+                await waiter.wait(self._timeout(timeout))
+            except asyncio.CancelledError:
+                # Cliente desconectado mientras esperaba
+                self._abandon(waiter)
+                raise
+            self._leave_queue(waiter, start)
+        return time.perf_counter()
+
+    # ------------------------------------------------------------------
+
+    def release(self, admitted_at=None):
+        """Libera el hueco, cediéndolo al primero de la cola si lo hay"""
+        with self._lock:
+            if admitted_at is not None:
+                self.service_total += time.perf_counter() - admitted_at
+                self.completed += 1
+            if self._waiters:
+                # El hueco pasa directamente al siguiente: in_flight no cambia
+                self._waiters.popleft().grant()
+            else:
+                self.in_flight -= 1
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is None else max(0.0, timeout)
+
+    def _enter(self, waiter_class):
+        """None si hay hueco libre; si no, un waiter ya encolado"""
+        with self._lock:
+            if self.in_flight < self.max_in_flight:
+                self.in_flight += 1
+                self.admitted += 1
+                return None
+            if len(self._waiters) >= self.max_queue:
+                self.rejected_queue_full += 1
+                raise Rejected(429, f'{self.name} is at capacity '
+                                    f'({self.in_flight} running, {len(self._waiters)} queued)',
+                               self._retry_after())
+            waiter = waiter_class()
+            self._waiters.append(waiter)
+            self.queued += 1
+            return waiter
+
+    def _leave_queue(self, waiter, start):
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            if waiter.granted:
+                self.admitted += 1
+                return
+            # Plazo vencido sin hueco
+            self._waiters.remove(waiter)
+            self.rejected_deadline += 1
+            raise Rejected(503, f'{self.name} did not free up within the request deadline '
+                                f'({waited * 1000:.0f} ms queued)',
+                           self._retry_after())
+
+    def _abandon(self, waiter):
+        with self._lock:
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                return
+        self.release()
+
+    def _retry_after(self):
+        # Segundos hasta que se vacíe la cola actual, según el tiempo medio de servicio
+        service = self.service_total / self.completed if self.completed else 1.0
+        return max(1, math.ceil(service * (len(self._waiters) + 1) / self.max_in_flight))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'queue_depth': len(self._waiters),
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'rejected_queue_full': self.rejected_queue_full,
+                'rejected_deadline': self.rejected_deadline,
+                'queue_wait_ms': {
+                    'avg': round(self.wait_total / self.queued * 1000, 3) if self.queued else 0,
+                    'max': round(self.wait_max * 1000, 3)
+                }
+            }
+
+
+def parse_bulkheads(spec):
+    """'Modelo A=4:8,Modelo B=2' -> {'Modelo A': (4, 8), 'Modelo B': (2, 0)}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, value = item.rpartition('=')
+        in_flight, _, queue_size = value.partition(':')
+        limits[name.strip()] = (int(in_flight), int(queue_size or 0))
+    return limits
+
+
+def request_timeout(headers, default=None):
+    """Plazo de la petición (segundos) desde X-Execution-Timeout (ms)"""
+    value = headers.get('X-Execution-Timeout')
+    if value is None:
+        return default
+    try:
+        return float(value) / 1000
+    except ValueError:
+        return default
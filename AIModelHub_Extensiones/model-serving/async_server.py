@@ -0,0 +1,537 @@
+"""
+Async Mock AI Model Server
+==========================
+
+Variante asíncrona (Quart / ASGI) del servidor mock de modelos.
+
+Expone los mismos endpoints que mock_server.py, pero la latencia simulada de
+los modelos se espera con ``asyncio.sleep`` en lugar de ``time.sleep``: una
+ejecución lenta no ocupa un hilo del sistema, y un único proceso puede
+mantener miles de ejecuciones concurrentes. El cómputo real (Iris) se
+ejecuta en el pool de hilos para no bloquear el event loop.
+
+Los modelos, el execution log, las métricas y el dashboard son los de
+mock_server.py.
+
+Uso:
+    python async_server.py
+    hypercorn async_server:app --bind 0.0.0.0:8080
+
+Puerto: 8080 (MODEL_SERVER_PORT)
+"""
+
+import asyncio
+import os
+import time
+
+from quart import Quart, Request, Response, g, jsonify, request
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge, UnsupportedMediaType
+
+import mock_server as core
+import tracing
+from admission import Rejected, request_timeout
+from input_schema import ValidationError
+from prediction_cache import MISS, canonical_key
+from uploads import UPLOAD_MAX_BYTES, StreamingUpload, UploadTooLarge, is_upload
+from wire_formats import JSON, decode, encode, fast_json_provider, input_error, is_binary, response_format
+
+# Modelos que aceptan el fichero como cuerpo binario o multipart
+UPLOAD_KINDS = {
+    'Chest X-Ray Classifier': 'image',
+    'Multilingual ASR': 'audio'
+}
+UPLOAD_PATHS = {endpoint[:-len('/batch')] for endpoint, model_name, _ in core.BATCH_ENDPOINTS
+                if model_name in UPLOAD_KINDS}
+
+
+class UploadLimitRequest(Request):
+    """Request con el límite de las subidas (uploads.py) solo en las subidas binarias
+
+    Quart fija el límite del cuerpo (MAX_CONTENT_LENGTH, 16 MB por defecto) al
+    crear la petición, antes del enrutado; el resto de rutas (JSON, batch,
+    jobs) lo mantienen.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.method == 'POST' and self.path in UPLOAD_PATHS and is_upload(self.mimetype):
+            self.max_content_length = UPLOAD_MAX_BYTES
+            self.body = self.body_class(self.content_length, UPLOAD_MAX_BYTES)
+
+
+app = Quart(__name__)
+app.request_class = UploadLimitRequest
+app.json = fast_json_provider(app.json_provider_class)(app)  # orjson si está instalado
+
+# ============================================================================
+# ASYNC MODEL ADAPTERS
+# ============================================================================
+
+async def cached(model_name, data, runner):
+    """Consulta la caché de predicciones del modelo antes de ``await runner(data)``"""
+    cache = core.prediction_cache(model_name)
+    if cache is None:
+        return await runner(data)
+    key = canonical_key(data)
+    result = cache.get(key)
+    if result is MISS:
+        result = await runner(data)
+        cache.put(key, result)
+    return result
+
+async def run_model(model_name, data):
+    """Ejecuta un registro sin bloquear el event loop"""
+    return await cached(model_name, data, lambda data: _run_model(model_name, data))
+
+async def _run_model(model_name, data):
+    batcher = core.micro_batchers.get(model_name)
+    if batcher is not None:
+        return await asyncio.wrap_future(batcher.submit(data))
+
+    compute, _ = core.MODEL_COMPUTE[model_name]
+    if model_name in core.SIMULATED_LATENCY:
+        start = time.perf_counter()
+        await asyncio.sleep(core.simulated_latency(model_name))
+        return core.stamp_processing_time(model_name, await run_compute(model_name, compute, 'compute', data), start)
+    return await asyncio.to_thread(core.pooled(model_name, compute, 'compute'), data)
+
+async def run_model_batch(model_name, batch):
+    """Ejecuta un lote: la latencia simulada se paga una vez"""
+    _, compute_batch = core.MODEL_COMPUTE[model_name]
+    if model_name in core.SIMULATED_LATENCY:
+        start = time.perf_counter()
+        await asyncio.sleep(core.simulated_latency(model_name))
+        return core.stamp_processing_time(
+            model_name, await run_compute(model_name, compute_batch, 'compute_batch', batch), start)
+    return await asyncio.to_thread(core.pooled(model_name, compute_batch, 'compute_batch'), batch)
+
+async def run_compute(model_name, fn, kind, arg):
+    """Cómputo ligero en el event loop; con pool de procesos, allí (sin bloquear el loop)"""
+    if model_name in core.pooled_models:
+        return await asyncio.to_thread(core.pooled(model_name, fn, kind), arg)
+    return fn(arg)
+
+async def speech_recognizer_stream(data):
+    """ASR en streaming: un segmento por ventana de audio y el resultado al final"""
+    start = time.perf_counter()
+    result, segments, latency = core.plan_transcription(data)
+    for segment in segments:
+        await asyncio.sleep(latency)
+        yield 'segment', segment
+    yield 'result', core.stamp_processing_time('Multilingual ASR', result, start)
+
+# ============================================================================
+# API ENDPOINTS
+# ============================================================================
+
+async def request_payload(batch=False):
+    """Cuerpo de la petición: JSON, MessagePack o Arrow (ver wire_formats.py)"""
+    with tracing.stage('parse'):
+        try:
+            if is_binary(request.mimetype):
+                return decode(request.mimetype, await request.get_data(), batch)
+            return await request.get_json()
+        except RequestEntityTooLarge:
+            # Por encima de MAX_CONTENT_LENGTH: 413 como las subidas
+            raise UploadTooLarge(f'Request body exceeds the limit of {request.max_content_length} bytes') from None
+        except UnsupportedMediaType as e:
+            raise ValidationError([(None, e.description)]) from None
+        except BadRequest:
+            raise ValidationError([(None, 'Malformed JSON body')]) from None
+        except ValueError as e:
+            raise ValidationError([(None, str(e) or f'Malformed {request.mimetype} body')]) from None
+
+def respond(body, batch=False):
+    """Respuesta en el formato que pide la cabecera Accept"""
+    with tracing.stage('serialize'):
+        mimetype = response_format(request.accept_mimetypes, batch)
+        if mimetype == JSON:
+            return jsonify(body)
+        return Response(encode(body, mimetype), mimetype=mimetype)
+
+async def read_upload_request(kind):
+    """Datos del modelo para una subida binaria, leída por trozos del stream"""
+    upload = StreamingUpload(request.content_length)
+    try:
+        with tracing.stage('parse'):
+            if request.mimetype == 'multipart/form-data':
+                # Quart recibe el multipart entero en memoria antes de parsearlo
+                # (hasta UPLOAD_MAX_BYTES); el cuerpo binario va por trozos
+                file = (await request.files).get('file')
+                if file is None:
+                    raise ValidationError([('file', "Multipart upload must include a 'file' field")])
+                upload.read_from(file.stream)
+                form = (await request.form).to_dict()
+            else:
+                async for chunk in request.body:
+                    upload.feed(chunk)
+                form = {}
+            return core.upload_data(upload, kind, {**request.args.to_dict(), **form})
+    except RequestEntityTooLarge:
+        raise UploadTooLarge(f'Upload exceeds the limit of {UPLOAD_MAX_BYTES} bytes') from None
+
+def stream_transcription(endpoint, data, fmt, start_time):
+    """Respuesta en streaming (SSE / NDJSON) del modelo ASR"""
+    trace = tracing.current()  # El generador se consume después de la petición
+
+    async def generate():
+        status = 'error'
+        first = True
+        result = None
+        try:
+            async for event, payload in speech_recognizer_stream(data):
+                if event == 'result':
+                    result = payload
+                if first:
+                    core.metrics.observe_first_token('Multilingual ASR', endpoint, time.perf_counter() - start_time)
+                    first = False
+                yield core.stream_event(fmt, event, payload).encode('utf-8')
+            status = 'success'
+        except (GeneratorExit, asyncio.CancelledError):
+            status = 'cancelled'
+            raise
+        finally:
+            core.log_execution('Multilingual ASR', endpoint, status, start_time, trace=trace,
+                               input_payload=data, output_payload=result)
+
+    return Response(generate(), mimetype=core.STREAM_MIMETYPES[fmt],
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+async def handle_single(model_name, endpoint, runner):
+    """Ejecuta la petición actual de un solo registro con ``await runner(data)``"""
+    start_time = time.perf_counter()
+    core.metrics.start(model_name, endpoint)
+    status_code = 200
+    data = None
+
+    try:
+        if model_name in UPLOAD_KINDS and is_upload(request.mimetype):
+            data = await read_upload_request(UPLOAD_KINDS[model_name])
+        else:
+            data = await request_payload()
+        data = core.validate_input(model_name, data)
+
+        fmt = None
+        if model_name == 'Multilingual ASR':
+            fmt = core.stream_format(request.args, request.accept_mimetypes)
+        if fmt is not None:
+            response = stream_transcription(endpoint, data, fmt, start_time)
+        else:
+            with tracing.stage('inference'):
+                result = await runner(data)
+
+            core.log_execution(model_name, endpoint, 'success', start_time,
+                               input_payload=data, output_payload=result)
+
+            response = respond(result)
+
+    except UploadTooLarge as e:
+        body = {'error': str(e)}
+        core.log_execution(model_name, endpoint, 'error', start_time, input_payload=data, output_payload=body, status_code=413)
+        status_code = 413
+        response = jsonify(body)
+
+    except ValidationError as e:
+        body = e.to_dict()
+        core.log_execution(model_name, endpoint, 'error', start_time, input_payload=data, output_payload=body, status_code=400)
+        status_code = 400
+        response = jsonify(body)
+
+    except Exception as e:
+        body = {'error': str(e)}
+        core.log_execution(model_name, endpoint, 'error', start_time, input_payload=data, output_payload=body, status_code=500)
+        status_code = 500
+        response = jsonify(body)
+
+    finally:
+        core.metrics.finish(model_name, endpoint)
+
+    core.metrics.observe(model_name, endpoint, status_code, time.perf_counter() - start_time,
+                         request_bytes=request.content_length,
+                         response_bytes=response.content_length)
+    return response, status_code
+
+async def handle_batch(model_name, endpoint, runner):
+    """Ejecuta la petición batch actual con ``await runner(batch)``"""
+    start_time = time.perf_counter()
+    core.metrics.start(model_name, endpoint)
+    status_code = 200
+    batch = None
+
+    try:
+        batch = core.parse_batch(await request_payload(batch=True))
+        size = core.batch_size(batch)
+        if size == 0 or size > core.MAX_BATCH_SIZE:
+            raise ValueError(f'Batch size must be between 1 and {core.MAX_BATCH_SIZE}, got {size}')
+        batch = core.validate_batch(model_name, batch)
+
+        inference_start = time.perf_counter()
+        with tracing.stage('inference'):
+            results = await runner(batch)
+        batch_ms = (time.perf_counter() - inference_start) * 1000
+
+        core.log_execution(model_name, endpoint, 'success', start_time, batch_size=size,
+                           input_payload=batch, output_payload=results)
+
+        response = respond({
+            'model': model_name,
+            'batch_size': size,
+            'results': results,
+            'timing': {
+                'batch_ms': round(batch_ms, 3),
+                'per_item_ms': round(batch_ms / size, 3),
+                'total_ms': round((time.perf_counter() - start_time) * 1000, 3)
+            }
+        }, batch=True)
+
+    except UploadTooLarge as e:
+        status_code = 413
+        response = jsonify({'error': str(e)})
+
+    except ValidationError as e:
+        status_code = 400
+        response = jsonify(e.to_dict())
+
+    except ValueError as e:
+        status_code = 400
+        response = jsonify({'error': str(e)})
+
+    except Exception as e:
+        body = {'error': str(e)}
+        core.log_execution(model_name, endpoint, 'error', start_time, input_payload=batch, output_payload=body, status_code=500)
+        status_code = 500
+        response = jsonify(body)
+
+    finally:
+        core.metrics.finish(model_name, endpoint)
+
+    core.metrics.observe(model_name, endpoint, status_code, time.perf_counter() - start_time,
+                         request_bytes=request.content_length,
+                         response_bytes=response.content_length)
+    return response, status_code
+
+def make_endpoint(model_name, endpoint, handler, runner):
+    """Vista asíncrona de un endpoint fijo"""
+    async def model_endpoint():
+        return await handler(model_name, endpoint, lambda data: runner(model_name, data))
+
+    model_endpoint.__name__ = f'async_{endpoint.strip("/").replace("/", "_").replace("-", "_")}'
+    return model_endpoint
+
+for _endpoint, _model_name, _ in core.BATCH_ENDPOINTS:
+    _single_endpoint = _endpoint[:-len('/batch')]
+    app.add_url_rule(_single_endpoint, methods=['POST'],
+                     view_func=make_endpoint(_model_name, _single_endpoint, handle_single, run_model))
+    app.add_url_rule(_endpoint, methods=['POST'],
+                     view_func=make_endpoint(_model_name, _endpoint, handle_batch, run_model_batch))
+
+@app.route('/api/v1/models', methods=['GET'])
+async def list_models():
+    """Models discovered in models/ and their residency state"""
+    return jsonify(core.model_registry.describe()), 200
+
+@app.route('/api/v1/models/<name>/predict', methods=['POST'])
+async def predict_registered(name):
+    """Generic prediction endpoint for any model in models/"""
+    if name not in core.model_registry:
+        return jsonify({'error': f"Unknown model '{name}'"}), 404
+
+    def predict(data):
+        return {'model': name, **core.model_registry.get(name).predict_vector(data['features'])}
+
+    return await handle_single(name, f'/api/v1/models/{name}/predict',
+                               lambda data: cached(name, data, lambda data: asyncio.to_thread(predict, data)))
+
+@app.route('/api/v1/models/<name>/predict/batch', methods=['POST'])
+async def predict_registered_batch(name):
+    """Generic batch prediction endpoint for any model in models/"""
+    if name not in core.model_registry:
+        return jsonify({'error': f"Unknown model '{name}'"}), 404
+
+    def predict_batch(batch):
+        return [{'model': name, **result}
+                for result in core.model_registry.get(name).predict_matrix(core.registered_features(batch))]
+
+    return await handle_batch(name, f'/api/v1/models/{name}/predict/batch',
+                              lambda batch: asyncio.to_thread(predict_batch, batch))
+
+@app.route('/api/v1/jobs', methods=['POST'])
+async def create_job():
+    """Submit an asynchronous execution: {"model": ..., "input": {...}, "priority": 0}"""
+    body, status_code = await asyncio.to_thread(core.submit_job, await request.get_json(silent=True))
+    headers = {'Location': f"/api/v1/jobs/{body['job_id']}"} if status_code == 202 else {}
+    return jsonify(body), status_code, headers
+
+@app.route('/api/v1/jobs', methods=['GET'])
+async def list_jobs():
+    """Most recent jobs, optionally filtered by status and model"""
+    try:
+        filters = core.list_jobs_args(request.args)
+    except ValidationError as e:
+        return jsonify(e.to_dict()), 400
+    jobs = await asyncio.to_thread(core.job_queue.list, **filters)
+    return jsonify(jobs), 200
+
+@app.route('/api/v1/jobs/<job_id>', methods=['GET'])
+async def get_job(job_id):
+    """Job status, and its result once finished"""
+    job = await asyncio.to_thread(core.job_queue.get, job_id, request.args.get('input') == '1')
+    if job is None:
+        return jsonify({'error': f"Unknown job '{job_id}'"}), 404
+    return jsonify(job), 200
+
+@app.route('/api/v1/jobs/<job_id>', methods=['DELETE'])
+async def delete_job(job_id):
+    """Cancel a pending or running job"""
+    body, status_code = await asyncio.to_thread(core.cancel_job, job_id)
+    return jsonify(body), status_code
+
+# Plantilla del dashboard compilada una sola vez (el entorno Jinja de Quart es async)
+_dashboard_template = None
+
+@app.route('/')
+async def home():
+    """Dashboard HTML"""
+    global _dashboard_template
+    if _dashboard_template is None:
+        _dashboard_template = app.jinja_env.from_string(core.DASHBOARD_TEMPLATE)
+    return await _dashboard_template.render_async(**core.dashboard_context())
+
+@app.route('/api/v1/executions/feed', methods=['GET'])
+async def executions_feed():
+    """Executions after ?after=<cursor>, plus aggregated counters (JSON polling)"""
+    try:
+        limit = core.limit_arg(request.args, 50, 500)
+    except ValidationError as e:
+        return jsonify(e.to_dict()), 400
+    return jsonify(core.execution_feed(request.args.get('after'), limit)), 200
+
+@app.route('/api/v1/executions/stream', methods=['GET'])
+async def executions_stream():
+    """Server-Sent Events with new executions (resumes from Last-Event-ID)"""
+    cursor = request.args.get('after') or request.headers.get('Last-Event-ID')
+
+    async def generate(cursor):
+        yield f'retry: {int(core.FEED_INTERVAL * 2000)}\n\n'.encode('utf-8')
+        deadline = time.monotonic() + core.FEED_STREAM_SECONDS
+        last_total = None
+        while time.monotonic() < deadline:
+            event, cursor, last_total = core.feed_event(cursor, last_total)
+            yield (event or ': keepalive\n\n').encode('utf-8')
+            await asyncio.sleep(core.FEED_INTERVAL)
+
+    response = Response(generate(cursor), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.timeout = None  # La conexión dura FEED_STREAM_SECONDS
+    return response
+
+@app.route('/metrics', methods=['GET'])
+async def prometheus_metrics():
+    """Prometheus metrics endpoint (text exposition format)"""
+    return Response(core.metrics_text(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/v1/health', methods=['GET'])
+async def health():
+    """Health check endpoint"""
+    return jsonify({**core.health_status(), 'server': 'async'}), 200
+
+@app.before_serving
+async def start_process_pools():
+    # Antes de la primera petición, cuando aún no hay hilos de asyncio.to_thread
+    core.start_process_pools()
+
+@app.before_request
+async def record_first_request():
+    core.mark_first_request()
+    core.job_queue.start()
+
+@app.before_request
+async def check_wire_format():
+    if is_binary(request.mimetype):
+        error = input_error(request.mimetype, batch=request.path.endswith('/batch'))
+        if error is not None:
+            return jsonify({'error': error}), 415
+
+def request_model():
+    """Modelo de la petición actual, o None si no es de un modelo"""
+    model_name = core.MODEL_ENDPOINTS.get(request.path)
+    if model_name is None:
+        name = (request.view_args or {}).get('name')
+        model_name = name if name is not None and name in core.model_registry else None
+    return model_name
+
+@app.before_request
+async def start_trace():
+    """Trace id y tiempo por etapa de las peticiones a modelos (ver tracing.py)
+
+    El perfilador por muestreo necesita un hilo por petición: aquí no se usa.
+    """
+    model_name = request_model()
+    if model_name is not None:
+        g.trace = tracing.begin(request.headers)
+        g.trace_labels = (model_name, request.path)
+
+@app.before_request
+async def admit_request():
+    """Bulkhead del modelo (ver admission.py); la espera no bloquea el event loop"""
+    model_name = request_model()
+    bulkhead = core.bulkheads.get(model_name)
+    if bulkhead is None:
+        return None
+    start_time = time.perf_counter()
+    try:
+        with tracing.stage('queue'):
+            g.admitted_at = await bulkhead.acquire_async(request_timeout(request.headers))
+        g.bulkhead = bulkhead
+    except Rejected as e:
+        body, status_code, headers = core.rejection(e, model_name, request.path)
+        # No llega a handle_single/handle_batch: se cuenta aquí, como en mock_server.py
+        core.metrics.observe(model_name, request.path, status_code, time.perf_counter() - start_time,
+                             request_bytes=request.content_length)
+        return jsonify(body), status_code, headers
+
+@app.teardown_request
+async def release_admission(exc):
+    bulkhead = g.pop('bulkhead', None)
+    if bulkhead is not None:
+        bulkhead.release(g.pop('admitted_at', None))
+
+@app.after_request
+async def add_trace_headers(response):
+    trace = g.get('trace')
+    if trace is not None:
+        core.metrics.observe_stages(*g.trace_labels, trace.seconds())
+        response.headers['X-Trace-Id'] = trace.trace_id
+        response.headers['Server-Timing'] = trace.server_timing()
+    return response
+
+@app.teardown_request
+async def end_trace(exc):
+    trace = g.pop('trace', None)
+    if trace is not None:
+        tracing.end(trace)
+
+@app.after_request
+async def add_cors_headers(response):
+    # Equivalente a CORS(app) del servidor Flask
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, DELETE, OPTIONS'
+    return response
+
+if __name__ == '__main__':
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    port = int(os.environ.get('MODEL_SERVER_PORT', 8080))
+    config = Config()
+    config.bind = [f'0.0.0.0:{port}']
+
+    print("=" * 70)
+    print("🤖 AI Model Mock Server (async) Starting...")
+    print("=" * 70)
+    print(f"📊 Dashboard: http://localhost:{port}")
+    print(f"🔌 Same API endpoints as mock_server.py, served by asyncio")
+    print("=" * 70)
+
+    asyncio.run(serve(app, config))
@@ -0,0 +1,146 @@
+"""
+Micro-Batching
+==============
+
+Planificador de micro-lotes dinámicos: agrupa peticiones individuales
+concurrentes de un mismo modelo durante una ventana corta (o hasta un tamaño
+máximo de lote), ejecuta una única llamada batch vectorizada y devuelve a
+cada petición su resultado. Si la llamada batch falla, fallan todas las
+peticiones del lote.
+
+Uso:
+    batcher = MicroBatcher('Iris Classifier', iris_classifier_batch,
+                           max_batch_size=32, window_ms=5)
+    result = batcher.submit(data).result()
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Límites superiores de los buckets del histograma de tamaños de lote
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+
+
+class MicroBatcher:
+    """Cola por modelo con hilos que ejecutan lotes de peticiones"""
+
+    def __init__(self, name, batch_fn, max_batch_size=32, window_ms=5.0, workers=1):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.window = max(0.0, float(window_ms)) / 1000
+        self.workers = max(1, int(workers))
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+
+        # Estadísticas
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS if bucket <= self.max_batch_size}
+        self.histogram.setdefault(self.max_batch_size, 0)
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def submit(self, item):
+        """Encola un elemento y devuelve un Future con su resultado"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def _ensure_started(self):
+        # Los hilos se crean en el primer uso (y de nuevo tras un fork), así
+        # el planificador funciona también dentro de workers pre-fork
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Proceso hijo: la cola heredada pertenece al padre
+                self._queue = queue.Queue()
+            self._threads = [
+                threading.Thread(target=self._run, name=f'microbatch-{self.name}-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._execute(batch)
+
+    def _execute(self, batch):
+        started = time.perf_counter()
+        waits = [started - enqueued for _, _, enqueued in batch]
+        self._record(len(batch), waits)
+
+        items = [item for item, _, _ in batch]
+        try:
+            results = self.batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"Batch function of '{self.name}' returned "
+                                   f"{len(results)} results for {len(items)} items")
+        except Exception as e:
+            # Las entradas se validan antes de encolarlas (validate_input), así
+            # que un fallo es del lote entero: reintentar elemento a elemento
+            # solo multiplicaría la latencia por el tamaño del lote
+            for _, future, _ in batch:
+                self._fail(future, e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def _fail(self, future, error):
+        with self._lock:
+            self.errors += 1
+        future.set_exception(error)
+
+    def _record(self, size, waits):
+        with self._lock:
+            self.batches += 1
+            self.items += size
+            for bucket in self.histogram:
+                if size <= bucket:
+                    self.histogram[bucket] += 1
+                    break
+            self.wait_total += sum(waits)
+            self.wait_max = max(self.wait_max, max(waits))
+
+    def stats(self):
+        """Profundidad de cola, histograma de tamaños y tiempo de espera"""
+        with self._lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'window_ms': self.window * 1000,
+                'workers': self.workers,
+                'queue_depth': self._queue.qsize(),
+                'batches': self.batches,
+                'items': self.items,
+                'errors': self.errors,
+                'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0,
+                'batch_size_histogram': {f'<={bucket}': count for bucket, count in self.histogram.items()},
+                'queue_wait_ms': {
+                    'avg': round(self.wait_total / self.items * 1000, 3) if self.items else 0,
+                    'max': round(self.wait_max * 1000, 3)
+                }
+            }
@@ -0,0 +1,347 @@
+"""
+Model Serving Benchmark
+=======================
+
+Generador de carga reproducible para los endpoints de mock_server.py.
+
+Modos:
+- single:      un cliente, peticiones secuenciales de un registro
+- concurrent:  N clientes concurrentes de un registro
+- batch:       peticiones al endpoint /batch con --batch-size registros
+
+Cada escenario registra throughput, percentiles de latencia, tasa de error y
+RSS del servidor, y el resultado se escribe en JSON. Con --spawn el RSS es
+el del proceso arrancado y todos sus descendientes (árbitro y workers de
+gunicorn, pools de procesos); con --url, el del proceso que responde a
+/api/v1/health y sus hijos, que en un servidor con varios workers es solo
+uno de ellos. Con --baseline se
+compara contra un resultado guardado y el proceso termina con código 1 si
+hay una regresión mayor que --tolerance.
+
+Con --rate > 0 la carga es de bucle abierto: las peticiones se programan a
+ritmo fijo y la latencia se mide desde el instante programado, de modo que
+las colas del servidor no quedan ocultas (coordinated omission).
+
+Uso:
+    python benchmark.py --url http://localhost:8080 --duration 10
+    python benchmark.py --spawn async --endpoints detect-fraud --modes concurrent --concurrency 256
+    python benchmark.py --output results.json --baseline baseline.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+# Endpoint y payload de ejemplo de cada modelo
+SCENARIOS = {
+    'predict': ('/api/v1/predict', {
+        'sepal_length': 6.1, 'sepal_width': 2.8, 'petal_length': 4.7, 'petal_width': 1.2
+    }),
+    'sentiment': ('/api/v1/sentiment', {
+        'text': 'The support team was great and the product is amazing, but delivery was terrible.'
+    }),
+    'classify-image': ('/api/v1/classify-image', {
+        'image_base64': '', 'patient_age': 45
+    }),
+    'detect-fraud': ('/api/v1/detect-fraud', {
+        'transaction_amount': 1500.0, 'merchant_category': 'electronics',
+        'location': 'international', 'transaction_hour': 3, 'card_present': False
+    }),
+    'transcribe-audio': ('/api/v1/transcribe-audio', {
+        'audio_duration_seconds': 5.0, 'language': 'en', 'audio_quality': 'good'
+    })
+}
+
+MODES = ('single', 'concurrent', 'batch')
+
+# Métricas comparadas con el baseline: (clave, True si más alto es mejor)
+COMPARED = (
+    ('throughput_rps', True),
+    ('items_per_second', True),
+    ('latency_p50_ms', False),
+    ('latency_p95_ms', False),
+    ('latency_p99_ms', False),
+)
+
+SERVER_COMMANDS = {
+    'flask': [sys.executable, 'mock_server.py'],
+    'async': [sys.executable, 'async_server.py'],
+    'gunicorn': ['gunicorn', '-c', 'gunicorn.conf.py', 'mock_server:app']
+}
+
+
+def percentile(sorted_values, q):
+    """Percentil con interpolación lineal sobre una lista ordenada"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def process_rss_mb(pid):
+    """RSS del proceso y todos sus descendientes (workers de gunicorn, pools) en MB, vía /proc"""
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return round(total_kb / 1024, 1) if total_kb else None
+
+
+def server_pid(base_url):
+    """pid del proceso que atiende /api/v1/health (con gunicorn, uno de sus workers)"""
+    try:
+        with urllib.request.urlopen(f'{base_url}/api/v1/health', timeout=5) as response:
+            return json.load(response).get('pid')
+    except Exception:
+        return None
+
+
+def run_scenario(base_url, scenario, mode, concurrency, rate, duration, max_requests, batch_size, timeout,
+                 pid=None):
+    """Ejecuta un escenario y devuelve sus estadísticas
+
+    ``pid`` es la raíz del árbol de procesos cuyo RSS se mide (el servidor
+    arrancado con --spawn); sin él, el proceso que responde a /api/v1/health.
+    """
+    endpoint, payload = SCENARIOS[scenario]
+    items_per_request = 1
+    if mode == 'batch':
+        endpoint = f'{endpoint}/batch'
+        body = json.dumps([payload] * batch_size).encode('utf-8')
+        items_per_request = batch_size
+    else:
+        body = json.dumps(payload).encode('utf-8')
+    if mode == 'single':
+        concurrency = 1
+
+    url = urllib.parse.urlparse(base_url)
+    headers = {'Content-Type': 'application/json'}
+    lock = threading.Lock()
+    latencies = []
+    status_counts = {}
+    tickets = iter(range(max_requests or sys.maxsize))
+    start = time.perf_counter()
+    deadline = start + duration
+
+    def next_ticket():
+        with lock:
+            return next(tickets, None)
+
+    def worker():
+        conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+        while True:
+            ticket = next_ticket()
+            if ticket is None:
+                break
+            if rate > 0:
+                scheduled = start + ticket / rate
+                if scheduled >= deadline:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                sent = scheduled
+            else:
+                sent = time.perf_counter()
+                if sent >= deadline:
+                    break
+            try:
+                conn.request('POST', endpoint, body, headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except Exception:
+                status = 'connection_error'
+                conn.close()
+                conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+            elapsed = time.perf_counter() - sent
+            with lock:
+                latencies.append(elapsed)
+                status_counts[status] = status_counts.get(status, 0) + 1
+        conn.close()
+
+    pid = pid or server_pid(base_url)
+    rss_before = process_rss_mb(pid) if pid else None
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    rss_after = process_rss_mb(pid) if pid else None
+    latencies.sort()
+    requests = len(latencies)
+    errors = sum(count for status, count in status_counts.items()
+                 if not isinstance(status, int) or status >= 400)
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        'scenario': scenario,
+        'endpoint': endpoint,
+        'mode': mode,
+        'concurrency': concurrency,
+        'target_rate_rps': rate or None,
+        'batch_size': items_per_request,
+        'requests': requests,
+        'errors': errors,
+        'error_rate': round(errors / requests, 4) if requests else None,
+        'status_codes': {str(status): count for status, count in sorted(status_counts.items(), key=str)},
+        'duration_s': round(wall, 3),
+        'throughput_rps': round(requests / wall, 2) if wall else None,
+        'items_per_second': round(requests * items_per_request / wall, 2) if wall else None,
+        'latency_mean_ms': ms(sum(latencies) / requests) if requests else None,
+        'latency_p50_ms': ms(percentile(latencies, 0.50)),
+        'latency_p90_ms': ms(percentile(latencies, 0.90)),
+        'latency_p95_ms': ms(percentile(latencies, 0.95)),
+        'latency_p99_ms': ms(percentile(latencies, 0.99)),
+        'latency_max_ms': ms(latencies[-1]) if latencies else None,
+        'server_rss_mb': {'pid': pid, 'before': rss_before, 'after': rss_after}
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regresiones respecto al baseline (lista de mensajes)"""
+    def key(result):
+        # Solo se comparan escenarios con la misma configuración de carga
+        return (result['scenario'], result['mode'], result['concurrency'],
+                result['batch_size'], result['target_rate_rps'])
+
+    previous = {key(r): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        label = f"{result['scenario']}/{result['mode']}"
+        for metric, higher_is_better in COMPARED:
+            new_value, old_value = result.get(metric), old.get(metric)
+            if not new_value or not old_value:
+                continue
+            change = (new_value - old_value) / old_value
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f'{label}: {metric} {old_value} -> {new_value} ({change:+.1%})')
+        if (result.get('error_rate') or 0) > (old.get('error_rate') or 0) + tolerance / 10:
+            regressions.append(f"{label}: error_rate {old.get('error_rate')} -> {result.get('error_rate')}")
+    return regressions
+
+
+def spawn_server(kind, port):
+    """Arranca un servidor local y espera a que responda /api/v1/health"""
+    env = dict(os.environ, MODEL_SERVER_PORT=str(port))
+    process = subprocess.Popen(
+        SERVER_COMMANDS[kind], cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(300):
+        if process.poll() is not None:
+            raise RuntimeError(f'{kind} server exited with code {process.returncode}')
+        if server_pid(base_url) is not None:
+            return process, base_url
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f'{kind} server did not become healthy on port {port}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the model-serving endpoints')
+    parser.add_argument('--url', default='http://localhost:8080', help='Base URL of a running server')
+    parser.add_argument('--spawn', choices=sorted(SERVER_COMMANDS), help='Start a local server for the run')
+    parser.add_argument('--port', type=int, default=18080, help='Port for --spawn')
+    parser.add_argument('--endpoints', default=','.join(SCENARIOS), help='Comma-separated scenarios')
+    parser.add_argument('--modes', default=','.join(MODES), help='Comma-separated modes')
+    parser.add_argument('--concurrency', type=int, default=16, help='Clients for concurrent/batch modes')
+    parser.add_argument('--rate', type=float, default=0, help='Open-loop target rate in req/s (0 = closed loop)')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per scenario')
+    parser.add_argument('--requests', type=int, default=0, help='Max requests per scenario (0 = no limit)')
+    parser.add_argument('--batch-size', type=int, default=64, help='Records per request in batch mode')
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', help='Compare against a previous results file')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative regression')
+    args = parser.parse_args(argv)
+
+    process = None
+    base_url = args.url.rstrip('/')
+    if args.spawn:
+        process, base_url = spawn_server(args.spawn, args.port)
+
+    results = []
+    try:
+        for scenario in filter(None, args.endpoints.split(',')):
+            if scenario not in SCENARIOS:
+                parser.error(f"unknown endpoint '{scenario}' (choose from {', '.join(SCENARIOS)})")
+            for mode in filter(None, args.modes.split(',')):
+                if mode not in MODES:
+                    parser.error(f"unknown mode '{mode}' (choose from {', '.join(MODES)})")
+                result = run_scenario(base_url, scenario, mode, args.concurrency, args.rate,
+                                      args.duration, args.requests, args.batch_size, args.timeout,
+                                      pid=process.pid if process is not None else None)
+                results.append(result)
+                print(f"{scenario:<18} {mode:<11} c={result['concurrency']:<4} "
+                      f"rps={result['throughput_rps']:<9} items/s={result['items_per_second']:<10} "
+                      f"p50={result['latency_p50_ms']}ms p99={result['latency_p99_ms']}ms "
+                      f"err={result['error_rate']} rss={result['server_rss_mb']['after']}MB")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'url': base_url,
+            'server': args.spawn,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'settings': {key: value for key, value in vars(args).items()
+                         if key not in ('output', 'baseline')}
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Cluster State
+=============
+
+Estado compartido entre los procesos worker del modo producción (gunicorn).
+
+Cada worker escribe periódicamente una instantánea de su estado (contadores
+del execution log, ejecuciones recientes y métricas) en un directorio común.
+Al leer /health, /metrics o el dashboard, el worker que atiende combina su
+estado en vivo con las instantáneas del resto, de modo que se muestran
+totales globales y no los de un único proceso.
+
+Las instantáneas de workers que han terminado se conservan (sus contadores
+siguen contando), pero se marcan como muertas para ignorar sus gauges.
+
+Cada instantánea leída se guarda junto a su mtime: solo se vuelve a cargar
+cuando su worker la reescribe, aunque la pidan a la vez muchas peticiones
+(p. ej. un stream SSE del dashboard por cliente).
+"""
+
+import os
+import pickle
+import threading
+import time
+
+DEAD_SUFFIX = '.dead'
+
+
+class ClusterState:
+    """Publica la instantánea del proceso actual y lee las de los demás"""
+
+    def __init__(self, state_dir, snapshot_fn, interval=1.0):
+        self.state_dir = state_dir
+        self.snapshot_fn = snapshot_fn
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pid = None
+        self._cache = {}   # fichero -> (mtime_ns, tamaño, instantánea)
+
+    def start(self):
+        """Arranca el hilo de publicación (una vez por proceso)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='cluster-state', daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                self.write()
+            except Exception as e:
+                print(f"⚠ Could not write cluster state: {e}")
+            time.sleep(self.interval)
+
+    def write(self):
+        """Escribe la instantánea de forma atómica (fichero temporal + rename)"""
+        path = os.path.join(self.state_dir, f'{os.getpid()}.pickle')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.snapshot_fn(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def peers(self):
+        """Instantáneas de los otros procesos como pares (alive, snapshot)"""
+        own = f'{os.getpid()}.pickle'
+        try:
+            names = os.listdir(self.state_dir)
+        except FileNotFoundError:
+            return
+        names = [name for name in names if name != own and not name.endswith('.tmp')]
+        with self._lock:
+            # Fuera las instantáneas que ya no existen (renombradas al morir su worker)
+            for name in set(self._cache) - set(names):
+                del self._cache[name]
+        for name in names:
+            snapshot = self._load(name)
+            if snapshot is not None:
+                yield not name.endswith(DEAD_SUFFIX), snapshot
+
+    def _load(self, name):
+        """Instantánea de un fichero, de la caché si no ha cambiado (compartida: solo lectura)"""
+        path = os.path.join(self.state_dir, name)
+        try:
+            stat = os.stat(path)
+            cached = self._cache.get(name)
+            if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                return cached[2]
+            with open(path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        with self._lock:
+            self._cache[name] = (stat.st_mtime_ns, stat.st_size, snapshot)
+        return snapshot
+
+
+def mark_dead(state_dir, pid):
+    """Marca la instantánea de un worker terminado (hook child_exit de gunicorn)"""
+    path = os.path.join(state_dir, f'{pid}.pickle')
+    if os.path.exists(path):
+        os.replace(path, path + DEAD_SUFFIX)
@@ -0,0 +1,176 @@
+"""
+Execution Log
+=============
+
+Registro de ejecuciones en memoria con capacidad fija (ring buffer).
+
+- Registros compactos (__slots__) con timestamp numérico
+- Seguro para escrituras concurrentes desde varios hilos
+- Índices por modelo y por estado para consultar las últimas ejecuciones
+- Contadores acumulados: los totales se leen en O(1) y la memoria no crece
+  con el tiempo de actividad del servidor
+- Listeners opcionales que reciben cada registro (p. ej. persistencia
+  write-behind, ver execution_sink.py)
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+class ExecutionRecord:
+    """Una ejecución de modelo"""
+
+    __slots__ = ('seq', 'time', 'model', 'endpoint', 'status', 'duration', 'batch_size', 'trace_id',
+                 'status_code')
+
+    def __init__(self, seq, time, model, endpoint, status, duration, batch_size, trace_id=None,
+                 status_code=None):
+        self.seq = seq
+        self.time = time
+        self.model = model
+        self.endpoint = endpoint
+        self.status = status
+        self.duration = duration
+        self.batch_size = batch_size
+        self.trace_id = trace_id
+        self.status_code = status_code
+
+    @property
+    def timestamp(self):
+        """Fecha legible, calculada solo al mostrarla"""
+        return datetime.fromtimestamp(self.time).strftime('%Y-%m-%d %H:%M:%S')
+
+    def to_dict(self):
+        return {
+            'seq': self.seq,
+            'timestamp': self.timestamp,
+            'time': self.time,
+            'model': self.model,
+            'endpoint': self.endpoint,
+            'status': self.status,
+            'duration': self.duration,
+            'batch_size': self.batch_size,
+            'trace_id': self.trace_id,
+            'status_code': self.status_code
+        }
+
+
+class ExecutionLog:
+    """Ring buffer de ExecutionRecord con índices y contadores"""
+
+    def __init__(self, capacity=10000):
+        self.capacity = max(1, int(capacity))
+        self._buffer = [None] * self.capacity
+        self._lock = threading.Lock()
+        self._by_model = {}
+        self._by_status = {}
+
+        # Contadores acumulados desde el arranque
+        self.total = 0
+        self.model_counts = {}
+        self.status_counts = {}
+
+        # Funciones llamadas con cada ExecutionRecord nuevo y sus payloads de
+        # entrada y salida (deben ser rápidas). Los payloads no se guardan en el buffer
+        self.listeners = []
+
+    def record(self, model, endpoint, status, duration, batch_size=1, trace_id=None,
+               input_payload=None, output_payload=None, status_code=None):
+        """Añade una ejecución, sobrescribiendo la más antigua si está lleno"""
+        now = time.time()
+        with self._lock:
+            seq = self.total
+            entry = ExecutionRecord(seq, now, model, endpoint, status, duration, batch_size, trace_id,
+                                    status_code)
+            self._buffer[seq % self.capacity] = entry
+            self.total = seq + 1
+
+            self.model_counts[model] = self.model_counts.get(model, 0) + 1
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+            # Los índices guardan números de secuencia, acotados a la capacidad
+            self._index(self._by_model, model).append(seq)
+            self._index(self._by_status, status).append(seq)
+        for listener in self.listeners:
+            listener(entry, input_payload, output_payload)
+        return entry
+
+    def _index(self, indexes, key):
+        index = indexes.get(key)
+        if index is None:
+            index = indexes[key] = deque(maxlen=self.capacity)
+        return index
+
+    def __len__(self):
+        """Número de ejecuciones retenidas en el buffer"""
+        return min(self.total, self.capacity)
+
+    def recent(self, n=10, model=None, status=None):
+        """Últimas n ejecuciones (la más reciente primero), opcionalmente filtradas"""
+        with self._lock:
+            oldest = self.total - len(self)
+            if model is None and status is None:
+                seqs = range(self.total - 1, max(oldest, self.total - n) - 1, -1)
+            else:
+                if model is not None and status is not None:
+                    wanted = set(self._by_status.get(status, ()))
+                    candidates = (s for s in reversed(self._by_model.get(model, ())) if s in wanted)
+                elif model is not None:
+                    candidates = reversed(self._by_model.get(model, ()))
+                else:
+                    candidates = reversed(self._by_status.get(status, ()))
+                seqs = []
+                for seq in candidates:
+                    if seq < oldest or len(seqs) >= n:
+                        break
+                    seqs.append(seq)
+            return [self._buffer[seq % self.capacity] for seq in seqs]
+
+    def since(self, seq, limit=100):
+        """Ejecuciones posteriores al número de secuencia ``seq`` (la más antigua primero)
+
+        Como mucho las ``limit`` más recientes: el coste depende de los
+        registros nuevos, no del tamaño del buffer.
+        """
+        with self._lock:
+            start = max(seq + 1, self.total - len(self), self.total - limit)
+            return [self._buffer[s % self.capacity] for s in range(start, self.total)]
+
+    def counters(self):
+        """Totales acumulados por modelo y por estado"""
+        with self._lock:
+            return {
+                'total': self.total,
+                'retained': len(self),
+                'capacity': self.capacity,
+                'by_model': dict(self.model_counts),
+                'by_status': dict(self.status_counts)
+            }
+
+    def snapshot(self, n=10):
+        """Contadores y últimas ejecuciones en forma serializable"""
+        return {
+            'counters': self.counters(),
+            'recent': [entry.to_dict() for entry in self.recent(n)]
+        }
+
+
+def merge_counters(counters_list):
+    """Suma los contadores de varios procesos"""
+    merged = {'total': 0, 'retained': 0, 'capacity': 0, 'by_model': {}, 'by_status': {}}
+    for counters in counters_list:
+        for key in ('total', 'retained', 'capacity'):
+            merged[key] += counters[key]
+        for key in ('by_model', 'by_status'):
+            for name, count in counters[key].items():
+                merged[key][name] = merged[key].get(name, 0) + count
+    return merged
+
+
+def merge_recent(recent_lists, n=10):
+    """Últimas n ejecuciones de varios procesos, la más reciente primero"""
+    merged = [entry for recent in recent_lists for entry in recent]
+    merged.sort(key=lambda entry: entry['time'], reverse=True)
+    return merged[:n]
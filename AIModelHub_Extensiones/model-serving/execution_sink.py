@@ -0,0 +1,260 @@
+"""
+Execution Sink
+==============
+
+Persistencia write-behind del execution log.
+
+Las peticiones solo añaden el registro a un buffer en memoria (sin E/S); un
+hilo lo vuelca en bloque cuando se acumulan ``max_batch`` registros o pasa
+``flush_interval``, con INSERTs multi-fila en una única transacción. Los
+payloads se serializan a JSON (y se truncan a ``max_payload_bytes``) al
+encolarlos, así el buffer no retiene los objetos originales (p. ej. matrices
+de NumPy de miles de filas) y su memoria queda acotada a
+``max_pending`` x ``max_payload_bytes`` aunque la base de datos no responda.
+
+Si la base de datos va lenta, el buffer crece hasta ``max_pending``; a partir
+de ahí los registros nuevos se descartan y se cuentan (``dropped``) en vez de
+frenar las peticiones. Tras un volcado fallido se espera (cada vez más) antes
+de reintentar, aunque el buffer esté lleno.
+
+La tabla replica las columnas de model_executions
+(database-scripts/000_init_database_complete.sql); SQLite hace de base local.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS model_executions (
+    id TEXT PRIMARY KEY,
+    asset_id TEXT NOT NULL,
+    user_id TEXT,
+    connector_id TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    input_payload TEXT,
+    output_payload TEXT,
+    error_message TEXT,
+    error_code TEXT,
+    http_status_code INTEGER,
+    execution_time_ms INTEGER,
+    created_at TEXT,
+    started_at TEXT,
+    completed_at TEXT,
+    execution_metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_model_executions_created_at ON model_executions (created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_model_executions_status ON model_executions (status);
+"""
+
+COLUMNS = ('id', 'asset_id', 'status', 'input_payload', 'output_payload', 'error_message',
+           'http_status_code', 'execution_time_ms', 'created_at', 'started_at', 'completed_at',
+           'execution_metadata')
+
+# Filas por sentencia INSERT: SQLite antiguo admite 999 parámetros
+ROWS_PER_STATEMENT = 999 // len(COLUMNS)
+
+
+def _json_default(value):
+    # Arrays de NumPy / Arrow y demás objetos no JSON
+    return value.tolist() if hasattr(value, 'tolist') else str(value)
+
+
+def payload_json(payload, max_bytes):
+    """JSON del payload, o un resumen si no hay payload o supera ``max_bytes``"""
+    if payload is None:
+        return None
+    text = json.dumps(payload, default=_json_default)
+    if len(text) > max_bytes:
+        return json.dumps({'truncated': True, 'bytes': len(text)})
+    return text
+
+
+def error_message(record, output_payload):
+    """Mensaje de error de una ejecución fallida (el 'error' de su respuesta)"""
+    if record.status != 'error' or not isinstance(output_payload, dict):
+        return None
+    error = output_payload.get('error')
+    return None if error is None else str(error)
+
+
+def execution_row(record, input_json=None, output_json=None, error=None):
+    """Fila de model_executions para un ExecutionRecord y sus payloads ya serializados"""
+    completed = record.time
+    duration_ms = record.duration or 0
+    return (
+        uuid.uuid4().hex,
+        record.model,
+        record.status,
+        input_json,
+        output_json,
+        error,
+        record.status_code,
+        int(round(duration_ms)),
+        datetime.fromtimestamp(completed).isoformat(),
+        datetime.fromtimestamp(completed - duration_ms / 1000).isoformat(),
+        datetime.fromtimestamp(completed).isoformat(),
+        json.dumps({
+            'endpoint': record.endpoint,
+            'batch_size': record.batch_size,
+            'trace_id': record.trace_id,
+            'seq': record.seq,
+            'pid': os.getpid()
+        })
+    )
+
+
+class SQLiteWriter:
+    """Escribe lotes de filas en una base SQLite"""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(SQLITE_SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def write(self, rows):
+        """Inserta las filas con INSERTs multi-fila, en una transacción por lote"""
+        conn = self._connection()
+        row_placeholders = '(' + ','.join('?' * len(COLUMNS)) + ')'
+        with conn:
+            for start in range(0, len(rows), ROWS_PER_STATEMENT):
+                chunk = rows[start:start + ROWS_PER_STATEMENT]
+                conn.execute(
+                    f'INSERT OR IGNORE INTO model_executions ({", ".join(COLUMNS)}) '
+                    f'VALUES {",".join([row_placeholders] * len(chunk))}',
+                    [value for row in chunk for value in row]
+                )
+
+
+class WriteBehindSink:
+    """Buffer acotado + hilo que vuelca en bloque con ``writer.write(filas)``"""
+
+    def __init__(self, writer, max_batch=500, flush_interval=1.0, max_pending=50000, max_payload_bytes=65536):
+        self.writer = writer
+        self.max_batch = max(1, int(max_batch))
+        self.flush_interval = float(flush_interval)
+        self.max_pending = max(self.max_batch, int(max_pending))
+        self.max_payload_bytes = int(max_payload_bytes)
+
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()
+        self._pid = None
+
+        # Estadísticas
+        self.accepted = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_flush_ms = 0.0
+
+    def offer(self, record, input_payload=None, output_payload=None):
+        """Encola un registro y sus payloads serializados sin bloquear; False si se ha descartado"""
+        self._ensure_started()
+        if len(self._pending) >= self.max_pending:
+            # Lleno: ni siquiera se serializa (se vuelve a comprobar con el lock)
+            with self._lock:
+                self.dropped += 1
+            return False
+        item = (record,
+                payload_json(input_payload, self.max_payload_bytes),
+                payload_json(output_payload, self.max_payload_bytes),
+                error_message(record, output_payload))
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending.append(item)
+            self.accepted += 1
+            if len(self._pending) >= self.max_batch:
+                self._ready.notify()
+        return True
+
+    def _ensure_started(self):
+        # Hilo creado en el primer uso, y de nuevo tras un fork (como MicroBatcher)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Proceso hijo: los pendientes heredados son del padre
+                self._pending = deque()
+            threading.Thread(target=self._run, name='execution-sink', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _take(self):
+        return [self._pending.popleft() for _ in range(min(len(self._pending), self.max_batch))]
+
+    def _run(self):
+        backoff = 0.0
+        while True:
+            if backoff:
+                # Tras un fallo se espera siempre, aunque el buffer esté lleno
+                time.sleep(backoff)
+            with self._ready:
+                if len(self._pending) < self.max_batch:
+                    self._ready.wait(self.flush_interval)
+                batch = self._take()
+            if batch:
+                backoff = 0.0 if self._write(batch) else min(max(backoff * 2, 1.0), 30.0)
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            with self._write_lock:
+                self.writer.write([execution_row(*item) for item in batch])
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            with self._lock:
+                # Se reintentan mientras quepan; los más recientes tienen prioridad
+                room = self.max_pending - len(self._pending)
+                keep = batch[-room:] if room > 0 else []
+                self.dropped += len(batch) - len(keep)
+                self._pending.extendleft(reversed(keep))
+            return False
+        self.written += len(batch)
+        self.flushes += 1
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+        return True
+
+    def flush(self):
+        """Vuelca todo lo pendiente en el hilo actual (p. ej. al parar)"""
+        while True:
+            with self._lock:
+                batch = self._take()
+            if not batch or not self._write(batch):
+                return
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'max_pending': self.max_pending,
+            'accepted': self.accepted,
+            'written': self.written,
+            'dropped': self.dropped,
+            'flushes': self.flushes,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'last_flush_ms': round(self.last_flush_ms, 3)
+        }
@@ -0,0 +1,78 @@
+"""
+Gunicorn configuration - production serving mode
+================================================
+
+Uso:
+    gunicorn -c gunicorn.conf.py mock_server:app
+
+Variables de entorno:
+    MODEL_SERVER_PORT      Puerto (8080)
+    MODEL_SERVER_WORKERS   Procesos worker (nº de CPUs)
+    MODEL_SERVER_THREADS   Hilos por worker (8)
+    MODEL_SERVER_TIMEOUT   Timeout de worker en segundos (60)
+
+La aplicación (y los modelos) se cargan una sola vez en el proceso padre
+(preload_app) y los workers la comparten copy-on-write tras el fork.
+
+Cada stream SSE del dashboard (/api/v1/executions/stream) ocupa uno de los
+``threads`` hilos de su worker durante MODEL_SERVER_FEED_STREAM_SECONDS (60 s)
+y no atiende predicciones mientras tanto. MODEL_SERVER_FEED_MAX_STREAMS (2)
+limita los streams por worker; el resto de dashboards reciben 503 y pasan a
+polling. Con muchos dashboards abiertos, mejor servir el feed con
+async_server.py, donde un stream es una tarea y no un hilo.
+"""
+
+import gc
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = f"0.0.0.0:{os.environ.get('MODEL_SERVER_PORT', '8080')}"
+workers = int(os.environ.get('MODEL_SERVER_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('MODEL_SERVER_THREADS', 8))
+worker_class = 'gthread'
+timeout = int(os.environ.get('MODEL_SERVER_TIMEOUT', 60))
+preload_app = True
+
+# Directorio donde cada worker publica su estado (métricas, execution log)
+# para que /health, /metrics y el dashboard muestren totales globales.
+# Se fija antes de cargar la app porque mock_server lo lee al importarse.
+_created_state_dir = 'MODEL_SERVER_STATE_DIR' not in os.environ
+if _created_state_dir:
+    os.environ['MODEL_SERVER_STATE_DIR'] = tempfile.mkdtemp(prefix='model-server-state-')
+
+
+def when_ready(server):
+    # Mueve los objetos ya cargados (modelos incluidos) a la generación
+    # permanente del GC para que los workers no toquen esas páginas
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Model server ready: {workers} workers x {threads} threads")
+
+
+def post_fork(server, worker):
+    import mock_server
+    # Primero los pools de procesos: su fork debe ocurrir antes de que el
+    # worker arranque ningún hilo (el de cluster, los de gthread)
+    mock_server.start_process_pools()
+    if mock_server.cluster is not None:
+        mock_server.cluster.start()
+
+
+def worker_exit(server, worker):
+    # Último volcado de estado para no perder los contadores del worker
+    import mock_server
+    if mock_server.cluster is not None:
+        mock_server.cluster.write()
+
+
+def child_exit(server, worker):
+    from cluster import mark_dead
+    mark_dead(os.environ['MODEL_SERVER_STATE_DIR'], worker.pid)
+
+
+def on_exit(server):
+    if _created_state_dir:
+        shutil.rmtree(os.environ['MODEL_SERVER_STATE_DIR'], ignore_errors=True)
@@ -0,0 +1,396 @@
+"""
+Input Schema
+============
+
+Validación y conversión de la entrada de un modelo a partir de la
+descripción de sus features, en el formato ``input_features`` de
+``*_metadata.json`` (name, position, type, min, max, mean; opcionalmente
+``default``).
+
+Una feature ausente toma su ``default``; sin él es obligatoria. La ``mean``
+de los metadatos solo se usa como valor por defecto con ``fill_means``
+(opt-in): si no, una petición vacía o con claves mal escritas se
+predeciría con las medias sin avisar. Con ``strict``, una clave que no es
+una feature del modelo es un error en lugar de ignorarse.
+
+El esquema se compila una sola vez por modelo: cada campo queda con su
+conversor, su rango y su valor por defecto, y cada petición se recorre una
+vez (por sus propias claves) para producir directamente el vector tipado.
+Todos los errores se acumulan y se devuelven juntos (HTTP 400) antes de que
+la petición llegue a la caché, al micro-batcher o a la inferencia.
+
+Rango (min / max), según ``range_mode``:
+
+- 'off': no se comprueba
+- 'clip': el valor se recorta al rango
+- 'reject': un valor fuera de rango es un error
+"""
+
+import math
+import numbers
+import re
+
+RANGE_MODES = ('off', 'clip', 'reject')
+
+# Errores que se devuelven como mucho en una respuesta (lotes grandes)
+MAX_ERRORS = 20
+
+
+def feature_key(name):
+    """Convierte 'sepal length (cm)' en la clave JSON 'sepal_length'"""
+    name = re.sub(r'\(.*?\)', '', name)
+    return re.sub(r'\W+', '_', name.strip().lower()).strip('_')
+
+
+class ValidationError(ValueError):
+    """Entrada no válida (HTTP 400); ``errors`` es una lista de (campo, mensaje)"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)[:MAX_ERRORS]
+        super().__init__('Invalid input: ' + '; '.join(
+            f'{field}: {message}' if field else message for field, message in self.errors
+        ))
+
+    def to_dict(self):
+        return {
+            'error': str(self),
+            'details': [{'field': field, 'message': message} for field, message in self.errors]
+        }
+
+
+# ============================================================================
+# CONVERSORES
+# ============================================================================
+
+def _is_bool(value):
+    # También numpy.bool_, que no es subclase de bool
+    return isinstance(value, bool) or type(value).__name__ == 'bool_'
+
+
+def _to_float(value):
+    if _is_bool(value) or not isinstance(value, (numbers.Real, str)):
+        raise TypeError
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError
+    return value
+
+
+def _to_int(value):
+    if isinstance(value, numbers.Integral) and not _is_bool(value):
+        return int(value)
+    value = _to_float(value)
+    if not value.is_integer():
+        raise ValueError
+    return int(value)
+
+
+_TRUE = ('true', '1', 'yes')
+_FALSE = ('false', '0', 'no')
+
+
+def _to_bool(value):
+    if _is_bool(value):
+        return bool(value)
+    if isinstance(value, numbers.Integral) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.lower() in _TRUE + _FALSE:
+        return value.lower() in _TRUE
+    raise ValueError
+
+
+def _to_str(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, numbers.Real) and not _is_bool(value):
+        return str(value)
+    raise TypeError
+
+
+CONVERTERS = {
+    'float': _to_float,
+    'int': _to_int,
+    'bool': _to_bool,
+    'str': _to_str
+}
+
+TYPE_ALIASES = {
+    'double': 'float', 'number': 'float', 'numeric': 'float',
+    'integer': 'int',
+    'boolean': 'bool',
+    'string': 'str', 'category': 'str', 'categorical': 'str', 'text': 'str'
+}
+
+
+def _describe(value):
+    text = repr(value) if not isinstance(value, str) else f"'{value}'"
+    return 'null' if value is None else (text if len(text) <= 40 else text[:37] + '...')
+
+
+class Field:
+    """Un campo compilado: clave, conversor, rango y valor por defecto"""
+
+    __slots__ = ('key', 'name', 'kind', 'convert', 'minimum', 'maximum', 'default', 'required', 'range_mode',
+                 'mean')
+
+    def __init__(self, spec, range_mode, fill_means=False):
+        self.name = spec['name']
+        self.key = feature_key(self.name)
+        kind = str(spec.get('type', 'float')).lower()
+        self.kind = TYPE_ALIASES.get(kind, kind)
+        if self.kind not in CONVERTERS:
+            raise ValueError(f"Unsupported type '{spec.get('type')}' for feature '{self.name}'")
+        self.convert = CONVERTERS[self.kind]
+
+        numeric = self.kind in ('float', 'int')
+        self.minimum = float(spec['min']) if numeric and spec.get('min') is not None else None
+        self.maximum = float(spec['max']) if numeric and spec.get('max') is not None else None
+        self.range_mode = range_mode if self.minimum is not None or self.maximum is not None else 'off'
+
+        self.mean = float(spec['mean']) if numeric and spec.get('mean') is not None else None
+        default = spec.get('default')
+        if default is None and fill_means:
+            default = self.mean
+        if self.kind == 'int' and isinstance(default, float):
+            default = round(default)  # La media de una feature entera
+        self.default = self.convert(default) if default is not None else None
+        self.required = default is None
+
+    def coerce(self, value):
+        """Valor convertido (y recortado, según el modo de rango); ValueError si no es válido"""
+        try:
+            value = self.convert(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'expected {self.kind}, got {_describe(value)}') from None
+        if self.range_mode == 'off':
+            return value
+        low = self.minimum is not None and value < self.minimum
+        high = self.maximum is not None and value > self.maximum
+        if not (low or high):
+            return value
+        if self.range_mode == 'clip':
+            return self.convert(self.minimum if low else self.maximum)
+        raise ValueError(f'must be within [{_bound(self.minimum, "-inf")}, {_bound(self.maximum, "inf")}], got {value}')
+
+
+def _bound(value, unbounded):
+    return unbounded if value is None else f'{value:g}'
+
+
+# ============================================================================
+# ESQUEMA
+# ============================================================================
+
+class InputSchema:
+    """Validador y conversor compilado de la entrada de un modelo"""
+
+    def __init__(self, features, range_mode='off', fill_means=False, strict=False):
+        if range_mode not in RANGE_MODES:
+            raise ValueError(f"range_mode must be one of {', '.join(RANGE_MODES)}")
+        self.range_mode = range_mode
+        self.strict = strict
+        self.fields = [Field(spec, range_mode, fill_means)
+                       for spec in sorted(features, key=lambda f: f.get('position', 0))]
+        self.keys = [field.key for field in self.fields]
+        self.defaults = [field.default for field in self.fields]
+        self.means = [field.mean for field in self.fields]
+        self._required = [i for i, field in enumerate(self.fields) if field.required]
+
+        # Clave normalizada y nombre original -> posición
+        self._index = {}
+        for i, field in enumerate(self.fields):
+            self._index.setdefault(field.key, i)
+            self._index.setdefault(field.name, i)
+
+    def vector(self, data):
+        """Valores tipados en el orden de las features
+
+        Acepta ``{"features": [...]}`` ya ordenado o un valor por feature
+        (clave normalizada o nombre original); las ausentes toman su valor
+        por defecto.
+        """
+        return self._values(data, self.strict)
+
+    def _values(self, data, strict):
+        if not isinstance(data, dict):
+            raise ValidationError([(None, f'Input must be a JSON object, got {type(data).__name__}')])
+        if 'features' in data and 'features' not in self._index:
+            return self._positional(data['features'])
+
+        values = list(self.defaults)
+        errors = []
+        for key, value in data.items():
+            i = self._index.get(key)
+            if i is None:
+                if strict:
+                    errors.append((key, 'is not a feature of this model'))
+                continue
+            try:
+                values[i] = self.fields[i].coerce(value)
+            except ValueError as e:
+                errors.append((self.fields[i].key, str(e)))
+        for i in self._required:
+            if values[i] is None and not any(e[0] == self.keys[i] for e in errors):
+                errors.append((self.keys[i], 'is required'))
+        if errors:
+            raise ValidationError(errors)
+        return values
+
+    def _positional(self, features):
+        if not isinstance(features, (list, tuple)) and not hasattr(features, 'tolist'):
+            raise ValidationError([('features', 'must be an array')])
+        if len(features) != len(self.fields):
+            raise ValidationError([('features', f'expected {len(self.fields)} values, got {len(features)}')])
+        values, errors = [], []
+        for field, value in zip(self.fields, features):
+            try:
+                values.append(field.coerce(value))
+            except ValueError as e:
+                errors.append((field.key, str(e)))
+        if errors:
+            raise ValidationError(errors)
+        return values
+
+    def record(self, data):
+        """Registro con los campos tipados (y los demás campos, sin tocar)"""
+        values = self._values(data, strict=False)
+        record = {key: value for key, value in data.items() if key not in self._index}
+        record.update(zip(self.keys, values))
+        return record
+
+    def batch(self, batch):
+        """Lote de registros o columnar, validado y tipado
+
+        En un lote de registros, un elemento que no es un objeto se toma
+        como el valor del único campo del esquema (p. ej. textos sueltos).
+        """
+        if isinstance(batch, dict):
+            return self._columns(batch)
+        records, errors = [], []
+        for i, item in enumerate(batch):
+            if not isinstance(item, dict) and len(self.fields) == 1:
+                item = {self.keys[0]: item}
+            try:
+                records.append(self.record(item))
+            except ValidationError as e:
+                errors.extend((f'[{i}].{field}' if field else f'[{i}]', message) for field, message in e.errors)
+                if len(errors) >= MAX_ERRORS:
+                    break
+        if errors:
+            raise ValidationError(errors)
+        return records
+
+    def _columns(self, columns):
+        n = len(next(iter(columns.values()), []))
+        typed = {key: values for key, values in columns.items() if key not in self._index}
+        errors = []
+        for field in self.fields:
+            values = columns.get(field.key, columns.get(field.name))
+            if values is None:
+                if field.required:
+                    errors.append((field.key, 'is required'))
+                typed[field.key] = [field.default] * n
+                continue
+            if hasattr(values, 'tolist'):
+                values = values.tolist()
+            column = []
+            for i, value in enumerate(values):
+                try:
+                    column.append(field.coerce(value))
+                except ValueError as e:
+                    errors.append((f'[{i}].{field.key}', str(e)))
+            typed[field.key] = column
+        if errors:
+            raise ValidationError(errors)
+        return typed
+
+    def matrix(self, batch):
+        """Matriz float (n, features) de un lote de registros o columnar
+
+        Las columnas numéricas (listas JSON o arrays de Arrow) se comprueban
+        de una vez con NumPy, sin convertir valor a valor.
+        """
+        import numpy as np  # Import diferido: solo lo pagan los modelos usados
+
+        if not isinstance(batch, dict):
+            return np.asarray(self.batch_vectors(batch), dtype=float).reshape(len(batch), len(self.fields))
+
+        errors = []
+        if self.strict:
+            errors.extend((key, 'is not a feature of this model') for key in batch if key not in self._index)
+        arrays = {}
+        for key, values in batch.items():
+            try:
+                array = np.asarray(values)
+            except ValueError:
+                # Listas de distinta longitud: cada una será un valor no válido
+                array = np.asarray(values, dtype=object)
+            if array.ndim != 1:
+                # Un escalar, o filas anidadas que column_stack desplazaría a otras features
+                errors.append((key, 'must be an array of values'))
+            arrays[key] = array
+        if errors:
+            raise ValidationError(errors)
+        lengths = {len(v) for v in arrays.values()}
+        if len(lengths) != 1:
+            raise ValidationError([(None, 'All columns must have the same length')])
+        n = lengths.pop()
+        columns = []
+        for field in self.fields:
+            column = arrays.get(field.key, arrays.get(field.name))
+            if column is None:
+                if field.required:
+                    errors.append((field.key, 'is required'))
+                columns.append(np.full(n, field.default if field.default is not None else np.nan, dtype=float))
+                continue
+            if column.dtype.kind in 'iuf':
+                column = column.astype(float)
+                bad = ~np.isfinite(column)
+                if field.kind == 'int':
+                    bad |= column != np.round(column)
+                errors.extend((f'[{i}].{field.key}', f'expected {field.kind}, got {column[i]!r}')
+                              for i in np.flatnonzero(bad)[:MAX_ERRORS])
+                column = self._check_range(field, column, errors, np)
+            else:
+                column = np.asarray(self._coerce_column(field, column, errors), dtype=float)
+            columns.append(column)
+        if errors:
+            raise ValidationError(errors)
+        return np.column_stack(columns) if columns else np.empty((n, 0))
+
+    def batch_vectors(self, batch):
+        """Vectores tipados de un lote de registros"""
+        vectors, errors = [], []
+        for i, record in enumerate(batch):
+            try:
+                vectors.append(self.vector(record))
+            except ValidationError as e:
+                errors.extend((f'[{i}].{field}' if field else f'[{i}]', message) for field, message in e.errors)
+                if len(errors) >= MAX_ERRORS:
+                    break
+        if errors:
+            raise ValidationError(errors)
+        return vectors
+
+    def _coerce_column(self, field, values, errors):
+        column = []
+        for i, value in enumerate(values.tolist() if hasattr(values, 'tolist') else values):
+            try:
+                column.append(float(field.coerce(value)))
+            except ValueError as e:
+                errors.append((f'[{i}].{field.key}', str(e)))
+                column.append(math.nan)
+        return column
+
+    @staticmethod
+    def _check_range(field, column, errors, np):
+        if field.range_mode == 'off':
+            return column
+        low = field.minimum if field.minimum is not None else -np.inf
+        high = field.maximum if field.maximum is not None else np.inf
+        if field.range_mode == 'clip':
+            return np.clip(column, low, high)
+        for i in np.flatnonzero((column < low) | (column > high))[:MAX_ERRORS]:
+            errors.append((f'[{i}].{field.key}',
+                           f'must be within [{_bound(field.minimum, "-inf")}, {_bound(field.maximum, "inf")}], got {column[i]:g}'))
+        return column
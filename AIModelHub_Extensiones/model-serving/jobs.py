@@ -0,0 +1,313 @@
+"""
+Job Queue
+=========
+
+Ejecuciones asíncronas (submit / poll / cancel) con cola persistente en SQLite.
+
+- Los trabajos sobreviven a un reinicio o a la caída de su proceso: cada
+  trabajo en curso tiene un dueño (el proceso que lo ejecuta) y un lease que
+  ese proceso renueva mientras vive; un trabajo con el lease vencido vuelve
+  a poder reclamarse y se ejecuta de nuevo
+- Pool de hilos con prioridades (mayor prioridad primero, FIFO a igualdad)
+  y un límite de ejecuciones simultáneas por modelo
+- Estados y columnas como la tabla model_executions de la base de datos:
+  pending, running, success, error (y cancelled)
+
+Varios procesos (p. ej. los workers de gunicorn) pueden compartir el mismo
+fichero: cada trabajo se reclama en una transacción IMMEDIATE, que además
+cuenta los trabajos en curso del modelo en todos los procesos, así que un
+trabajo nunca lo ejecutan dos procesos a la vez y los límites por modelo
+son globales.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    model TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    priority INTEGER NOT NULL DEFAULT 0,
+    input_payload TEXT,
+    output_payload TEXT,
+    error_message TEXT,
+    http_status_code INTEGER,
+    execution_time_ms INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    completed_at REAL,
+    owner TEXT,
+    lease_expires REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, priority DESC, seq);
+"""
+
+FINISHED = ('success', 'error', 'cancelled')
+
+
+class UnknownModel(KeyError):
+    """El trabajo pide un modelo que el servidor no ofrece"""
+
+
+class JobQueue:
+    """Cola persistente con un pool de hilos que ejecuta ``runner(model, data)``"""
+
+    def __init__(self, path, runner, workers=4, model_concurrency=None, retention=86400.0,
+                 poll_interval=0.5, lease=30.0, on_complete=None):
+        self.path = path
+        self.runner = runner
+        self.workers = max(1, int(workers))
+        self.model_concurrency = dict(model_concurrency or {})
+        self.retention = float(retention)
+        self.poll_interval = poll_interval
+        self.lease = float(lease)
+        self.on_complete = on_complete
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._running = {}     # modelo -> ejecuciones en curso en este proceso
+        self._owner = None     # dueño de los trabajos de este proceso (pid + sufijo único)
+        self._pid = None
+        self._last_purge = 0.0
+
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+
+    def _connection(self):
+        # Una conexión por hilo (y por proceso: no se heredan tras un fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def submit(self, model, data, priority=0):
+        """Encola un trabajo y devuelve su descripción"""
+        self.start()
+        job_id = uuid.uuid4().hex
+        self._connection().execute(
+            'INSERT INTO jobs (id, model, priority, input_payload, created_at) VALUES (?, ?, ?, ?, ?)',
+            (job_id, model, int(priority), json.dumps(data), time.time())
+        )
+        with self._wakeup:
+            self._wakeup.notify()
+        return self.get(job_id)
+
+    def get(self, job_id, include_input=False):
+        """Descripción del trabajo, o None si no existe"""
+        row = self._connection().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return _describe(row, include_input) if row is not None else None
+
+    def cancel(self, job_id):
+        """Cancela un trabajo pendiente o en curso
+
+        Devuelve la descripción, o None si no existe. Un trabajo en curso no
+        se interrumpe, pero su resultado se descarta.
+        """
+        self._connection().execute(
+            "UPDATE jobs SET status = 'cancelled', completed_at = ? WHERE id = ? AND status IN ('pending', 'running')",
+            (time.time(), job_id)
+        )
+        return self.get(job_id)
+
+    def list(self, status=None, model=None, limit=50):
+        """Trabajos más recientes primero, opcionalmente filtrados"""
+        query, params = 'SELECT * FROM jobs', []
+        conditions = []
+        if status is not None:
+            conditions.append('status = ?')
+            params.append(status)
+        if model is not None:
+            conditions.append('model = ?')
+            params.append(model)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY seq DESC LIMIT ?'
+        params.append(int(limit))
+        return [_describe(row) for row in self._connection().execute(query, params)]
+
+    def stats(self):
+        counts = dict(self._connection().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        with self._lock:
+            running = {model: count for model, count in self._running.items() if count}
+        return {
+            'path': self.path,
+            'workers': self.workers,
+            'model_concurrency': self.model_concurrency,
+            'lease_seconds': self.lease,
+            'owner': self._owner,
+            'by_status': counts,
+            'running_here': running
+        }
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Arranca el pool en este proceso (idempotente; de nuevo tras un fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._running = {}
+            self._owner = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+            for i in range(self.workers):
+                threading.Thread(target=self._run, name=f'jobs-{i}', daemon=True).start()
+            threading.Thread(target=self._renew_leases, name='jobs-lease', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _claim(self):
+        """Reclama el siguiente trabajo ejecutable, o None
+
+        Ejecutables: los pendientes y los 'running' con el lease vencido (su
+        proceso ha muerto), salvo los de modelos que ya tienen en curso, entre
+        todos los procesos, tantos trabajos como su límite.
+        """
+        conn = self._connection()
+        now = time.time()
+        query = ("SELECT id, model FROM jobs WHERE"
+                 " (status = 'pending' OR (status = 'running' AND COALESCE(lease_expires, 0) < ?))")
+        params = [now]
+        if self.model_concurrency:
+            limits = ', '.join('(?, ?)' for _ in self.model_concurrency)
+            query = (f'WITH limits (model, max_running) AS (VALUES {limits}) ' + query +
+                     " AND model NOT IN (SELECT jobs.model FROM jobs JOIN limits USING (model)"
+                     " WHERE jobs.status = 'running' AND jobs.lease_expires >= ?"
+                     " GROUP BY jobs.model HAVING COUNT(*) >= MAX(limits.max_running))")
+            params = [value for item in self.model_concurrency.items() for value in item] + params + [now]
+        query += ' ORDER BY priority DESC, seq LIMIT 1'
+
+        # IMMEDIATE: toma el lock de escritura antes de leer, así ningún otro
+        # proceso reclama entre la consulta y el UPDATE
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(query, params).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, started_at = ?, lease_expires = ? WHERE id = ?",
+                    (self._owner, now, now + self.lease, row['id'])
+                )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        if row is None:
+            return None
+        with self._lock:
+            self._running[row['model']] = self._running.get(row['model'], 0) + 1
+        return row['id'], row['model']
+
+    def _renew_leases(self):
+        # Renueva a la vez los leases de todos los trabajos en curso del proceso
+        while True:
+            time.sleep(self.lease / 3)
+            try:
+                self._connection().execute(
+                    "UPDATE jobs SET lease_expires = ? WHERE owner = ? AND status = 'running'",
+                    (time.time() + self.lease, self._owner)
+                )
+            except sqlite3.Error as e:
+                print(f"⚠ Could not renew job leases: {e}")
+
+    def _run(self):
+        while True:
+            claimed = self._claim()
+            if claimed is None:
+                self._purge()
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+            job_id, model = claimed
+            try:
+                self._execute(job_id, model)
+            finally:
+                with self._wakeup:
+                    self._running[model] -= 1
+                    # Puede haber trabajos de este modelo esperando su turno
+                    self._wakeup.notify()
+
+    def _execute(self, job_id, model):
+        conn = self._connection()
+        payload = conn.execute('SELECT input_payload FROM jobs WHERE id = ?', (job_id,)).fetchone()[0]
+        start = time.perf_counter()
+        try:
+            result = self.runner(model, json.loads(payload))
+            status, output, error, code = 'success', json.dumps(result), None, 200
+        except UnknownModel as e:
+            status, output, error, code = 'error', None, str(e), 404
+        except Exception as e:
+            status, output, error, code = 'error', None, str(e), 500
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        # Si se canceló mientras se ejecutaba (o venció el lease y lo reclamó
+        # otro proceso), el resultado se descarta
+        updated = conn.execute(
+            'UPDATE jobs SET status = ?, output_payload = ?, error_message = ?, http_status_code = ?,'
+            " execution_time_ms = ?, completed_at = ?, lease_expires = NULL"
+            " WHERE id = ? AND status = 'running' AND owner = ?",
+            (status, output, error, code, int(round(duration_ms)), time.time(), job_id, self._owner)
+        ).rowcount
+        if updated and self.on_complete is not None:
+            self.on_complete(model, status, round(duration_ms, 2))
+
+    def _purge(self):
+        now = time.time()
+        if self.retention <= 0 or now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        self._connection().execute(
+            'DELETE FROM jobs WHERE status IN (?, ?, ?) AND completed_at < ?',
+            FINISHED + (now - self.retention,)
+        )
+
+
+def _describe(row, include_input=False):
+    job = {
+        'job_id': row['id'],
+        'model': row['model'],
+        'status': row['status'],
+        'priority': row['priority'],
+        'created_at': _isoformat(row['created_at']),
+        'started_at': _isoformat(row['started_at']),
+        'completed_at': _isoformat(row['completed_at']),
+        'execution_time_ms': row['execution_time_ms']
+    }
+    if row['status'] == 'success':
+        job['result'] = json.loads(row['output_payload'])
+    elif row['status'] == 'error':
+        job['error'] = row['error_message']
+        job['http_status_code'] = row['http_status_code']
+    if include_input:
+        job['input'] = json.loads(row['input_payload'])
+    return job
+
+
+def _isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
+
+def parse_concurrency(spec):
+    """'Modelo A=1,Modelo B=2' -> {'Modelo A': 1, 'Modelo B': 2}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, value = item.rpartition('=')
+        limits[name.strip()] = int(value)
+    return limits
@@ -0,0 +1,63 @@
+"""
+Keyword Matcher
+===============
+
+Detección de palabras clave por polaridad con un único patrón compilado.
+
+El léxico ({"positive": [...], "negative": [...]}) se compila una vez en una
+alternancia con límites de palabra: el texto se recorre una sola vez, sin
+pasarlo a minúsculas ni copiarlo, sea cual sea el número de términos.
+"""
+
+import json
+import re
+
+DEFAULT_LEXICON = {
+    'positive': ['good', 'great', 'excellent', 'love', 'amazing', 'wonderful', 'happy'],
+    'negative': ['bad', 'terrible', 'hate', 'awful', 'horrible', 'sad', 'angry']
+}
+
+
+def load_lexicon(path=None):
+    """Léxico desde un JSON {polaridad: [términos]}, o el de por defecto"""
+    if not path:
+        return DEFAULT_LEXICON
+    with open(path, 'r', encoding='utf-8') as f:
+        lexicon = json.load(f)
+    if not isinstance(lexicon, dict) or not all(isinstance(terms, list) for terms in lexicon.values()):
+        raise ValueError(f'Lexicon {path} must be a JSON object of term lists')
+    return lexicon
+
+
+class KeywordMatcher:
+    """Cuenta apariciones de los términos de cada polaridad en un texto"""
+
+    def __init__(self, lexicon):
+        self.labels = list(lexicon)
+        self.polarity = {}
+        for label, terms in lexicon.items():
+            for term in terms:
+                self.polarity[term.casefold()] = label
+        # Los términos más largos primero: "not good" gana a "good"
+        terms = sorted(self.polarity, key=len, reverse=True)
+        self.pattern = re.compile(
+            r'(?<!\w)(?:' + '|'.join(re.escape(term) for term in terms) + r')(?!\w)',
+            re.IGNORECASE
+        ) if terms else None
+
+    def count(self, text, max_chars=None):
+        """Apariciones por polaridad en los primeros ``max_chars`` caracteres
+
+        Devuelve (contadores, caracteres analizados). El límite se ajusta al
+        último espacio para no partir una palabra.
+        """
+        counts = dict.fromkeys(self.labels, 0)
+        end = len(text)
+        if max_chars is not None and end > max_chars:
+            boundary = text.rfind(' ', 0, max_chars + 1)
+            end = boundary if boundary > 0 else max_chars
+        if self.pattern is not None:
+            polarity = self.polarity
+            for match in self.pattern.finditer(text, 0, end):
+                counts[polarity[match.group().casefold()]] += 1
+        return counts, end
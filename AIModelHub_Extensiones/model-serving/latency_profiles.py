@@ -0,0 +1,215 @@
+"""
+Latency Profiles
+================
+
+Perfiles de latencia simulada por modelo, configurables y reproducibles.
+
+Tipos de perfil:
+- uniform:    {"type": "uniform", "low_ms": 500, "high_ms": 1500}
+- fixed:      {"type": "fixed", "ms": 800}
+- lognormal:  {"type": "lognormal", "median_ms": 600, "sigma": 0.35,
+               "tail_probability": 0.01, "tail_multiplier": 6, "max_ms": 10000}
+- trace:      {"type": "trace", "file": "traces/asr.txt"}  (una latencia en ms
+              por línea, o una lista JSON; se reproduce en bucle)
+- zero:       {"type": "zero"}  (sin latencia, para pruebas de throughput)
+
+Cada perfil usa su propio generador aleatorio, sembrado a partir de la
+semilla global y del nombre del modelo: con la misma semilla y el mismo
+orden de peticiones, las latencias de un proceso se repiten exactamente.
+El generador se comparte entre los hilos del proceso con un lock, y en un
+proceso hijo (workers de gunicorn, pools de procesos) se vuelve a sembrar
+mezclando su pid, para que los workers no repitan la misma secuencia.
+
+Ver latency_profiles.example.json.
+"""
+
+import itertools
+import json
+import math
+import os
+import random
+import threading
+import zlib
+
+
+class SharedRandom:
+    """Generador de un perfil: seguro entre hilos y distinto en cada proceso hijo"""
+
+    def __init__(self, seed=None):
+        self.seed = seed
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def _generator(self):
+        if self._pid != os.getpid():
+            # Tras un fork: el hijo heredaría la secuencia del padre (y quizá su lock cogido)
+            self._lock = threading.Lock()
+            self._rng = random.Random(None if self.seed is None else f'{self.seed}:{os.getpid()}')
+            self._pid = os.getpid()
+        return self._rng
+
+    def uniform(self, a, b):
+        rng = self._generator()
+        with self._lock:
+            return rng.uniform(a, b)
+
+    def gauss(self, mu, sigma):
+        rng = self._generator()
+        with self._lock:
+            return rng.gauss(mu, sigma)
+
+    def random(self):
+        rng = self._generator()
+        with self._lock:
+            return rng.random()
+
+
+class LatencyProfile:
+    """Base: ``sample()`` devuelve segundos de latencia"""
+
+    kind = 'zero'
+
+    def sample(self):
+        return 0.0
+
+    def describe(self):
+        return {'type': self.kind}
+
+
+class UniformProfile(LatencyProfile):
+    kind = 'uniform'
+
+    def __init__(self, rng, low_ms, high_ms):
+        self.rng = rng
+        self.low = low_ms / 1000
+        self.high = high_ms / 1000
+
+    def sample(self):
+        return self.rng.uniform(self.low, self.high)
+
+    def describe(self):
+        return {'type': self.kind, 'low_ms': self.low * 1000, 'high_ms': self.high * 1000}
+
+
+class FixedProfile(LatencyProfile):
+    kind = 'fixed'
+
+    def __init__(self, ms):
+        self.value = ms / 1000
+
+    def sample(self):
+        return self.value
+
+    def describe(self):
+        return {'type': self.kind, 'ms': self.value * 1000}
+
+
+class LognormalProfile(LatencyProfile):
+    """Lognormal alrededor de la mediana, con una cola opcional de outliers"""
+
+    kind = 'lognormal'
+
+    def __init__(self, rng, median_ms, sigma=0.3, tail_probability=0.0, tail_multiplier=1.0, max_ms=None):
+        self.rng = rng
+        self.median = median_ms / 1000
+        self.sigma = sigma
+        self.tail_probability = tail_probability
+        self.tail_multiplier = tail_multiplier
+        self.max = max_ms / 1000 if max_ms is not None else None
+
+    def sample(self):
+        value = self.median * math.exp(self.sigma * self.rng.gauss(0.0, 1.0))
+        if self.tail_probability and self.rng.random() < self.tail_probability:
+            value *= self.tail_multiplier
+        if self.max is not None:
+            value = min(value, self.max)
+        return value
+
+    def describe(self):
+        return {
+            'type': self.kind,
+            'median_ms': self.median * 1000,
+            'sigma': self.sigma,
+            'tail_probability': self.tail_probability,
+            'tail_multiplier': self.tail_multiplier,
+            'max_ms': self.max * 1000 if self.max is not None else None
+        }
+
+
+class TraceProfile(LatencyProfile):
+    """Reproduce en bucle una traza de latencias grabada (ms)"""
+
+    kind = 'trace'
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'r') as f:
+            content = f.read()
+        if content.lstrip().startswith('['):
+            values = json.loads(content)
+        else:
+            values = [line.strip() for line in content.splitlines()]
+            values = [value for value in values if value and not value.startswith('#')]
+        self.values = [float(value) / 1000 for value in values]
+        if not self.values:
+            raise ValueError(f'Latency trace {path} is empty')
+        # next() sobre itertools.count es atómico: seguro entre hilos
+        self._counter = itertools.count()
+
+    def sample(self):
+        return self.values[next(self._counter) % len(self.values)]
+
+    def describe(self):
+        return {'type': self.kind, 'file': self.path, 'samples': len(self.values)}
+
+
+def build_profile(spec, model_name, seed=None, base_dir='.'):
+    """Crea un perfil a partir de su especificación JSON"""
+    kind = spec.get('type', 'uniform')
+    # Semilla propia por modelo: las secuencias no dependen de otros modelos
+    rng = SharedRandom(None if seed is None else seed ^ zlib.crc32(model_name.encode('utf-8')))
+
+    if kind == 'zero':
+        return LatencyProfile()
+    if kind == 'fixed':
+        return FixedProfile(float(spec['ms']))
+    if kind == 'uniform':
+        return UniformProfile(rng, float(spec['low_ms']), float(spec['high_ms']))
+    if kind == 'lognormal':
+        return LognormalProfile(
+            rng, float(spec['median_ms']),
+            sigma=float(spec.get('sigma', 0.3)),
+            tail_probability=float(spec.get('tail_probability', 0.0)),
+            tail_multiplier=float(spec.get('tail_multiplier', 1.0)),
+            max_ms=float(spec['max_ms']) if spec.get('max_ms') is not None else None
+        )
+    if kind == 'trace':
+        return TraceProfile(os.path.join(base_dir, spec['file']))
+    raise ValueError(f"Unknown latency profile type '{kind}' for {model_name}")
+
+
+def load_profiles(default_ranges, config=None, seed=None):
+    """Perfiles de cada modelo
+
+    ``default_ranges`` es {modelo: (min_s, max_s)}: sin configuración se usa
+    una uniforme en ese rango. ``config`` puede ser ``'zero'`` (sin latencia
+    en ningún modelo) o la ruta de un JSON {modelo: spec}, con ``"*"`` como
+    spec por defecto para los modelos no listados.
+    """
+    specs = {}
+    base_dir = '.'
+    if config == 'zero':
+        specs = {'*': {'type': 'zero'}}
+    elif config:
+        with open(config, 'r') as f:
+            specs = json.load(f)
+        base_dir = os.path.dirname(os.path.abspath(config))
+
+    profiles = {}
+    for model_name, (low, high) in default_ranges.items():
+        spec = specs.get(model_name, specs.get('*', {
+            'type': 'uniform', 'low_ms': low * 1000, 'high_ms': high * 1000
+        }))
+        profiles[model_name] = build_profile(spec, model_name, seed, base_dir)
+    return profiles
@@ -0,0 +1,300 @@
+"""
+Metrics
+=======
+
+Métricas del servidor de modelos en formato de texto Prometheus.
+
+- Latencias por modelo y endpoint con un sketch de memoria fija (buckets
+  logarítmicos con error relativo acotado, estilo DDSketch) para p50/p95/p99
+- Contadores de peticiones y errores
+- Gauges de peticiones en curso
+- Tiempo hasta el primer resultado parcial de las respuestas en streaming
+- Tiempo por etapa de cada petición (parse, validate, queue, inference...,
+  ver tracing.py)
+- Distribución del tamaño de payload de petición y respuesta
+
+Sin dependencias externas: el texto se genera directamente.
+"""
+
+import copy
+import math
+import threading
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Buckets (bytes) para los histogramas de tamaño de payload
+PAYLOAD_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class LatencySketch:
+    """Sketch de cuantiles con error relativo ``accuracy`` y memoria acotada
+
+    Cada valor cae en el bucket ``ceil(log(x) / log(gamma))``; con
+    ``max_bins`` buckets como máximo, los más bajos se fusionan entre sí.
+    Dos sketches con la misma precisión se pueden combinar sumando buckets.
+    """
+
+    def __init__(self, accuracy=0.01, max_bins=2048, min_value=1e-6):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.min_value = min_value
+        self.bins = {}
+        self.count = 0
+        self.sum = 0.0
+        self.zero_count = 0
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        if value <= self.min_value:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self.log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + 1
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        keys = sorted(self.bins)
+        lowest, target = keys[0], keys[1]
+        self.bins[target] += self.bins.pop(lowest)
+
+    def merge(self, other):
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.count += other.count
+        self.sum += other.sum
+        self.zero_count += other.zero_count
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def quantile(self, q):
+        if self.count == 0:
+            return float('nan')
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                # Punto medio del bucket: garantiza el error relativo
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+
+class Histogram:
+    """Histograma acumulativo con buckets fijos (tipo histogram de Prometheus)"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+
+class MetricsRegistry:
+    """Almacén thread-safe de métricas etiquetadas por (modelo, endpoint)"""
+
+    def __init__(self, prefix='model_server'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.requests = {}          # (model, endpoint, code) -> count
+        self.errors = {}            # (model, endpoint) -> count
+        self.rejected = {}          # (model, endpoint, code) -> count (admission control)
+        self.in_flight = {}         # (model, endpoint) -> gauge
+        self.latency = {}           # (model, endpoint) -> LatencySketch
+        self.first_token = {}       # (model, endpoint) -> LatencySketch (streaming)
+        self.stages = {}            # (model, endpoint, stage) -> LatencySketch
+        self.request_bytes = {}     # (model, endpoint) -> Histogram
+        self.response_bytes = {}    # (model, endpoint) -> Histogram
+
+    def start(self, model, endpoint):
+        """Marca una petición en curso"""
+        key = (model, endpoint)
+        with self._lock:
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+
+    def finish(self, model, endpoint):
+        key = (model, endpoint)
+        with self._lock:
+            self.in_flight[key] = self.in_flight.get(key, 0) - 1
+
+    def observe(self, model, endpoint, status_code, duration, request_bytes=None, response_bytes=None):
+        """Registra una petición completada (duration en segundos)"""
+        key = (model, endpoint)
+        with self._lock:
+            code_key = (model, endpoint, str(status_code))
+            self.requests[code_key] = self.requests.get(code_key, 0) + 1
+            if status_code >= 400:
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+            sketch = self.latency.get(key)
+            if sketch is None:
+                sketch = self.latency[key] = LatencySketch()
+            sketch.add(duration)
+
+            if request_bytes is not None:
+                self._histogram(self.request_bytes, key).add(request_bytes)
+            if response_bytes is not None:
+                self._histogram(self.response_bytes, key).add(response_bytes)
+
+    def reject(self, model, endpoint, status_code):
+        """Registra una petición rechazada por el control de admisión (429/503)"""
+        key = (model, endpoint, str(status_code))
+        with self._lock:
+            self.rejected[key] = self.rejected.get(key, 0) + 1
+
+    def observe_first_token(self, model, endpoint, duration):
+        """Registra el tiempo hasta el primer resultado parcial (segundos)"""
+        key = (model, endpoint)
+        with self._lock:
+            sketch = self.first_token.get(key)
+            if sketch is None:
+                sketch = self.first_token[key] = LatencySketch()
+            sketch.add(duration)
+
+    def observe_stages(self, model, endpoint, durations):
+        """Registra el tiempo de cada etapa de una petición ({etapa: segundos})"""
+        with self._lock:
+            for stage, duration in durations.items():
+                key = (model, endpoint, stage)
+                sketch = self.stages.get(key)
+                if sketch is None:
+                    sketch = self.stages[key] = LatencySketch()
+                sketch.add(duration)
+
+    def _histogram(self, histograms, key):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(PAYLOAD_BUCKETS)
+        return histogram
+
+    def snapshot(self):
+        """Copia del estado actual, apta para pickle y para merge()"""
+        with self._lock:
+            return copy.deepcopy({
+                'requests': self.requests,
+                'errors': self.errors,
+                'rejected': self.rejected,
+                'in_flight': self.in_flight,
+                'latency': self.latency,
+                'first_token': self.first_token,
+                'stages': self.stages,
+                'request_bytes': self.request_bytes,
+                'response_bytes': self.response_bytes
+            })
+
+    def merge(self, snapshot, include_gauges=True):
+        """Acumula la instantánea de otro proceso en este registro"""
+        with self._lock:
+            for attr in ('requests', 'errors', 'rejected') + (('in_flight',) if include_gauges else ()):
+                target = getattr(self, attr)
+                for key, value in snapshot.get(attr, {}).items():
+                    target[key] = target.get(key, 0) + value
+            for attr in ('latency', 'first_token', 'stages', 'request_bytes', 'response_bytes'):
+                target = getattr(self, attr)
+                for key, value in snapshot.get(attr, {}).items():
+                    if key in target:
+                        target[key].merge(value)
+                    else:
+                        target[key] = copy.deepcopy(value)
+
+    def render(self):
+        """Todas las métricas en formato de exposición de texto Prometheus"""
+        p = self.prefix
+        lines = []
+        with self._lock:
+            lines.append(f'# HELP {p}_requests_total Requests handled per model, endpoint and status code.')
+            lines.append(f'# TYPE {p}_requests_total counter')
+            for (model, endpoint, code), count in sorted(self.requests.items()):
+                lines.append(f'{p}_requests_total{_labels(model=model, endpoint=endpoint, code=code)} {count}')
+
+            lines.append(f'# HELP {p}_request_errors_total Requests answered with a 4xx/5xx status.')
+            lines.append(f'# TYPE {p}_request_errors_total counter')
+            for (model, endpoint), count in sorted(self.errors.items()):
+                lines.append(f'{p}_request_errors_total{_labels(model=model, endpoint=endpoint)} {count}')
+
+            lines.append(f'# HELP {p}_rejected_requests_total Requests shed by admission control, per status code.')
+            lines.append(f'# TYPE {p}_rejected_requests_total counter')
+            for (model, endpoint, code), count in sorted(self.rejected.items()):
+                lines.append(f'{p}_rejected_requests_total{_labels(model=model, endpoint=endpoint, code=code)} {count}')
+
+            lines.append(f'# HELP {p}_in_flight_requests Requests currently being processed.')
+            lines.append(f'# TYPE {p}_in_flight_requests gauge')
+            for (model, endpoint), value in sorted(self.in_flight.items()):
+                lines.append(f'{p}_in_flight_requests{_labels(model=model, endpoint=endpoint)} {value}')
+
+            for name, sketches, help_text in (
+                ('request_duration_seconds', self.latency, 'Request latency (streaming quantile sketch).'),
+                ('time_to_first_token_seconds', self.first_token,
+                 'Time until the first partial result of a streamed response.'),
+            ):
+                lines.append(f'# HELP {p}_{name} {help_text}')
+                lines.append(f'# TYPE {p}_{name} summary')
+                for (model, endpoint), sketch in sorted(sketches.items()):
+                    for q in QUANTILES:
+                        labels = _labels(model=model, endpoint=endpoint, quantile=str(q))
+                        lines.append(f'{p}_{name}{labels} {_number(sketch.quantile(q))}')
+                    labels = _labels(model=model, endpoint=endpoint)
+                    lines.append(f'{p}_{name}_sum{labels} {_number(sketch.sum)}')
+                    lines.append(f'{p}_{name}_count{labels} {sketch.count}')
+
+            lines.append(f'# HELP {p}_stage_duration_seconds Time spent in each stage of a request.')
+            lines.append(f'# TYPE {p}_stage_duration_seconds summary')
+            for (model, endpoint, stage), sketch in sorted(self.stages.items()):
+                for q in QUANTILES:
+                    labels = _labels(model=model, endpoint=endpoint, stage=stage, quantile=str(q))
+                    lines.append(f'{p}_stage_duration_seconds{labels} {_number(sketch.quantile(q))}')
+                labels = _labels(model=model, endpoint=endpoint, stage=stage)
+                lines.append(f'{p}_stage_duration_seconds_sum{labels} {_number(sketch.sum)}')
+                lines.append(f'{p}_stage_duration_seconds_count{labels} {sketch.count}')
+
+            for name, histograms, help_text in (
+                ('request_payload_bytes', self.request_bytes, 'Request body size.'),
+                ('response_payload_bytes', self.response_bytes, 'Response body size.'),
+            ):
+                lines.append(f'# HELP {p}_{name} {help_text}')
+                lines.append(f'# TYPE {p}_{name} histogram')
+                for (model, endpoint), histogram in sorted(histograms.items()):
+                    _render_histogram(lines, f'{p}_{name}', histogram, model=model, endpoint=endpoint)
+        return '\n'.join(lines) + '\n'
+
+
+def _render_histogram(lines, name, histogram, **labels):
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{_labels(**labels, le=str(bound))} {cumulative}')
+    lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {histogram.count}')
+    lines.append(f'{name}_sum{_labels(**labels)} {_number(histogram.sum)}')
+    lines.append(f'{name}_count{_labels(**labels)} {histogram.count}')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value))
@@ -6,82 +6,212 @@ Servidor mock que simula modelos de IA ejecutables.
 Expone endpoints HTTP para pruebas de la funcionalidad de ejecución.
 
 Features:
-- Múltiples modelos simulados (Iris, Sentiment, Image Classification)
+- Clasificador Iris real (RandomForest de models/iris_classifier.arrays/ o .pkl)
+- Múltiples modelos simulados (Sentiment, Image Classification, Fraud, ASR)
 - UI web interactiva para monitorear requests
 - Respuestas realistas con latencia simulada
 - Logs de ejecuciones
 
-Puerto: 8080
+Puerto: 8080 (MODEL_SERVER_PORT)
 """
 
-from flask import Flask, request, jsonify, render_template_string
+import time
+_import_start = time.perf_counter()  # Para el informe de arranque
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge, UnsupportedMediaType
 from datetime import datetime
-import time
+import os
 import random
+import atexit
+import functools
 import json
+import math
+import threading
+
+from admission import Bulkhead, Rejected, parse_bulkheads, request_timeout
+from batching import MicroBatcher
+from cluster import ClusterState
+from execution_log import ExecutionLog, merge_counters, merge_recent
+from execution_sink import SQLiteWriter, WriteBehindSink
+from input_schema import InputSchema, ValidationError
+from jobs import JobQueue, UnknownModel, parse_concurrency
+from keyword_matcher import KeywordMatcher, load_lexicon
+from latency_profiles import load_profiles
+from metrics import MetricsRegistry
+from model_engine import ModelRegistry
+from model_pools import ProcessPool
+from prediction_cache import MISS, PredictionCache, canonical_key
+import tracing
+from uploads import UPLOAD_FORM_MEMORY_BYTES, UPLOAD_MAX_BYTES, StreamingUpload, UploadTooLarge, is_upload
+from wire_formats import JSON, decode, encode, fast_json_provider, input_error, is_binary, response_format
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+app.json = fast_json_provider(app.json_provider_class)(app)  # orjson si está instalado
+
+# In-memory execution log (ring buffer de capacidad fija)
+execution_log = ExecutionLog(int(os.environ.get('MODEL_SERVER_LOG_CAPACITY', 10000)))
 
-# In-memory execution log
-execution_log = []
+# Historial persistente: volcado write-behind del execution log a una tabla
+# model_executions en SQLite (MODEL_SERVER_EXECUTION_DB=none lo desactiva).
+# Las peticiones nunca esperan a la base de datos
+EXECUTION_DB = os.environ.get('MODEL_SERVER_EXECUTION_DB',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'executions.sqlite3'))
+execution_sink = None
+if EXECUTION_DB != 'none':
+    execution_sink = WriteBehindSink(
+        SQLiteWriter(EXECUTION_DB),
+        max_batch=int(os.environ.get('MODEL_SERVER_EXECUTION_FLUSH_SIZE', 500)),
+        flush_interval=float(os.environ.get('MODEL_SERVER_EXECUTION_FLUSH_MS', 1000)) / 1000,
+        max_pending=int(os.environ.get('MODEL_SERVER_EXECUTION_MAX_PENDING', 50000)),
+        max_payload_bytes=int(os.environ.get('MODEL_SERVER_EXECUTION_MAX_PAYLOAD_BYTES', 65536))
+    )
+    execution_log.listeners.append(execution_sink.offer)
+    atexit.register(execution_sink.flush)
+
+# Métricas Prometheus (latencias, contadores, payloads) expuestas en /metrics
+metrics = MetricsRegistry()
+
+# Tamaño máximo de lote aceptado por los endpoints /batch
+MAX_BATCH_SIZE = int(os.environ.get('MODEL_SERVER_MAX_BATCH_SIZE', 10000))
+
+# Micro-batching dinámico de peticiones individuales concurrentes (opcional)
+MICROBATCH_ENABLED = os.environ.get('MODEL_SERVER_MICROBATCH', '0') == '1'
+MICROBATCH_MAX_SIZE = int(os.environ.get('MODEL_SERVER_MICROBATCH_MAX_SIZE', 32))
+MICROBATCH_WINDOW_MS = float(os.environ.get('MODEL_SERVER_MICROBATCH_WINDOW_MS', 5))
+MICROBATCH_WORKERS = int(os.environ.get('MODEL_SERVER_MICROBATCH_WORKERS', 1))
+
+# Caché de predicciones por hash de la entrada (opcional). Solo para modelos
+# deterministas: los del registro (pickle) siempre, y los simulados que
+# aparezcan en MODEL_SERVER_CACHE_MODELS (nunca estocásticos como el de imágenes)
+CACHE_ENABLED = os.environ.get('MODEL_SERVER_CACHE', '0') == '1'
+CACHE_SIZE = int(os.environ.get('MODEL_SERVER_CACHE_SIZE', 10000))
+CACHE_TTL = float(os.environ.get('MODEL_SERVER_CACHE_TTL', 300))
+CACHE_MODELS = [
+    name.strip()
+    for name in os.environ.get('MODEL_SERVER_CACHE_MODELS', 'Iris Classifier,Fraud Detector').split(',')
+    if name.strip()
+]
+
+# Registro de modelos de models/ (*.arrays/ o *.pkl + *_metadata.json): carga bajo demanda
+# con un máximo de modelos residentes; los de MODEL_SERVER_PRELOAD_MODELS se
+# cargan al arrancar (en modo producción, antes del fork de los workers)
+# (MODEL_SERVER_COMPILE_MODELS=0 mantiene predict_proba de scikit-learn en los .pkl)
+# MODEL_SERVER_INPUT_RANGE: qué hacer con valores fuera del min/max documentado
+# de cada feature: 'off' (nada), 'clip' (recortar) o 'reject' (HTTP 400)
+INPUT_RANGE = os.environ.get('MODEL_SERVER_INPUT_RANGE', 'off')
+# MODEL_SERVER_INPUT_FILL_MEANS=1: una feature ausente toma la media de sus
+# metadatos en lugar de responder 400
+INPUT_FILL_MEANS = os.environ.get('MODEL_SERVER_INPUT_FILL_MEANS', '0') == '1'
+model_registry = ModelRegistry(
+    max_resident=int(os.environ.get('MODEL_SERVER_MAX_RESIDENT_MODELS', 8)),
+    compile=os.environ.get('MODEL_SERVER_COMPILE_MODELS', '1') != '0',
+    input_range=INPUT_RANGE,
+    fill_means=INPUT_FILL_MEANS
+)
+_preload_start = time.perf_counter()
+for _name in filter(None, os.environ.get('MODEL_SERVER_PRELOAD_MODELS', 'iris_classifier').split(',')):
+    try:
+        model_registry.get(_name.strip())
+    except Exception as e:
+        print(f"⚠ Could not preload model '{_name}': {e}")
+_preload_ms = (time.perf_counter() - _preload_start) * 1000
 
 # ============================================================================
 # MODEL DEFINITIONS
 # ============================================================================
 
+# Rango de latencia simulada (segundos) de cada modelo simulado.
+# El clasificador Iris no aparece: su latencia es la del cómputo real.
+SIMULATED_LATENCY = {
+    'Sentiment Analyzer': (0.3, 1.0),
+    'Chest X-Ray Classifier': (1.0, 2.0),  # Más lento, simula procesamiento pesado
+    'Fraud Detector': (0.5, 1.2),
+    'Multilingual ASR': (1.5, 3.0)  # Simula procesamiento de audio
+}
+
+# Perfiles de latencia (ver latency_profiles.py). Por defecto, uniforme en los
+# rangos de SIMULATED_LATENCY. MODEL_SERVER_LATENCY_PROFILES=zero elimina la
+# latencia (pruebas de throughput) o apunta a un JSON con un perfil por modelo
+# (fixed, lognormal con cola, replay de trazas...). Con MODEL_SERVER_LATENCY_SEED
+# las latencias son reproducibles entre ejecuciones.
+LATENCY_SEED = os.environ.get('MODEL_SERVER_LATENCY_SEED')
+latency_profiles = load_profiles(
+    SIMULATED_LATENCY,
+    os.environ.get('MODEL_SERVER_LATENCY_PROFILES'),
+    seed=int(LATENCY_SEED) if LATENCY_SEED else None
+)
+
+def simulated_latency(model_name):
+    """Segundos de latencia simulada para una ejecución del modelo"""
+    return latency_profiles[model_name].sample()
+
+# Modelos que informan de su tiempo de procesamiento en la respuesta
+REPORTS_PROCESSING_TIME = {'Chest X-Ray Classifier', 'Multilingual ASR'}
+
+def stamp_processing_time(model_name, result, start):
+    """Añade el processing_time_ms medido desde ``start`` (perf_counter)"""
+    if model_name in REPORTS_PROCESSING_TIME:
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+        for item in (result if isinstance(result, list) else [result]):
+            item['processing_time_ms'] = elapsed_ms
+    return result
+
 def iris_classifier(data):
-    """Simula clasificación de flores Iris"""
-    time.sleep(random.uniform(0.5, 1.5))  # Simular procesamiento
-    
-    # Extraer features
-    sepal_length = data.get('sepal_length', 5.0)
-    sepal_width = data.get('sepal_width', 3.0)
-    petal_length = data.get('petal_length', 4.0)
-    petal_width = data.get('petal_width', 1.5)
-    
-    # Lógica simple de clasificación
-    if petal_length < 2.5:
-        species = 'setosa'
-        confidence = 0.95
-    elif petal_length < 5.0:
-        species = 'versicolor'
-        confidence = 0.87
-    else:
-        species = 'virginica'
-        confidence = 0.92
+    """Clasificación de flores Iris con el RandomForest de models/iris_classifier"""
+    result = model_registry.get('iris_classifier').predict_vector(data['features'])
     
     return {
         'model': 'Iris Classifier',
-        'prediction': species,
-        'confidence': confidence,
-        'probabilities': {
-            'setosa': 0.95 if species == 'setosa' else random.uniform(0.01, 0.05),
-            'versicolor': 0.87 if species == 'versicolor' else random.uniform(0.05, 0.15),
-            'virginica': 0.92 if species == 'virginica' else random.uniform(0.01, 0.08)
-        },
-        'input_features': {
-            'sepal_length': sepal_length,
-            'sepal_width': sepal_width,
-            'petal_length': petal_length,
-            'petal_width': petal_width
-        }
+        'prediction': result['prediction'],
+        'confidence': result['confidence'],
+        'probabilities': result['probabilities'],
+        'input_features': result['input_features']
     }
 
+def iris_classifier_batch(batch):
+    """Clasificación Iris de un lote con una única llamada a predict_proba"""
+    return [
+        {'model': 'Iris Classifier', **result}
+        for result in model_registry.get('iris_classifier').predict_matrix(registered_features(batch))
+    ]
+
 def sentiment_analyzer(data):
     """Simula análisis de sentimiento"""
-    time.sleep(random.uniform(0.3, 1.0))
-    
-    text = data.get('text', '')
-    
-    # Análisis simple basado en palabras clave
-    positive_words = ['good', 'great', 'excellent', 'love', 'amazing', 'wonderful', 'happy']
-    negative_words = ['bad', 'terrible', 'hate', 'awful', 'horrible', 'sad', 'angry']
-    
-    text_lower = text.lower()
-    pos_count = sum(word in text_lower for word in positive_words)
-    neg_count = sum(word in text_lower for word in negative_words)
+    time.sleep(simulated_latency('Sentiment Analyzer'))
+    return _analyze_sentiment(data)
+
+def sentiment_analyzer_batch(batch):
+    """Simula análisis de sentimiento de un lote (latencia pagada una vez)"""
+    time.sleep(simulated_latency('Sentiment Analyzer'))
+    return _analyze_sentiment_batch(batch)
+
+# Léxico de sentimiento compilado una vez al arrancar (MODEL_SERVER_SENTIMENT_LEXICON:
+# JSON {"positive": [...], "negative": [...]}). Solo se analizan los primeros
+# MODEL_SERVER_SENTIMENT_MAX_CHARS caracteres de cada texto.
+sentiment_matcher = KeywordMatcher(load_lexicon(os.environ.get('MODEL_SERVER_SENTIMENT_LEXICON')))
+SENTIMENT_MAX_CHARS = int(os.environ.get('MODEL_SERVER_SENTIMENT_MAX_CHARS', 1000000))
+
+def _analyze_sentiment_batch(batch):
+    """Lote de registros {"text": ...}, de textos sueltos o columnar {"text": [...]}"""
+    if isinstance(batch, dict):
+        return [_sentiment_result(text) for text in batch.get('text', [''] * batch_size(batch))]
+    return [
+        _sentiment_result(data if isinstance(data, str) else (data or {}).get('text', ''))
+        for data in batch
+    ]
+
+def _analyze_sentiment(data):
+    return _sentiment_result(data.get('text', ''))
+
+def _sentiment_result(text):
+    if not isinstance(text, str):
+        text = str(text)
+    counts, analyzed = sentiment_matcher.count(text, SENTIMENT_MAX_CHARS)
+    pos_count = counts.get('positive', 0)
+    neg_count = counts.get('negative', 0)
     
     if pos_count > neg_count:
         sentiment = 'positive'
@@ -99,16 +229,27 @@ def sentiment_analyzer(data):
         'score': round(score, 3),
         'confidence': round(score, 3),
         'text_analyzed': text[:100] + ('...' if len(text) > 100 else ''),
-        'keywords_detected': {
-            'positive': pos_count,
-            'negative': neg_count
-        }
+        'characters_analyzed': analyzed,
+        'truncated': analyzed < len(text),
+        'keywords_detected': counts
     }
 
 def image_classifier(data):
     """Simula clasificación de imágenes médicas (Chest X-Ray)"""
-    time.sleep(random.uniform(1.0, 2.0))  # Más lento, simula procesamiento pesado
-    
+    start = time.perf_counter()
+    time.sleep(simulated_latency('Chest X-Ray Classifier'))
+    return stamp_processing_time('Chest X-Ray Classifier', _classify_image(data), start)
+
+def image_classifier_batch(batch):
+    """Simula clasificación de un lote de imágenes (latencia pagada una vez)"""
+    start = time.perf_counter()
+    time.sleep(simulated_latency('Chest X-Ray Classifier'))
+    return stamp_processing_time('Chest X-Ray Classifier', _classify_image_batch(batch), start)
+
+def _classify_image_batch(batch):
+    return [_classify_image(data) for data in batch_records(batch)]
+
+def _classify_image(data):
     # Datos de entrada esperados
     image_data = data.get('image_base64', '')
     patient_age = data.get('patient_age', 45)
@@ -140,65 +281,142 @@ def image_classifier(data):
         'probabilities': probabilities,
         'patient_age': patient_age,
         'risk_level': 'high' if confidence > 0.85 and predicted_condition != 'Normal' else 'low',
-        'processing_time_ms': round(random.uniform(1000, 2000), 2)
+        **({'input': data['upload']} if 'upload' in data else {})
     }
 
+# Valores por defecto de cada campo de transacción
+FRAUD_DEFAULTS = {
+    'transaction_amount': 100.0,
+    'merchant_category': 'retail',
+    'location': 'domestic',
+    'transaction_hour': 12,
+    'card_present': True
+}
+RISKY_MERCHANTS = ['electronics', 'jewelry', 'cash_advance']
+
 def fraud_detector(data):
     """Simula detección de fraude en transacciones"""
-    time.sleep(random.uniform(0.5, 1.2))
-    
-    # Datos de entrada esperados
-    amount = data.get('transaction_amount', 100.0)
-    merchant = data.get('merchant_category', 'retail')
-    location = data.get('location', 'domestic')
-    hour = data.get('transaction_hour', 12)
-    card_present = data.get('card_present', True)
-    
-    # Lógica de detección
-    fraud_score = 0.0
+    time.sleep(simulated_latency('Fraud Detector'))
+    return _detect_fraud_record(data)
+
+def fraud_detector_batch(batch):
+    """Simula detección de fraude de un lote con reglas vectorizadas"""
+    time.sleep(simulated_latency('Fraud Detector'))
+    return _detect_fraud_batch(batch)
+
+def _detect_fraud_record(data):
+    return _detect_fraud(batch_columns([data], FRAUD_DEFAULTS))[0]
+
+def _detect_fraud_batch(batch):
+    return _detect_fraud(batch_columns(batch, FRAUD_DEFAULTS))
+
+def _detect_fraud(columns):
+    import numpy as np  # Import diferido: no penaliza el arranque
+
+    # Cada regla se evalúa sobre la columna completa
+    amount = np.asarray(columns['transaction_amount'], dtype=float)
+    merchant = np.asarray(columns['merchant_category'], dtype=object)
+    location = np.asarray(columns['location'], dtype=object)
+    hour = np.asarray(columns['transaction_hour'], dtype=float)
+    card_present = np.asarray(columns['card_present'], dtype=bool)
     
     # Factores de riesgo
-    if amount > 1000:
-        fraud_score += 0.3
-    if location == 'international':
-        fraud_score += 0.2
-    if hour < 6 or hour > 22:
-        fraud_score += 0.15
-    if not card_present:
-        fraud_score += 0.25
-    if merchant in ['electronics', 'jewelry', 'cash_advance']:
-        fraud_score += 0.1
+    high_amount = amount > 1000
+    unusual_location = location == 'international'
+    unusual_time = (hour < 6) | (hour > 22)
+    card_not_present = ~card_present
+    risky_merchant = np.isin(merchant, RISKY_MERCHANTS)
+    
+    fraud_score = (0.3 * high_amount + 0.2 * unusual_location + 0.15 * unusual_time
+                   + 0.25 * card_not_present + 0.1 * risky_merchant)
     
     # Añadir ruido aleatorio
-    fraud_score += random.uniform(-0.1, 0.1)
-    fraud_score = max(0.0, min(1.0, fraud_score))
+    fraud_score = fraud_score + np.random.uniform(-0.1, 0.1, len(amount))
+    fraud_score = np.clip(fraud_score, 0.0, 1.0).round(3)
     
-    is_fraud = fraud_score > 0.5
+    risk_level = np.where(fraud_score > 0.7, 'high', np.where(fraud_score > 0.4, 'medium', 'low'))
     
-    return {
-        'model': 'Fraud Detector',
-        'is_fraud': is_fraud,
-        'fraud_probability': round(fraud_score, 3),
-        'risk_level': 'high' if fraud_score > 0.7 else 'medium' if fraud_score > 0.4 else 'low',
-        'risk_factors': {
-            'high_amount': amount > 1000,
-            'unusual_location': location == 'international',
-            'unusual_time': hour < 6 or hour > 22,
-            'card_not_present': not card_present,
-            'risky_merchant': merchant in ['electronics', 'jewelry', 'cash_advance']
-        },
-        'transaction_details': {
-            'amount': amount,
-            'merchant': merchant,
-            'location': location,
-            'hour': hour
+    return [
+        {
+            'model': 'Fraud Detector',
+            'is_fraud': score > 0.5,
+            'fraud_probability': score,
+            'risk_level': level,
+            'risk_factors': {
+                'high_amount': factors[0],
+                'unusual_location': factors[1],
+                'unusual_time': factors[2],
+                'card_not_present': factors[3],
+                'risky_merchant': factors[4]
+            },
+            'transaction_details': {
+                'amount': amt,
+                'merchant': merch,
+                'location': loc,
+                'hour': hr
+            }
         }
-    }
+        for score, level, factors, amt, merch, loc, hr in zip(
+            fraud_score.tolist(),
+            risk_level.tolist(),
+            np.column_stack([high_amount, unusual_location, unusual_time,
+                             card_not_present, risky_merchant]).tolist(),
+            columns['transaction_amount'],
+            columns['merchant_category'],
+            columns['location'],
+            columns['transaction_hour']
+        )
+    ]
 
 def speech_recognizer(data):
     """Simula reconocimiento automático de voz (ASR)"""
-    time.sleep(random.uniform(1.5, 3.0))  # Simula procesamiento de audio
-    
+    start = time.perf_counter()
+    time.sleep(simulated_latency('Multilingual ASR'))
+    return stamp_processing_time('Multilingual ASR', _recognize_speech(data), start)
+
+def speech_recognizer_batch(batch):
+    """Simula ASR de un lote de audios (latencia pagada una vez)"""
+    start = time.perf_counter()
+    time.sleep(simulated_latency('Multilingual ASR'))
+    return stamp_processing_time('Multilingual ASR', _recognize_speech_batch(batch), start)
+
+# Duración (segundos) de cada ventana de audio en las transcripciones en streaming
+ASR_WINDOW_SECONDS = float(os.environ.get('MODEL_SERVER_ASR_WINDOW_SECONDS', 1.0))
+
+def plan_transcription(data):
+    """Transcripción en streaming: (resultado, segmentos, latencia por segmento)
+
+    La transcripción se reparte en un segmento por ventana de audio, con sus
+    marcas de tiempo; la latencia simulada se reparte entre los segmentos.
+    """
+    result = _recognize_speech(data)
+    words = result['transcription'].split()
+    duration = float(result['audio_duration'] or 0)
+    windows = max(1, math.ceil(duration / ASR_WINDOW_SECONDS)) if duration > 0 else 1
+    segments = [
+        {
+            'segment': i,
+            'start': round(i * ASR_WINDOW_SECONDS, 3) if duration > 0 else 0.0,
+            'end': round(min((i + 1) * ASR_WINDOW_SECONDS, duration), 3),
+            'text': ' '.join(words[i * len(words) // windows:(i + 1) * len(words) // windows])
+        }
+        for i in range(windows)
+    ]
+    return result, segments, simulated_latency('Multilingual ASR') / windows
+
+def speech_recognizer_stream(data):
+    """Simula ASR en streaming: genera ('segment', ...) por ventana y ('result', ...) al final"""
+    start = time.perf_counter()
+    result, segments, latency = plan_transcription(data)
+    for segment in segments:
+        time.sleep(latency)
+        yield 'segment', segment
+    yield 'result', stamp_processing_time('Multilingual ASR', result, start)
+
+def _recognize_speech_batch(batch):
+    return [_recognize_speech(data) for data in batch_records(batch)]
+
+def _recognize_speech(data):
     # Datos de entrada esperados
     audio_duration = data.get('audio_duration_seconds', 5.0)
     language = data.get('language', 'en')
@@ -247,17 +465,360 @@ def speech_recognizer(data):
         'word_count': word_count,
         'words_per_second': round(word_count / audio_duration, 2) if audio_duration > 0 else 0,
         'audio_quality': audio_quality,
-        'processing_time_ms': round(random.uniform(1500, 3000), 2)
+        **({'input': data['upload']} if 'upload' in data else {})
     }
 
+# Cómputo de cada modelo sin latencia simulada: (registro, lote).
+# Lo reutilizan los adaptadores del servidor asíncrono (async_server.py).
+MODEL_COMPUTE = {
+    'Iris Classifier': (iris_classifier, iris_classifier_batch),
+    'Sentiment Analyzer': (_analyze_sentiment, _analyze_sentiment_batch),
+    'Chest X-Ray Classifier': (_classify_image, _classify_image_batch),
+    'Fraud Detector': (_detect_fraud_record, _detect_fraud_batch),
+    'Multilingual ASR': (_recognize_speech, _recognize_speech_batch)
+}
+
+# ============================================================================
+# BATCH HELPERS
+# ============================================================================
+
+def parse_batch(payload):
+    """Normaliza el cuerpo de una petición batch
+
+    Formatos aceptados:
+    - Array JSON de registros: [{...}, {...}]
+    - {"instances": [{...}, {...}]}
+    - Columnar: {"columns": {"campo": [v1, v2, ...], ...}}
+
+    Devuelve una lista de registros o un dict columnar.
+    """
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        if isinstance(payload.get('instances'), list):
+            return payload['instances']
+        if isinstance(payload.get('columns'), dict):
+            return payload['columns']
+    raise ValueError('Batch payload must be a JSON array, {"instances": [...]} or {"columns": {...}}')
+
+def is_column(values):
+    """True si es una columna de un lote columnar: lista JSON o array 1-D (Arrow)"""
+    if isinstance(values, (list, tuple)):
+        return True
+    return hasattr(values, 'tolist') and getattr(values, 'ndim', None) == 1
+
+def batch_size(batch):
+    """Número de elementos de un lote en formato registros o columnar
+
+    En el columnar, cada campo tiene que ser una columna (ValidationError,
+    HTTP 400): un escalar o un texto no tiene longitud de lote.
+    """
+    if isinstance(batch, dict):
+        invalid = [(key, 'must be an array of values') for key, values in batch.items() if not is_column(values)]
+        if invalid:
+            raise ValidationError(invalid)
+        lengths = {len(values) for values in batch.values()}
+        if len(lengths) > 1:
+            raise ValueError('All columns must have the same length')
+        return lengths.pop() if lengths else 0
+    return len(batch)
+
+def batch_records(batch):
+    """Lote como lista de registros (dicts)"""
+    if isinstance(batch, dict):
+        keys = list(batch.keys())
+        return [dict(zip(keys, values)) for values in zip(*batch.values())]
+    return batch
+
+def batch_columns(batch, defaults):
+    """Lote como dict columnar {campo: lista}, rellenando valores por defecto"""
+    n = batch_size(batch)
+    if isinstance(batch, dict):
+        return {
+            key: batch[key] if key in batch else [default] * n
+            for key, default in defaults.items()
+        }
+    return {
+        key: [(record or {}).get(key, default) for record in batch]
+        for key, default in defaults.items()
+    }
+
+prediction_caches = {}
+
+def prediction_cache(model_name):
+    """Caché del modelo, o None si no la tiene activada"""
+    if not CACHE_ENABLED:
+        return None
+    cache = prediction_caches.get(model_name)
+    if cache is None and (model_name in CACHE_MODELS or model_name in model_registry):
+        cache = prediction_caches.setdefault(model_name, PredictionCache(CACHE_SIZE, CACHE_TTL))
+    return cache
+
+def infer(model_name, model_fn, data):
+    """Ejecuta un registro: caché de predicciones, micro-batcher o llamada directa"""
+    with tracing.stage('inference'):
+        cache = prediction_cache(model_name)
+        if cache is not None:
+            key = canonical_key(data)
+            result = cache.get(key)
+            if result is not MISS:
+                return result
+        
+        batcher = micro_batchers.get(model_name)
+        if batcher is None:
+            result = pooled(model_name, model_fn, 'single')(data)
+        else:
+            result = batcher.submit(data).result()
+        
+        if cache is not None:
+            cache.put(key, result)
+        return result
+
+def read_upload_request(kind):
+    """Datos del modelo para una subida binaria ('image' o 'audio')
+
+    El cuerpo binario se lee por trozos (ver uploads.py); un multipart lo
+    parsea antes werkzeug (request.files), que guarda el fichero en un
+    temporal. El modelo recibe los parámetros de la petición y un resumen de
+    la subida en ``upload``.
+    """
+    # El límite también para werkzeug: un multipart sin Content-Length se
+    # corta al superarlo en lugar de parsearse entero antes de comprobarlo
+    request.max_content_length = UPLOAD_MAX_BYTES
+    request.max_form_memory_size = UPLOAD_FORM_MEMORY_BYTES
+    upload = StreamingUpload(request.content_length)
+    try:
+        with tracing.stage('parse'):
+            if request.mimetype == 'multipart/form-data':
+                file = request.files.get('file')
+                if file is None:
+                    raise ValidationError([('file', "Multipart upload must include a 'file' field")])
+                upload.read_from(file.stream)
+            else:
+                upload.read_from(request.stream)
+
+            return upload_data(upload, kind, {**request.args.to_dict(), **request.form.to_dict()})
+    except RequestEntityTooLarge:
+        raise UploadTooLarge(f'Upload exceeds the limit of {UPLOAD_MAX_BYTES} bytes') from None
+
+def upload_data(upload, kind, params):
+    """Entrada del modelo: parámetros de la petición + resumen de la subida
+
+    Los parámetros llegan como texto; validate_input() los convierte con el
+    esquema del modelo (y responde 400 si no son válidos).
+    """
+    data = dict(params)
+    try:
+        data['upload'] = upload.describe(kind)
+    except ValueError as e:
+        raise ValidationError([('file', str(e))]) from None
+    if 'duration_seconds' in data['upload']:
+        data.setdefault('audio_duration_seconds', data['upload']['duration_seconds'])
+    return data
+
+# ============================================================================
+# INPUT VALIDATION
+# ============================================================================
+
+# Esquemas de entrada de los modelos simulados, en el formato input_features de
+# *_metadata.json; los modelos de models/ compilan el suyo al cargarse
+INPUT_SCHEMAS = {
+    'Sentiment Analyzer': InputSchema([
+        {'name': 'text', 'type': 'str', 'default': ''}
+    ], INPUT_RANGE),
+    'Chest X-Ray Classifier': InputSchema([
+        {'name': 'image_base64', 'type': 'str', 'default': ''},
+        {'name': 'patient_age', 'type': 'int', 'min': 0, 'max': 130, 'default': 45}
+    ], INPUT_RANGE),
+    'Fraud Detector': InputSchema([
+        {'name': 'transaction_amount', 'type': 'float', 'min': 0, 'default': FRAUD_DEFAULTS['transaction_amount']},
+        {'name': 'merchant_category', 'type': 'str', 'default': FRAUD_DEFAULTS['merchant_category']},
+        {'name': 'location', 'type': 'str', 'default': FRAUD_DEFAULTS['location']},
+        {'name': 'transaction_hour', 'type': 'int', 'min': 0, 'max': 23, 'default': FRAUD_DEFAULTS['transaction_hour']},
+        {'name': 'card_present', 'type': 'bool', 'default': FRAUD_DEFAULTS['card_present']}
+    ], INPUT_RANGE),
+    'Multilingual ASR': InputSchema([
+        {'name': 'audio_duration_seconds', 'type': 'float', 'min': 0, 'default': 5.0},
+        {'name': 'language', 'type': 'str', 'default': 'en'},
+        {'name': 'audio_quality', 'type': 'str', 'default': 'good'}
+    ], INPUT_RANGE)
+}
+
+# Modelo de models/ que sirve cada endpoint propio
+REGISTERED_MODELS = {
+    'Iris Classifier': 'iris_classifier'
+}
+
+def validate_input(model_name, data):
+    """Entrada de un registro validada y tipada (ValidationError -> HTTP 400)
+
+    Se ejecuta antes de la caché, el micro-batcher y la inferencia: una
+    petición mal formada no llega a ocupar el modelo.
+    """
+    with tracing.stage('validate'):
+        schema = INPUT_SCHEMAS.get(model_name)
+        if schema is not None:
+            return schema.record(data)
+        name = REGISTERED_MODELS.get(model_name, model_name)
+        if name in model_registry:
+            return {'features': model_registry.get(name).schema.vector(data)}
+        return data
+
+def validate_batch(model_name, batch):
+    """Lote validado y tipado; el de un modelo de models/ es ya su matriz de features"""
+    schema = INPUT_SCHEMAS.get(model_name)
+    name = REGISTERED_MODELS.get(model_name, model_name)
+    if schema is None and name not in model_registry:
+        return batch
+    with tracing.stage('validate'):
+        if schema is not None:
+            return schema.batch(batch)
+        return model_registry.get(name).schema.matrix(batch)
+
+def registered_features(batch):
+    """Features de un lote validado de un modelo de models/
+
+    Es la matriz de validate_batch() o, desde el micro-batcher, la lista de
+    registros de validate_input(): en ningún caso se vuelve a validar.
+    """
+    if isinstance(batch, list):
+        return [item['features'] for item in batch]
+    return batch
+
+# ============================================================================
+# PROCESS POOLS
+# ============================================================================
+
+# Procesos dedicados por modelo (ver model_pools.py), para que un modelo que
+# consume CPU no frene a los demás: MODEL_SERVER_PROCESS_POOLS="Modelo=procesos,..."
+# ("Modelo A+Modelo B=2" comparte un pool). Los modelos de models/ solo ejecutan
+# allí predict_proba, con la matriz de features en memoria compartida; los
+# simulados, la función entera del modelo. Por defecto no hay ninguno
+PROCESS_POOLS = parse_concurrency(os.environ.get('MODEL_SERVER_PROCESS_POOLS', ''))
+# Espera máxima (s) a un proceso libre del pool antes de responder con error
+POOL_WAIT_SECONDS = float(os.environ.get('MODEL_SERVER_POOL_WAIT_SECONDS', 30))
+
+def pool_targets(models):
+    """Funciones del pool de un grupo de modelos, resueltas en el servidor antes del fork"""
+    def targets():
+        batch_functions = {model_name: batch_fn for _, model_name, batch_fn in BATCH_ENDPOINTS}
+        ops = {}
+        for name in models:
+            if name in model_registry:
+                ops[(name, 'predict_proba')] = model_registry.get(name).model.predict_proba
+            else:
+                ops[(name, 'single')] = MODEL_FUNCTIONS[name]
+                ops[(name, 'batch')] = batch_functions[name]
+                ops[(name, 'compute')], ops[(name, 'compute_batch')] = MODEL_COMPUTE[name]
+        return ops
+    return targets
+
+process_pools = {}   # grupo -> ProcessPool
+pooled_models = {}   # modelo simulado -> ProcessPool
+for _group, _processes in PROCESS_POOLS.items():
+    _models = [REGISTERED_MODELS.get(name.strip(), name.strip()) for name in _group.split('+')]
+    _unknown = [name for name in _models if name not in MODEL_COMPUTE and name not in model_registry]
+    if _unknown:
+        print(f"⚠ Process pool '{_group}': unknown model(s) {', '.join(_unknown)}")
+        continue
+    _pool = process_pools[_group] = ProcessPool(_group, pool_targets(_models), _processes,
+                                                    wait_timeout=POOL_WAIT_SECONDS)
+    for _name in _models:
+        if _name in model_registry:
+            model_registry.set_runner(_name, functools.partial(_pool.call, (_name, 'predict_proba')))
+        else:
+            pooled_models[_name] = _pool
+
+def pooled(model_name, fn, kind):
+    """``fn``, o su ejecución en el pool de procesos del modelo si tiene uno"""
+    pool = pooled_models.get(model_name)
+    return fn if pool is None else functools.partial(pool.call, (model_name, kind))
+
+def start_process_pools():
+    """Crea los procesos de los pools; antes de arrancar hilos (ver model_pools.py)"""
+    for pool in process_pools.values():
+        pool.start()
+
+@atexit.register
+def close_process_pools():
+    for pool in process_pools.values():
+        pool.close()
+
+# ============================================================================
+# WIRE FORMATS
+# ============================================================================
+
+# Los endpoints de predicción aceptan y devuelven JSON, MessagePack y (en
+# /batch) Arrow, según Content-Type y Accept (ver wire_formats.py)
+
+def request_payload(batch=False):
+    """Cuerpo de la petición actual como objeto Python (ValidationError si no se puede leer)"""
+    with tracing.stage('parse'):
+        try:
+            if is_binary(request.mimetype):
+                return decode(request.mimetype, request.get_data(cache=False), batch)
+            return request.get_json()
+        # Content-Type no admitido o cuerpo mal formado: 400 como el resto de la validación
+        except UnsupportedMediaType as e:
+            raise ValidationError([(None, e.description)]) from None
+        except BadRequest:
+            raise ValidationError([(None, 'Malformed JSON body')]) from None
+        except ValueError as e:
+            raise ValidationError([(None, str(e) or f'Malformed {request.mimetype} body')]) from None
+
+def respond(body, batch=False):
+    """Respuesta 200 en el formato que pide la cabecera Accept"""
+    with tracing.stage('serialize'):
+        mimetype = response_format(request.accept_mimetypes, batch)
+        if mimetype == JSON:
+            return jsonify(body), 200
+        return Response(encode(body, mimetype), 200, mimetype=mimetype)
+
+@app.before_request
+def check_wire_format():
+    if is_binary(request.mimetype):
+        error = input_error(request.mimetype, batch=request.path.endswith('/batch'))
+        if error is not None:
+            return jsonify({'error': error}), 415
+
+# ============================================================================
+# REQUEST TRACING
+# ============================================================================
+
+# Cada petición a un modelo lleva un trace id (traceparent / X-Request-Id del
+# backend EDC, o uno nuevo) y el tiempo de sus etapas (ver tracing.py): se
+# devuelven en X-Trace-Id y Server-Timing, van al execution log y a /metrics.
+# MODEL_SERVER_PROFILE_SLOW_MS > 0 activa el perfilador por muestreo: las
+# peticiones más lentas dejan su pila en MODEL_SERVER_PROFILE_DIR (*.folded)
+PROFILE_SLOW_MS = float(os.environ.get('MODEL_SERVER_PROFILE_SLOW_MS', 0))
+profiler = None
+if PROFILE_SLOW_MS > 0:
+    profiler = tracing.SamplingProfiler(
+        PROFILE_SLOW_MS / 1000,
+        os.environ.get('MODEL_SERVER_PROFILE_DIR',
+                       os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')),
+        interval=float(os.environ.get('MODEL_SERVER_PROFILE_INTERVAL_MS', 5)) / 1000
+    )
+
+def log_execution(model_name, endpoint, status, start_time, batch_size=1, trace=None,
+                  input_payload=None, output_payload=None, status_code=None):
+    """Registra una ejecución con su duración (start_time de time.perf_counter()), su trace id,
+    su código HTTP (200 si tuvo éxito) y sus payloads (para el historial persistente)"""
+    trace = trace or tracing.current()
+    if status_code is None and status == 'success':
+        status_code = 200
+    with tracing.stage('log'):
+        execution_log.record(model_name, endpoint, status,
+            round((time.perf_counter() - start_time) * 1000, 2), batch_size=batch_size,
+            trace_id=trace.trace_id if trace is not None else None,
+            input_payload=input_payload, output_payload=output_payload, status_code=status_code)
+
 # ============================================================================
 # API ENDPOINTS
 # ============================================================================
 
-@app.route('/')
-def home():
-    """Dashboard HTML"""
-    html = """
+# Plantilla del dashboard (compartida con async_server.py)
+DASHBOARD_TEMPLATE = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -417,6 +978,10 @@ def home():
                 color: #ef4444;
                 font-weight: 600;
             }
+            .log-entry .status-rejected, .log-entry .status-cancelled {
+                color: #f59e0b;
+                font-weight: 600;
+            }
             .refresh-btn {
                 background: #667eea;
                 color: white;
@@ -455,7 +1020,7 @@ def home():
                 </div>
                 <div class="stat-card">
                     <div class="label">Available Models</div>
-                    <div class="number">3</div>
+                    <div class="number">{{ available_models }}</div>
                 </div>
                 <div class="stat-card">
                     <div class="label">Server Port</div>
@@ -501,8 +1066,8 @@ def home():
             <div class="log-section">
                 <h2>📝 Recent Executions</h2>
                 <div id="logContainer">
-                    {% if execution_log %}
-                        {% for log in execution_log[-10:][::-1] %}
+                    {% if recent_executions %}
+                        {% for log in recent_executions %}
                         <div class="log-entry">
                             <div class="timestamp">{{ log.timestamp }}</div>
                             <div>
@@ -525,103 +1090,191 @@ def home():
         </div>
         
         <script>
-            // Auto-refresh every 5 seconds
-            setTimeout(() => location.reload(), 5000);
+            // Live updates: only new executions since the last cursor are sent
+            let cursor = {{ feed_cursor | tojson }};
+            const MAX_ENTRIES = 10;
+            
+            function renderEntry(log) {
+                const entry = document.createElement('div');
+                entry.className = 'log-entry';
+                const timestamp = document.createElement('div');
+                timestamp.className = 'timestamp';
+                timestamp.textContent = log.timestamp;
+                const title = document.createElement('div');
+                const status = document.createElement('span');
+                status.className = 'status-' + log.status;
+                status.textContent = log.status.toUpperCase();
+                const model = document.createElement('strong');
+                model.textContent = log.model;
+                title.append(status, ' ', model, ' - ' + log.endpoint);
+                const duration = document.createElement('div');
+                duration.style.cssText = 'margin-top: 5px; color: #666;';
+                duration.textContent = 'Duration: ' + log.duration + 'ms';
+                entry.append(timestamp, title, duration);
+                return entry;
+            }
+            
+            function applyFeed(feed) {
+                cursor = feed.cursor;
+                document.getElementById('totalRequests').textContent = feed.counters.total;
+                if (!feed.executions.length) return;
+                const container = document.getElementById('logContainer');
+                const empty = container.querySelector('.empty-log');
+                if (empty) empty.remove();
+                // Llegan de la más reciente a la más antigua
+                for (const log of feed.executions.slice().reverse()) {
+                    container.prepend(renderEntry(log));
+                }
+                while (container.children.length > MAX_ENTRIES) {
+                    container.lastElementChild.remove();
+                }
+            }
+            
+            function poll() {
+                setInterval(() => {
+                    fetch('/api/v1/executions/feed?limit=' + MAX_ENTRIES + '&after=' + encodeURIComponent(cursor))
+                        .then((response) => response.json())
+                        .then(applyFeed);
+                }, 2000);
+            }
+            
+            if (window.EventSource) {
+                const source = new EventSource('/api/v1/executions/stream?after=' + encodeURIComponent(cursor));
+                source.addEventListener('executions', (event) => applyFeed(JSON.parse(event.data)));
+                // Sin reconexión (p. ej. 503 con el máximo de streams): polling
+                source.addEventListener('error', () => {
+                    if (source.readyState === EventSource.CLOSED) poll();
+                });
+            } else {
+                poll();
+            }
         </script>
     </body>
     </html>
     """
-    return render_template_string(html, 
-                                  execution_log=execution_log,
-                                  total_requests=len(execution_log))
+
+_dashboard_template = None
+
+def dashboard_template():
+    """Plantilla del dashboard compilada una sola vez (en el primer uso)"""
+    global _dashboard_template
+    if _dashboard_template is None:
+        _dashboard_template = app.jinja_env.from_string(DASHBOARD_TEMPLATE)
+    return _dashboard_template
+
+def dashboard_context():
+    """Datos que muestra el dashboard (el resto llega por /api/v1/executions/stream)"""
+    feed = execution_feed(limit=10)
+    return {
+        'recent_executions': feed['executions'],
+        'total_requests': feed['counters']['total'],
+        'feed_cursor': feed['cursor'],
+        'available_models': len(SIMULATED_LATENCY) + len(model_registry.names())
+    }
+
+@app.route('/')
+def home():
+    """Dashboard HTML"""
+    return dashboard_template().render(**dashboard_context())
 
 @app.route('/api/v1/predict', methods=['POST'])
 def predict_iris():
     """Iris Classification Endpoint"""
-    start_time = time.time()
+    start_time = time.perf_counter()
+    data = None
     
     try:
-        data = request.get_json()
-        result = iris_classifier(data)
+        data = request_payload()
+        data = validate_input('Iris Classifier', data)
+        result = infer('Iris Classifier', iris_classifier, data)
         
         # Log execution
-        execution_log.append({
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'model': 'Iris Classifier',
-            'endpoint': '/api/v1/predict',
-            'status': 'success',
-            'duration': round((time.time() - start_time) * 1000, 2)
-        })
+        log_execution('Iris Classifier', '/api/v1/predict', 'success', start_time,
+            input_payload=data, output_payload=result)
         
-        return jsonify(result), 200
+        return respond(result)
+    
+    except ValidationError as e:
+        body = e.to_dict()
+        log_execution('Iris Classifier', '/api/v1/predict', 'error', start_time,
+            input_payload=data, output_payload=body, status_code=400)
+        return jsonify(body), 400
     
     except Exception as e:
-        execution_log.append({
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'model': 'Iris Classifier',
-            'endpoint': '/api/v1/predict',
-            'status': 'error',
-            'duration': round((time.time() - start_time) * 1000, 2)
-        })
-        return jsonify({'error': str(e)}), 500
+        body = {'error': str(e)}
+        log_execution('Iris Classifier', '/api/v1/predict', 'error', start_time,
+            input_payload=data, output_payload=body, status_code=500)
+        return jsonify(body), 500
 
 @app.route('/api/v1/sentiment', methods=['POST'])
 def analyze_sentiment():
     """Sentiment Analysis Endpoint"""
-    start_time = time.time()
+    start_time = time.perf_counter()
+    data = None
     
     try:
-        data = request.get_json()
-        result = sentiment_analyzer(data)
+        data = request_payload()
+        data = validate_input('Sentiment Analyzer', data)
+        result = infer('Sentiment Analyzer', sentiment_analyzer, data)
         
-        execution_log.append({
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'model': 'Sentiment Analyzer',
-            'endpoint': '/api/v1/sentiment',
-            'status': 'success',
-            'duration': round((time.time() - start_time) * 1000, 2)
-        })
+        log_execution('Sentiment Analyzer', '/api/v1/sentiment', 'success', start_time,
+            input_payload=data, output_payload=result)
         
-        return jsonify(result), 200
+        return respond(result)
+    
+    except ValidationError as e:
+        body = e.to_dict()
+        log_execution('Sentiment Analyzer', '/api/v1/sentiment', 'error', start_time,
+            input_payload=data, output_payload=body, status_code=400)
+        return jsonify(body), 400
     
     except Exception as e:
-        execution_log.append({
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'model': 'Sentiment Analyzer',
-            'endpoint': '/api/v1/sentiment',
-            'status': 'error',
-            'duration': round((time.time() - start_time) * 1000, 2)
-        })
-        return jsonify({'error': str(e)}), 500
+        body = {'error': str(e)}
+        log_execution('Sentiment Analyzer', '/api/v1/sentiment', 'error', start_time,
+            input_payload=data, output_payload=body, status_code=500)
+        return jsonify(body), 500
 
 @app.route('/api/v1/classify-image', methods=['POST'])
 def classify_image():
-    """Image Classification Endpoint (Chest X-Ray)"""
-    start_time = time.time()
+    """Image Classification Endpoint (Chest X-Ray)
+    
+    Accepts JSON ({"image_base64": ..., "patient_age": 45}) or the image
+    as a binary body (image/*, application/dicom, application/octet-stream)
+    or multipart 'file' field, with patient_age in the query string.
+    """
+    start_time = time.perf_counter()
+    data = None
     
     try:
-        data = request.get_json()
-        result = image_classifier(data)
+        if is_upload(request.mimetype):
+            data = read_upload_request('image')
+        else:
+            data = request_payload()
+        data = validate_input('Chest X-Ray Classifier', data)
+        result = infer('Chest X-Ray Classifier', image_classifier, data)
         
-        execution_log.append({
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'model': 'Chest X-Ray Classifier',
-            'endpoint': '/api/v1/classify-image',
-            'status': 'success',
-            'duration': round((time.time() - start_time) * 1000, 2)
-        })
+        log_execution('Chest X-Ray Classifier', '/api/v1/classify-image', 'success', start_time,
+            input_payload=data, output_payload=result)
         
-        return jsonify(result), 200
+        return respond(result)
+    
+    except UploadTooLarge as e:
+        body = {'error': str(e)}
+        log_execution('Chest X-Ray Classifier', '/api/v1/classify-image', 'error', start_time,
+            input_payload=data, output_payload=body, status_code=413)
+        return jsonify(body), 413
+    
+    except ValidationError as e:
+        body = e.to_dict()
+        log_execution('Chest X-Ray Classifier', '/api/v1/classify-image', 'error', start_time,
+            input_payload=data, output_payload=body, status_code=400)
+        return jsonify(body), 400
     
     except Exception as e:
-        execution_log.append({
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'model': 'Chest X-Ray Classifier',
-            'endpoint': '/api/v1/classify-image',
-            'status': 'error',
-            'duration': round((time.time() - start_time) * 1000, 2)
-        })
-        return jsonify({'error': str(e)}), 500
+        body = {'error': str(e)}
+        log_execution('Chest X-Ray Classifier', '/api/v1/classify-image', 'error', start_time,
+            input_payload=data, output_payload=body, status_code=500)
+        return jsonify(body), 500
 
 @app.route('/api/v1/detect-fraud', methods=['POST'])
 def detect_fraud():
@@ -636,31 +1289,84 @@ def detect_fraud():
         "card_present": true
     }
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
+    data = None
     
     try:
-        data = request.get_json()
-        result = fraud_detector(data)
+        data = request_payload()
+        data = validate_input('Fraud Detector', data)
+        result = infer('Fraud Detector', fraud_detector, data)
         
-        execution_log.append({
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'model': 'Fraud Detector',
-            'endpoint': '/api/v1/detect-fraud',
-            'status': 'success',
-            'duration': round((time.time() - start_time) * 1000, 2)
-        })
+        log_execution('Fraud Detector', '/api/v1/detect-fraud', 'success', start_time,
+            input_payload=data, output_payload=result)
         
-        return jsonify(result), 200
+        return respond(result)
+    
+    except ValidationError as e:
+        body = e.to_dict()
+        log_execution('Fraud Detector', '/api/v1/detect-fraud', 'error', start_time,
+            input_payload=data, output_payload=body, status_code=400)
+        return jsonify(body), 400
     
     except Exception as e:
-        execution_log.append({
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'model': 'Fraud Detector',
-            'endpoint': '/api/v1/detect-fraud',
-            'status': 'error',
-            'duration': round((time.time() - start_time) * 1000, 2)
-        })
-        return jsonify({'error': str(e)}), 500
+        body = {'error': str(e)}
+        log_execution('Fraud Detector', '/api/v1/detect-fraud', 'error', start_time,
+            input_payload=data, output_payload=body, status_code=500)
+        return jsonify(body), 500
+
+STREAM_MIMETYPES = {
+    'sse': 'text/event-stream',
+    'ndjson': 'application/x-ndjson'
+}
+
+def stream_format(args, accept_mimetypes):
+    """'sse', 'ndjson' o None, según ?stream= o la cabecera Accept"""
+    fmt = args.get('stream')
+    if fmt in STREAM_MIMETYPES:
+        return fmt
+    best = accept_mimetypes.best_match(['application/json'] + list(STREAM_MIMETYPES.values()))
+    for fmt, mimetype in STREAM_MIMETYPES.items():
+        if best == mimetype:
+            return fmt
+    return None
+
+def stream_event(fmt, event, payload):
+    """Un evento en formato Server-Sent Events o NDJSON"""
+    if fmt == 'sse':
+        return f'event: {event}\ndata: {json.dumps(payload)}\n\n'
+    return json.dumps({'event': event, 'data': payload}) + '\n'
+
+def stream_transcription(data, fmt, start_time):
+    """Respuesta en streaming de /api/v1/transcribe-audio
+
+    Registra el tiempo hasta el primer segmento en las métricas. Si el cliente
+    se desconecta, la transcripción se interrumpe y queda como 'cancelled'.
+    """
+    trace = tracing.current()  # El generador se consume después de la petición
+
+    def generate():
+        status = 'error'
+        first = True
+        result = None
+        try:
+            for event, payload in speech_recognizer_stream(data):
+                if event == 'result':
+                    result = payload
+                if first:
+                    metrics.observe_first_token('Multilingual ASR', '/api/v1/transcribe-audio',
+                                                time.perf_counter() - start_time)
+                    first = False
+                yield stream_event(fmt, event, payload)
+            status = 'success'
+        except GeneratorExit:
+            status = 'cancelled'
+            raise
+        finally:
+            log_execution('Multilingual ASR', '/api/v1/transcribe-audio', status, start_time, trace=trace,
+                input_payload=data, output_payload=result)
+
+    return Response(stream_with_context(generate()), mimetype=STREAM_MIMETYPES[fmt],
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/v1/transcribe-audio', methods=['POST'])
 def transcribe_audio():
@@ -675,55 +1381,638 @@ def transcribe_audio():
     
     Supported languages: en, es, fr
     Audio quality: excellent, good, poor
+    
+    Also accepts the audio itself as a binary body (audio/*,
+    application/octet-stream) or multipart 'file' field, with the
+    parameters in the query string; WAV duration is read from its header.
+    
+    With ?stream=sse|ndjson (or Accept: text/event-stream /
+    application/x-ndjson) partial segments are streamed as each audio
+    window is processed, followed by the full result.
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
+    data = None
     
     try:
-        data = request.get_json()
-        result = speech_recognizer(data)
+        if is_upload(request.mimetype):
+            data = read_upload_request('audio')
+        else:
+            data = request_payload()
+        data = validate_input('Multilingual ASR', data)
+        
+        fmt = stream_format(request.args, request.accept_mimetypes)
+        if fmt is not None:
+            return stream_transcription(data, fmt, start_time)
         
-        execution_log.append({
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'model': 'Multilingual ASR',
-            'endpoint': '/api/v1/transcribe-audio',
-            'status': 'success',
-            'duration': round((time.time() - start_time) * 1000, 2)
-        })
+        result = infer('Multilingual ASR', speech_recognizer, data)
         
-        return jsonify(result), 200
+        log_execution('Multilingual ASR', '/api/v1/transcribe-audio', 'success', start_time,
+            input_payload=data, output_payload=result)
+        
+        return respond(result)
+    
+    except UploadTooLarge as e:
+        body = {'error': str(e)}
+        log_execution('Multilingual ASR', '/api/v1/transcribe-audio', 'error', start_time,
+            input_payload=data, output_payload=body, status_code=413)
+        return jsonify(body), 413
+    
+    except ValidationError as e:
+        body = e.to_dict()
+        log_execution('Multilingual ASR', '/api/v1/transcribe-audio', 'error', start_time,
+            input_payload=data, output_payload=body, status_code=400)
+        return jsonify(body), 400
     
     except Exception as e:
-        execution_log.append({
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'model': 'Multilingual ASR',
-            'endpoint': '/api/v1/transcribe-audio',
-            'status': 'error',
-            'duration': round((time.time() - start_time) * 1000, 2)
-        })
-        return jsonify({'error': str(e)}), 500
+        body = {'error': str(e)}
+        log_execution('Multilingual ASR', '/api/v1/transcribe-audio', 'error', start_time,
+            input_payload=data, output_payload=body, status_code=500)
+        return jsonify(body), 500
+
+# ============================================================================
+# BATCH ENDPOINTS
+# ============================================================================
+
+def run_batch(model_name, endpoint, batch_fn):
+    """Ejecuta la petición batch actual: un lote in, un array de resultados out"""
+    start_time = time.perf_counter()
+    batch = None
+    
+    try:
+        batch = parse_batch(request_payload(batch=True))
+        size = batch_size(batch)
+        if size == 0 or size > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Batch size must be between 1 and {MAX_BATCH_SIZE}, got {size}'}), 400
+        batch = validate_batch(model_name, batch)
+        
+        inference_start = time.perf_counter()
+        with tracing.stage('inference'):
+            results = pooled(model_name, batch_fn, 'batch')(batch)
+        batch_ms = (time.perf_counter() - inference_start) * 1000
+        
+        log_execution(model_name, endpoint, 'success', start_time, batch_size=size,
+            input_payload=batch, output_payload=results)
+        
+        return respond({
+            'model': model_name,
+            'batch_size': size,
+            'results': results,
+            'timing': {
+                'batch_ms': round(batch_ms, 3),
+                'per_item_ms': round(batch_ms / size, 3),
+                'total_ms': round((time.perf_counter() - start_time) * 1000, 3)
+            }
+        }, batch=True)
+    
+    except ValidationError as e:
+        return jsonify(e.to_dict()), 400
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    except Exception as e:
+        body = {'error': str(e)}
+        log_execution(model_name, endpoint, 'error', start_time,
+            input_payload=batch, output_payload=body, status_code=500)
+        return jsonify(body), 500
+
+def make_batch_endpoint(model_name, endpoint, batch_fn):
+    """Crea la vista de un endpoint batch"""
+    def batch_endpoint():
+        return run_batch(model_name, endpoint, batch_fn)
+    
+    batch_endpoint.__name__ = f'batch_{batch_fn.__name__}'
+    return batch_endpoint
+
+BATCH_ENDPOINTS = [
+    ('/api/v1/predict/batch', 'Iris Classifier', iris_classifier_batch),
+    ('/api/v1/sentiment/batch', 'Sentiment Analyzer', sentiment_analyzer_batch),
+    ('/api/v1/classify-image/batch', 'Chest X-Ray Classifier', image_classifier_batch),
+    ('/api/v1/detect-fraud/batch', 'Fraud Detector', fraud_detector_batch),
+    ('/api/v1/transcribe-audio/batch', 'Multilingual ASR', speech_recognizer_batch),
+]
+
+for _endpoint, _model_name, _batch_fn in BATCH_ENDPOINTS:
+    app.add_url_rule(_endpoint, view_func=make_batch_endpoint(_model_name, _endpoint, _batch_fn), methods=['POST'])
+
+# Un micro-batcher por modelo, reutilizando la misma función batch
+micro_batchers = {}
+if MICROBATCH_ENABLED:
+    for _endpoint, _model_name, _batch_fn in BATCH_ENDPOINTS:
+        micro_batchers[_model_name] = MicroBatcher(
+            _model_name, pooled(_model_name, _batch_fn, 'batch'),
+            max_batch_size=MICROBATCH_MAX_SIZE,
+            window_ms=MICROBATCH_WINDOW_MS,
+            workers=MICROBATCH_WORKERS
+        )
+
+# ============================================================================
+# MODEL REGISTRY ENDPOINTS
+# ============================================================================
+
+@app.route('/api/v1/models', methods=['GET'])
+def list_models():
+    """Models discovered in models/ and their residency state"""
+    return jsonify(model_registry.describe()), 200
+
+@app.route('/api/v1/models/<name>/predict', methods=['POST'])
+def predict_registered(name):
+    """Generic prediction endpoint for any model in models/"""
+    if name not in model_registry:
+        return jsonify({'error': f"Unknown model '{name}'"}), 404
+    endpoint = f'/api/v1/models/{name}/predict'
+    start_time = time.perf_counter()
+    data = None
+    
+    try:
+        data = request_payload()
+        data = validate_input(name, data)
+        result = infer(name, lambda data: {'model': name, **model_registry.get(name).predict_vector(data['features'])}, data)
+        
+        log_execution(name, endpoint, 'success', start_time,
+            input_payload=data, output_payload=result)
+        
+        return respond(result)
+    
+    except ValidationError as e:
+        body = e.to_dict()
+        log_execution(name, endpoint, 'error', start_time,
+            input_payload=data, output_payload=body, status_code=400)
+        return jsonify(body), 400
+    
+    except Exception as e:
+        body = {'error': str(e)}
+        log_execution(name, endpoint, 'error', start_time,
+            input_payload=data, output_payload=body, status_code=500)
+        return jsonify(body), 500
+
+@app.route('/api/v1/models/<name>/predict/batch', methods=['POST'])
+def predict_registered_batch(name):
+    """Generic batch prediction endpoint for any model in models/"""
+    if name not in model_registry:
+        return jsonify({'error': f"Unknown model '{name}'"}), 404
+    
+    def batch_fn(batch):
+        return [{'model': name, **result} for result in model_registry.get(name).predict_matrix(registered_features(batch))]
+    
+    return run_batch(name, f'/api/v1/models/{name}/predict/batch', batch_fn)
+
+# ============================================================================
+# JOB QUEUE
+# ============================================================================
+
+# Función de cada modelo (latencia simulada incluida) para los trabajos en segundo plano
+MODEL_FUNCTIONS = {
+    'Iris Classifier': iris_classifier,
+    'Sentiment Analyzer': sentiment_analyzer,
+    'Chest X-Ray Classifier': image_classifier,
+    'Fraud Detector': fraud_detector,
+    'Multilingual ASR': speech_recognizer
+}
+
+def run_job(model_name, data):
+    """Ejecuta un trabajo: modelo del servidor o modelo del registro models/"""
+    if model_name in MODEL_FUNCTIONS:
+        return infer(model_name, MODEL_FUNCTIONS[model_name], data)
+    if model_name in model_registry:
+        return infer(model_name, lambda data: {'model': model_name, **model_registry.get(model_name).predict_vector(data['features'])}, data)
+    raise UnknownModel(f"Unknown model '{model_name}'")
+
+def record_job(model_name, status, duration_ms):
+    execution_log.record(model_name, '/api/v1/jobs', status, duration_ms)
+
+# Cola persistente (SQLite) de ejecuciones asíncronas. Los modelos lentos
+# tienen un límite propio de ejecuciones simultáneas entre todos los procesos
+# (MODEL_SERVER_JOB_CONCURRENCY="Modelo=n,..."); el resto, solo el de los hilos
+# de cada proceso. Un trabajo cuyo proceso muere se reintenta al vencer su
+# lease (MODEL_SERVER_JOB_LEASE_SECONDS)
+job_queue = JobQueue(
+    os.environ.get('MODEL_SERVER_JOBS_DB',
+                   os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jobs.sqlite3')),
+    run_job,
+    workers=int(os.environ.get('MODEL_SERVER_JOB_WORKERS', 4)),
+    model_concurrency=parse_concurrency(os.environ.get(
+        'MODEL_SERVER_JOB_CONCURRENCY', 'Chest X-Ray Classifier=2,Multilingual ASR=2')),
+    retention=float(os.environ.get('MODEL_SERVER_JOB_RETENTION', 86400)),
+    lease=float(os.environ.get('MODEL_SERVER_JOB_LEASE_SECONDS', 30)),
+    on_complete=record_job
+)
+
+def submit_job(payload):
+    """Encola un trabajo; devuelve (cuerpo, código HTTP). Compartido con async_server.py"""
+    if not isinstance(payload, dict) or not isinstance(payload.get('model'), str):
+        return {'error': 'Job payload must be {"model": ..., "input": {...}, "priority": 0}'}, 400
+    model_name = payload['model']
+    if model_name not in MODEL_FUNCTIONS and model_name not in model_registry:
+        return {'error': f"Unknown model '{model_name}'"}, 404
+    try:
+        priority = int(payload.get('priority', 0))
+    except (TypeError, ValueError):
+        return {'error': 'priority must be an integer'}, 400
+    try:
+        # Se valida al encolar: un trabajo mal formado no llega a la cola
+        data = validate_input(model_name, payload.get('input') or {})
+    except ValidationError as e:
+        return e.to_dict(), 400
+    return job_queue.submit(model_name, data, priority), 202
+
+def cancel_job(job_id):
+    """Cancela un trabajo; devuelve (cuerpo, código HTTP)"""
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return {'error': f"Unknown job '{job_id}'"}, 404
+    if job['status'] != 'cancelled':
+        return {'error': f"Job already finished with status '{job['status']}'", **job}, 409
+    return job, 200
+
+def limit_arg(args, default, maximum):
+    """Parámetro ?limit= entre 1 y ``maximum`` (ValidationError, HTTP 400, si no es un entero)"""
+    value = args.get('limit')
+    if value is None:
+        return default
+    try:
+        return max(1, min(int(value), maximum))
+    except ValueError:
+        raise ValidationError([('limit', f'must be an integer, got {value!r}')]) from None
+
+def list_jobs_args(args):
+    """Filtros de GET /api/v1/jobs (status, model, limit)"""
+    return {
+        'status': args.get('status'),
+        'model': args.get('model'),
+        'limit': limit_arg(args, 50, 1000)
+    }
+
+@app.before_request
+def start_job_workers():
+    # Pool por proceso, arrancado en la primera petición: retoma los
+    # trabajos pendientes de una ejecución anterior
+    job_queue.start()
+
+@app.route('/api/v1/jobs', methods=['POST'])
+def create_job():
+    """Submit an asynchronous execution: {"model": ..., "input": {...}, "priority": 0}"""
+    body, status_code = submit_job(request.get_json(silent=True))
+    headers = {'Location': f"/api/v1/jobs/{body['job_id']}"} if status_code == 202 else {}
+    return jsonify(body), status_code, headers
+
+@app.route('/api/v1/jobs', methods=['GET'])
+def list_jobs():
+    """Most recent jobs, optionally filtered by status and model"""
+    try:
+        filters = list_jobs_args(request.args)
+    except ValidationError as e:
+        return jsonify(e.to_dict()), 400
+    return jsonify(job_queue.list(**filters)), 200
+
+@app.route('/api/v1/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status, and its result once finished"""
+    job = job_queue.get(job_id, include_input=request.args.get('input') == '1')
+    if job is None:
+        return jsonify({'error': f"Unknown job '{job_id}'"}), 404
+    return jsonify(job), 200
+
+@app.route('/api/v1/jobs/<job_id>', methods=['DELETE'])
+def delete_job(job_id):
+    """Cancel a pending or running job"""
+    body, status_code = cancel_job(job_id)
+    return jsonify(body), status_code
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+# Endpoint -> modelo, para etiquetar las métricas de cada petición
+MODEL_ENDPOINTS = {}
+for _endpoint, _model_name, _batch_fn in BATCH_ENDPOINTS:
+    MODEL_ENDPOINTS[_endpoint] = _model_name
+    MODEL_ENDPOINTS[_endpoint[:-len('/batch')]] = _model_name
+
+def metric_labels():
+    """(modelo, endpoint) de la petición actual, o None si no es de un modelo"""
+    model_name = MODEL_ENDPOINTS.get(request.path)
+    if model_name is not None:
+        return model_name, request.path
+    name = (request.view_args or {}).get('name')
+    if name is not None and name in model_registry:
+        return name, request.path
+    return None
+
+@app.before_request
+def start_request_metrics():
+    labels = metric_labels()
+    if labels is not None:
+        g.metrics_labels = labels
+        g.metrics_start = time.perf_counter()
+        metrics.start(*labels)
+        g.trace = tracing.begin(request.headers)
+        if profiler is not None:
+            profiler.begin(g.trace)
+
+@app.after_request
+def observe_request_metrics(response):
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        metrics.observe(*g.metrics_labels, response.status_code,
+                        time.perf_counter() - start,
+                        request_bytes=request.content_length,
+                        response_bytes=response.content_length)
+    trace = g.get('trace')
+    if trace is not None:
+        metrics.observe_stages(*g.metrics_labels, trace.seconds())
+        response.headers['X-Trace-Id'] = trace.trace_id
+        response.headers['Server-Timing'] = trace.server_timing()
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    labels = g.pop('metrics_labels', None)
+    if labels is not None:
+        metrics.finish(*labels)
+    trace = g.pop('trace', None)
+    if trace is not None:
+        path = profiler.end(trace) if profiler is not None else None
+        if path is not None:
+            print(f"🐢 Slow request {trace.trace_id} ({trace.elapsed() * 1000:.0f} ms): profile written to {path}")
+        tracing.end(trace)
+
+# ============================================================================
+# ADMISSION CONTROL
+# ============================================================================
+
+# Bulkheads por modelo (ver admission.py): MODEL_SERVER_BULKHEADS="Modelo=en_curso:cola,..."
+# Por defecto solo se limitan los modelos lentos, para que no acaparen los
+# hilos del servidor. Plazo de espera en cola: cabecera X-Execution-Timeout
+# (ms) o MODEL_SERVER_QUEUE_TIMEOUT_MS
+QUEUE_TIMEOUT = float(os.environ.get('MODEL_SERVER_QUEUE_TIMEOUT_MS', 30000)) / 1000
+bulkheads = {
+    name: Bulkhead(name, max_in_flight, max_queue, default_timeout=QUEUE_TIMEOUT)
+    for name, (max_in_flight, max_queue) in parse_bulkheads(os.environ.get(
+        'MODEL_SERVER_BULKHEADS', 'Chest X-Ray Classifier=4:8,Multilingual ASR=4:8')).items()
+}
+
+def rejection(error, model_name, endpoint):
+    """(cuerpo, código, cabeceras) de una petición rechazada; compartido con async_server.py"""
+    trace = tracing.current()
+    execution_log.record(model_name, endpoint, 'rejected', 0,
+                         trace_id=trace.trace_id if trace is not None else None)
+    metrics.reject(model_name, endpoint, error.status_code)
+    return ({'error': str(error), 'retry_after_seconds': error.retry_after},
+            error.status_code, {'Retry-After': str(error.retry_after)})
+
+@app.before_request
+def admit_request():
+    labels = g.get('metrics_labels')
+    bulkhead = bulkheads.get(labels[0]) if labels is not None else None
+    if bulkhead is None:
+        return None
+    try:
+        with tracing.stage('queue'):
+            g.admitted_at = bulkhead.acquire(request_timeout(request.headers))
+        g.bulkhead = bulkhead
+    except Rejected as e:
+        body, status_code, headers = rejection(e, *labels)
+        return jsonify(body), status_code, headers
+
+@app.teardown_request
+def release_admission(exc):
+    bulkhead = g.pop('bulkhead', None)
+    if bulkhead is not None:
+        bulkhead.release(g.pop('admitted_at', None))
+
+# ============================================================================
+# STARTUP REPORT
+# ============================================================================
+
+_first_request_lock = threading.Lock()
+_first_request_ms = None
+
+def mark_first_request():
+    """Registra el tiempo hasta la primera petición (desde el import del módulo)"""
+    global _first_request_ms
+    if _first_request_ms is None:
+        with _first_request_lock:
+            if _first_request_ms is None:
+                _first_request_ms = (time.perf_counter() - _import_start) * 1000
+
+@app.before_request
+def record_first_request():
+    mark_first_request()
+
+def startup_report():
+    """Tiempos de arranque: import, carga de modelos y primera petición"""
+    return {
+        'import_ms': round(_import_ms, 2),
+        'model_preload_ms': round(_preload_ms, 2),
+        'model_load_ms': {name: round(ms, 2) for name, ms in model_registry.load_times.items()},
+        'first_request_ms': round(_first_request_ms, 2) if _first_request_ms is not None else None
+    }
+
+# ============================================================================
+# MULTI-PROCESS STATE
+# ============================================================================
+
+# En modo producción (gunicorn, ver gunicorn.conf.py) cada worker publica su
+# estado en MODEL_SERVER_STATE_DIR y las vistas combinan el de todos
+STATE_DIR = os.environ.get('MODEL_SERVER_STATE_DIR')
+
+def local_snapshot():
+    return {
+        'pid': os.getpid(),
+        'executions': execution_log.snapshot(10),
+        'metrics': metrics.snapshot()
+    }
+
+cluster = ClusterState(STATE_DIR, local_snapshot) if STATE_DIR else None
+
+def execution_totals():
+    """Contadores de ejecuciones de todos los procesos"""
+    if cluster is None:
+        return execution_log.counters()
+    return merge_counters(
+        [execution_log.counters()] +
+        [snapshot['executions']['counters'] for _, snapshot in cluster.peers()]
+    )
+
+def recent_executions(n=10):
+    """Últimas n ejecuciones de todos los procesos"""
+    local = [entry.to_dict() for entry in execution_log.recent(n)]
+    if cluster is None:
+        return local
+    return merge_recent(
+        [local] + [snapshot['executions']['recent'] for _, snapshot in cluster.peers()], n
+    )
+
+def metrics_text():
+    """Métricas Prometheus de todos los procesos"""
+    if cluster is None:
+        return metrics.render()
+    merged = MetricsRegistry()
+    merged.merge(metrics.snapshot())
+    for alive, snapshot in cluster.peers():
+        merged.merge(snapshot['metrics'], include_gauges=alive)
+    return merged.render()
+
+# ============================================================================
+# EXECUTION FEED
+# ============================================================================
+
+# El dashboard se actualiza con las ejecuciones nuevas desde un cursor
+# ("pid:seq,..." , un número de secuencia por proceso) en lugar de recargarse
+FEED_INTERVAL = float(os.environ.get('MODEL_SERVER_FEED_INTERVAL_MS', 1000)) / 1000
+FEED_STREAM_SECONDS = float(os.environ.get('MODEL_SERVER_FEED_STREAM_SECONDS', 60))
+# Cada stream SSE ocupa un hilo del worker mientras dura (ver gunicorn.conf.py):
+# por encima de este número de streams por proceso se responde 503 y el
+# dashboard pasa a consultar /api/v1/executions/feed periódicamente
+FEED_MAX_STREAMS = int(os.environ.get('MODEL_SERVER_FEED_MAX_STREAMS', 2))
+feed_streams = threading.BoundedSemaphore(FEED_MAX_STREAMS)
+
+def parse_cursor(cursor):
+    """'pid:seq,pid:seq' -> {pid: seq}"""
+    positions = {}
+    for item in (cursor or '').split(','):
+        pid, _, seq = item.partition(':')
+        if pid.isdigit() and seq.lstrip('-').isdigit():
+            positions[int(pid)] = int(seq)
+    return positions
+
+def execution_feed(cursor=None, limit=50):
+    """Ejecuciones posteriores a ``cursor`` (la más reciente primero), contadores y nuevo cursor"""
+    positions = parse_cursor(cursor)
+    pid = os.getpid()
+    sources = [(pid, [entry.to_dict() for entry in execution_log.since(positions.get(pid, -1), limit)])]
+    counters = [execution_log.counters()]
+    if cluster is not None:
+        for _, snapshot in cluster.peers():
+            after = positions.get(snapshot['pid'], -1)
+            sources.append((snapshot['pid'],
+                            [entry for entry in snapshot['executions']['recent'] if entry['seq'] > after]))
+            counters.append(snapshot['executions']['counters'])
+
+    executions = []
+    for source_pid, entries in sources:
+        if entries:
+            positions[source_pid] = max(positions.get(source_pid, -1), max(entry['seq'] for entry in entries))
+        executions.extend(entries)
+    executions.sort(key=lambda entry: entry['time'], reverse=True)
+
+    return {
+        'cursor': ','.join(f'{source_pid}:{seq}' for source_pid, seq in sorted(positions.items())),
+        'executions': executions[:limit],
+        'counters': counters[0] if len(counters) == 1 else merge_counters(counters)
+    }
+
+def feed_event(cursor, last_total):
+    """(evento SSE o None, cursor, total): solo hay evento si hubo ejecuciones nuevas"""
+    total = execution_totals()['total']
+    if total == last_total:
+        return None, cursor, total
+    feed = execution_feed(cursor)
+    return f"id: {feed['cursor']}\nevent: executions\ndata: {json.dumps(feed)}\n\n", feed['cursor'], total
+
+@app.route('/api/v1/executions/feed', methods=['GET'])
+def executions_feed():
+    """Executions after ?after=<cursor>, plus aggregated counters (JSON polling)"""
+    try:
+        limit = limit_arg(request.args, 50, 500)
+    except ValidationError as e:
+        return jsonify(e.to_dict()), 400
+    return jsonify(execution_feed(request.args.get('after'), limit)), 200
+
+@app.route('/api/v1/executions/stream', methods=['GET'])
+def executions_stream():
+    """Server-Sent Events with new executions (resumes from Last-Event-ID)
+
+    Each connection lasts MODEL_SERVER_FEED_STREAM_SECONDS; the browser's
+    EventSource reconnects on its own and continues from the last cursor.
+    Each stream holds a worker thread: beyond MODEL_SERVER_FEED_MAX_STREAMS
+    per process it answers 503 and the dashboard polls /executions/feed.
+    """
+    if not feed_streams.acquire(blocking=False):
+        return jsonify({'error': 'Too many execution streams, poll /api/v1/executions/feed'}), 503, \
+            {'Retry-After': str(max(1, int(FEED_STREAM_SECONDS)))}
+    cursor = request.args.get('after') or request.headers.get('Last-Event-ID')
+
+    def generate(cursor):
+        yield f'retry: {int(FEED_INTERVAL * 2000)}\n\n'
+        deadline = time.monotonic() + FEED_STREAM_SECONDS
+        last_total = None
+        while time.monotonic() < deadline:
+            event, cursor, last_total = feed_event(cursor, last_total)
+            yield event or ': keepalive\n\n'
+            time.sleep(FEED_INTERVAL)
+
+    response = Response(generate(cursor), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Se libera al cerrar la respuesta: fin del stream o cliente desconectado
+    response.call_on_close(feed_streams.release)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus metrics endpoint (text exposition format)"""
+    return Response(metrics_text(), mimetype='text/plain; version=0.0.4')
+
+def health_status():
+    """Estado del servidor (compartido con async_server.py)"""
+    totals = execution_totals()
+    return {
+        'status': 'healthy',
+        'models': list(MODEL_COMPUTE),
+        'registry': model_registry.describe(),
+        'total_requests': totals['total'],
+        'executions': totals,
+        'pid': os.getpid(),
+        'startup': startup_report(),
+        'micro_batching': {
+            name: batcher.stats() for name, batcher in micro_batchers.items()
+        } if MICROBATCH_ENABLED else None,
+        'prediction_cache': {
+            name: cache.stats() for name, cache in prediction_caches.items()
+        } if CACHE_ENABLED else None,
+        'jobs': job_queue.stats(),
+        'admission': {name: bulkhead.stats() for name, bulkhead in bulkheads.items()},
+        'execution_sink': execution_sink.stats() if execution_sink is not None else None,
+        'process_pools': {
+            name: pool.stats() for name, pool in process_pools.items()
+        } if process_pools else None,
+        'profiler': profiler.stats() if profiler is not None else None,
+        'latency_profiles': {
+            name: profile.describe() for name, profile in latency_profiles.items()
+        },
+        'timestamp': datetime.now().isoformat()
+    }
 
 @app.route('/api/v1/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'models': ['iris-classifier', 'sentiment-analyzer', 'image-classifier'],
-        'total_requests': len(execution_log),
-        'timestamp': datetime.now().isoformat()
-    }), 200
+    return jsonify(health_status()), 200
+
+# Tiempo total de import del módulo, precarga de modelos incluida
+_import_ms = (time.perf_counter() - _import_start) * 1000
 
 if __name__ == '__main__':
+    port = int(os.environ.get('MODEL_SERVER_PORT', 8080))
+    
     print("=" * 70)
     print("🤖 AI Model Mock Server Starting...")
     print("=" * 70)
-    print(f"📊 Dashboard: http://localhost:8080")
+    print(f"📊 Dashboard: http://localhost:{port}")
     print(f"🔌 API Endpoints:")
-    print(f"   - POST http://localhost:8080/api/v1/predict (Iris Classifier)")
-    print(f"   - POST http://localhost:8080/api/v1/sentiment (Sentiment Analyzer)")
-    print(f"   - POST http://localhost:8080/api/v1/classify-image (Image Classifier)")
-    print(f"   - GET  http://localhost:8080/api/v1/health (Health Check)")
+    print(f"   - POST http://localhost:{port}/api/v1/predict (Iris Classifier)")
+    print(f"   - POST http://localhost:{port}/api/v1/sentiment (Sentiment Analyzer)")
+    print(f"   - POST http://localhost:{port}/api/v1/classify-image (Image Classifier)")
+    print(f"   - POST http://localhost:{port}/api/v1/<endpoint>/batch (Batch mode, any model)")
+    print(f"   - GET  http://localhost:{port}/api/v1/models (Models discovered in models/)")
+    print(f"   - POST http://localhost:{port}/api/v1/models/<name>/predict (Any model in models/)")
+    print(f"   - GET  http://localhost:{port}/api/v1/health (Health Check)")
+    print(f"   - GET  http://localhost:{port}/metrics (Prometheus metrics)")
     print("=" * 70)
+    report = startup_report()
+    print(f"⏱  Startup: import {report['import_ms']} ms (model preload {report['model_preload_ms']} ms)")
     print("✨ Server ready for model execution testing!")
     print("=" * 70)
     
-    app.run(host='0.0.0.0', port=8080, debug=False)
+    start_process_pools()
+    app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,323 @@
+"""
+Model Artifacts
+===============
+
+Formato de modelo sin pickle: los arrays del modelo (tablas de nodos de los
+árboles, coeficientes) se guardan como ficheros ``.npy`` en el directorio
+``<nombre>.arrays/``, junto a ``<nombre>_metadata.json``::
+
+    models/
+        iris_classifier_metadata.json
+        iris_classifier.arrays/
+            manifest.json       tipo de modelo, clases y dtype/shape de cada array
+            left.npy
+            right.npy
+            ...
+
+Los arrays se abren con ``np.load(mmap_mode='r')`` y ``allow_pickle=False``:
+cargar un modelo no ejecuta código, apenas lee nada al arrancar y todos los
+workers comparten la misma copia de los pesos en la page cache.
+
+Para convertir un modelo pickle existente (de confianza)::
+
+    python model_artifacts.py iris_classifier
+"""
+
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+ARTIFACT_SUFFIX = '.arrays'
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+
+
+class ArtifactError(ValueError):
+    """Artefacto incompleto, inconsistente o de un tipo no soportado"""
+
+
+def artifact_path(name, models_dir):
+    return os.path.join(models_dir, f'{name}{ARTIFACT_SUFFIX}')
+
+
+def has_artifact(name, models_dir):
+    return os.path.exists(os.path.join(artifact_path(name, models_dir), MANIFEST))
+
+
+# ============================================================================
+# MODELOS RESPALDADOS POR ARRAYS
+# ============================================================================
+
+class TreeEnsemble:
+    """Bosque de árboles de decisión sobre tablas de nodos planas
+
+    Los nodos de todos los árboles van concatenados; ``roots`` marca dónde
+    empieza cada árbol y ``left``/``right`` usan índices globales (-1 en las
+    hojas). ``value`` son las probabilidades por clase de cada nodo y
+    ``transitions`` la tabla que recorre la inferencia (ver _transitions): se
+    calcula al exportar y se guarda con el resto, así que también se mapea en
+    memoria y la comparten todos los procesos en lugar de construirla cada uno.
+
+    La inferencia recorre todos los árboles y todas las filas a la vez con
+    operaciones NumPy, sin la validación ni el reparto por árbol (joblib) que
+    scikit-learn paga en cada llamada.
+    """
+
+    kind = 'tree_ensemble'
+    array_names = ('roots', 'left', 'right', 'feature', 'threshold', 'value', 'transitions')
+
+    def __init__(self, classes, n_features, roots, left, right, feature, threshold, value,
+                 transitions=None, depth=None):
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = int(n_features)
+        # Índices en intp: se usan para indexar sin convertirlos en cada llamada
+        # (con los arrays del artefacto, sin copia)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.left = left
+        self.right = right
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = threshold
+        self.value = value
+        self.depth = _max_depth(roots, left, right) if depth is None else int(depth)
+        self.transitions = _transitions(left, right) if transitions is None else transitions
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        """Tablas de nodos de un árbol o bosque de clasificación de scikit-learn"""
+        trees = getattr(estimator, 'estimators_', [estimator])
+        roots, left, right, feature, threshold, value = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            t = tree.tree_
+            leaf = t.children_left < 0
+            roots.append(offset)
+            left.append(np.where(leaf, -1, t.children_left + offset))
+            right.append(np.where(leaf, -1, t.children_right + offset))
+            feature.append(np.where(leaf, 0, t.feature))
+            threshold.append(t.threshold)
+            # Como DecisionTreeClassifier.predict_proba: recuentos normalizados por nodo
+            counts = t.value[:, 0, :]
+            value.append(counts / np.maximum(counts.sum(axis=1, keepdims=True), np.finfo(float).tiny))
+            offset += t.node_count
+        return cls(
+            estimator.classes_.tolist(), estimator.n_features_in_,
+            np.asarray(roots, dtype=np.intp),
+            np.concatenate(left).astype(np.int32),
+            np.concatenate(right).astype(np.int32),
+            np.concatenate(feature).astype(np.intp),
+            np.concatenate(threshold).astype(np.float64),
+            np.concatenate(value).astype(np.float64)
+        )
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.array_names}
+
+    def predict_proba(self, X, chunk_rows=4096):
+        """Media de las probabilidades de todos los árboles
+
+        ``node`` es una matriz (árboles, filas): en cada paso todos los nodos
+        bajan un nivel a la vez, y tras ``depth`` pasos todos están en una hoja.
+        """
+        # scikit-learn compara las features en float32
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        n = len(X)
+        if n > chunk_rows:
+            # Acota la matriz (árboles, filas, clases) de los lotes grandes
+            return np.vstack([self.predict_proba(X[i:i + chunk_rows]) for i in range(0, n, chunk_rows)])
+        # Features por columnas: el valor de la feature f de la fila r está en f * n + r
+        columns = X.T.ravel()
+        rows = np.arange(n)
+        node = np.repeat(self.roots[:, None], n, axis=1)
+        for _ in range(self.depth):
+            go_right = columns[self.feature[node] * n + rows] > self.threshold[node]
+            node = self.transitions[2 * node + go_right]
+        return self.value[node].sum(axis=0) / len(self.roots)
+
+
+def _transitions(left, right):
+    """Tabla de transiciones: transitions[2 * nodo + (x > umbral)] es el nodo siguiente
+
+    Las hojas apuntan a sí mismas, así que basta con dar ``depth`` pasos.
+    """
+    nodes = np.arange(len(left))
+    leaf = np.asarray(left) < 0
+    transitions = np.empty(2 * len(left), dtype=np.intp)
+    transitions[0::2] = np.where(leaf, nodes, left)
+    transitions[1::2] = np.where(leaf, nodes, right)
+    return transitions
+
+
+def _max_depth(roots, left, right):
+    """Profundidad máxima (en aristas) de los árboles"""
+    frontier = np.asarray(roots, dtype=np.intp)
+    depth = 0
+    while True:
+        children = np.concatenate([left[frontier], right[frontier]])
+        frontier = children[children >= 0].astype(np.intp)
+        if not len(frontier):
+            return depth
+        depth += 1
+
+
+class LinearModel:
+    """Regresión logística: ``coef`` (clases o 1, features) e ``intercept``"""
+
+    kind = 'linear'
+    array_names = ('coef', 'intercept')
+
+    def __init__(self, classes, n_features, coef, intercept, multinomial=True):
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = int(n_features)
+        self.coef = coef
+        self.intercept = intercept
+        self.multinomial = bool(multinomial)
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        multinomial = getattr(estimator, 'multi_class', 'auto') != 'ovr' and len(estimator.classes_) > 2
+        return cls(estimator.classes_.tolist(), estimator.n_features_in_,
+                   np.asarray(estimator.coef_, dtype=np.float64),
+                   np.asarray(estimator.intercept_, dtype=np.float64), multinomial)
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.array_names}
+
+    def predict_proba(self, X):
+        scores = np.asarray(X, dtype=np.float64) @ self.coef.T + self.intercept
+        if scores.shape[1] == 1:
+            positive = 1 / (1 + np.exp(-scores[:, 0]))
+            return np.column_stack([1 - positive, positive])
+        if self.multinomial:
+            scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        else:
+            scores = 1 / (1 + np.exp(-scores))
+        return scores / scores.sum(axis=1, keepdims=True)
+
+
+MODEL_KINDS = {model_class.kind: model_class for model_class in (TreeEnsemble, LinearModel)}
+
+# Estimadores de scikit-learn que se pueden exportar
+EXPORTERS = {
+    'DecisionTreeClassifier': TreeEnsemble,
+    'ExtraTreeClassifier': TreeEnsemble,
+    'RandomForestClassifier': TreeEnsemble,
+    'ExtraTreesClassifier': TreeEnsemble,
+    'LogisticRegression': LinearModel
+}
+
+
+# ============================================================================
+# LECTURA Y ESCRITURA
+# ============================================================================
+
+def save_artifact(model, path):
+    """Escribe el modelo en ``path`` (se sustituye entero; el manifest, al final)"""
+    arrays = model.arrays()
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'kind': model.kind,
+        'classes': model.classes_.tolist(),
+        'n_features': model.n_features_in_,
+        'arrays': {name: {'dtype': array.dtype.str, 'shape': list(array.shape)} for name, array in arrays.items()}
+    }
+    if isinstance(model, LinearModel):
+        manifest['multinomial'] = model.multinomial
+    if isinstance(model, TreeEnsemble):
+        manifest['depth'] = model.depth
+
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(array), allow_pickle=False)
+    with open(os.path.join(tmp_path, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp_path, path)
+
+
+def load_artifact(path, mmap=True):
+    """Modelo respaldado por los arrays de ``path`` (mapeados en memoria por defecto)"""
+    with open(os.path.join(path, MANIFEST), 'r') as f:
+        manifest = json.load(f)
+    version = manifest.get('format_version')
+    if version != FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported artifact version {version}")
+    model_class = MODEL_KINDS.get(manifest.get('kind'))
+    if model_class is None:
+        raise ArtifactError(f"Unsupported model kind '{manifest.get('kind')}'")
+
+    arrays = {}
+    for name in model_class.array_names:
+        spec = manifest['arrays'].get(name)
+        if spec is None:
+            raise ArtifactError(f"Artifact is missing array '{name}'")
+        array = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None, allow_pickle=False)
+        if array.dtype.str != spec['dtype'] or list(array.shape) != spec['shape']:
+            raise ArtifactError(f"Array '{name}' does not match the manifest")
+        arrays[name] = array
+
+    if model_class is LinearModel:
+        extra = {'multinomial': manifest.get('multinomial', True)}
+    else:
+        extra = {'depth': manifest.get('depth')}
+    return model_class(manifest['classes'], manifest['n_features'], **arrays, **extra)
+
+
+def compile_estimator(estimator):
+    """Modelo de arrays equivalente a un estimador de scikit-learn"""
+    model_class = EXPORTERS.get(type(estimator).__name__)
+    if model_class is None:
+        raise ArtifactError(f'Cannot export {type(estimator).__name__} (supported: {", ".join(EXPORTERS)})')
+    return model_class.from_estimator(estimator)
+
+
+def export_estimator(estimator, path):
+    """Convierte un estimador de scikit-learn y lo guarda como artefacto"""
+    model = compile_estimator(estimator)
+    save_artifact(model, path)
+    return model
+
+
+def main(argv):
+    """python model_artifacts.py <nombre> [models_dir]: exporta <nombre>.pkl"""
+    import pickle
+
+    from model_engine import MODELS_DIR
+
+    if not argv:
+        print(main.__doc__)
+        return 2
+    name = argv[0]
+    models_dir = argv[1] if len(argv) > 1 else MODELS_DIR
+    with open(os.path.join(models_dir, f'{name}.pkl'), 'rb') as f:
+        estimator = pickle.load(f)
+    with open(os.path.join(models_dir, f'{name}_metadata.json'), 'r') as f:
+        metadata = json.load(f)
+
+    path = artifact_path(name, models_dir)
+    export_estimator(estimator, path)
+    model = load_artifact(path)
+
+    # Comprobación: mismas probabilidades en el ejemplo y en puntos del rango de cada feature
+    features = sorted(metadata.get('input_features', []), key=lambda f: f['position'])
+    rng = np.random.default_rng(0)
+    X = rng.uniform([f['min'] for f in features], [f['max'] for f in features], size=(1000, len(features)))
+    if metadata.get('example_input'):
+        X = np.vstack([metadata['example_input'], X])
+    error = np.abs(model.predict_proba(X) - estimator.predict_proba(X)).max()
+    if error > 1e-9:
+        shutil.rmtree(path)
+        print(f"❌ {name}: exported model differs from the pickle (max error {error:.3g})")
+        return 1
+
+    size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+    print(f"✅ {name}: {model.kind} written to {path} ({size / 1024:.1f} KB, max error {error:.3g})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,287 @@
+"""
+Model Engine
+============
+
+Carga de modelos serializados junto a su fichero de metadatos
+``*_metadata.json`` y ejecución de inferencia real con ``predict_proba``.
+
+Cada modelo puede estar como artefacto de arrays ``<nombre>.arrays/`` (ver
+model_artifacts.py: ficheros .npy mapeados en memoria, sin pickle) o como
+``<nombre>.pkl``; si existen los dos se usa el artefacto. Los bosques y
+modelos lineales cargados desde pickle se compilan al cargar a ese mismo
+formato de arrays, que evita el coste fijo por llamada de scikit-learn; el
+modelo compilado solo se usa si reproduce a scikit-learn y el
+``example_output`` de los metadatos.
+
+ModelRegistry descubre los modelos con ``<nombre>_metadata.json`` del
+directorio models/, carga cada modelo la primera vez que se usa (o al
+arrancar, si se precarga) y limita el número de modelos residentes en memoria
+con una política LRU. Cada petición solo paga el coste de construir el
+vector de features y de la inferencia. Con set_runner(), predict_proba de un
+modelo se ejecuta fuera del servidor (p. ej. en un pool de procesos, ver
+model_pools.py); la validación y la respuesta se siguen construyendo aquí.
+"""
+
+import glob
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from input_schema import InputSchema, ValidationError, feature_key  # noqa: F401 (feature_key se reexporta)
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+# example_output de los metadatos va redondeado a 2 decimales
+EXAMPLE_TOLERANCE = 0.005
+# El modelo compilado debe coincidir con scikit-learn salvo redondeo
+COMPILED_TOLERANCE = 1e-9
+
+
+def has_artifact(name, models_dir):
+    """Igual que model_artifacts.has_artifact, sin importar NumPy (ver PickledModel.load)"""
+    return os.path.exists(os.path.join(models_dir, f'{name}.arrays', 'manifest.json'))
+
+
+class PickledModel:
+    """Modelo scikit-learn (pickle o artefacto de arrays) cargado desde disco con sus metadatos"""
+
+    def __init__(self, model, metadata, source='pickle', input_range='off', fill_means=False):
+        self.model = model
+        self.metadata = metadata
+        self.source = source
+        # Función que sustituye a model.predict_proba (matriz float64 -> probabilidades)
+        self.runner = None
+        # Las columnas de predict_proba siguen model.classes_; si son índices
+        # se traducen con la lista 'classes' de los metadatos
+        names = metadata.get('classes')
+        if names and all(hasattr(c, '__index__') for c in model.classes_):
+            self.classes = [names[int(c)] for c in model.classes_]
+        else:
+            self.classes = [str(c) for c in model.classes_]
+
+        # Validador de la entrada compilado desde input_features (tipos, rangos,
+        # medias solo con fill_means); una clave que no es una feature es un error
+        self.schema = InputSchema(metadata.get('input_features', []), input_range, fill_means, strict=True)
+        self.feature_names = [field.name for field in self.schema.fields]
+        self.feature_keys = self.schema.keys
+        self.feature_defaults = self.schema.defaults
+
+    @classmethod
+    def load(cls, name, models_dir=MODELS_DIR, compile=True, input_range='off', fill_means=False):
+        """Carga '<name>.arrays/' (o '<name>.pkl') y '<name>_metadata.json' desde models_dir"""
+        # Import diferido: NumPy solo lo pagan los procesos que cargan un modelo
+        from model_artifacts import EXPORTERS, ArtifactError, artifact_path, compile_estimator, load_artifact
+
+        with open(os.path.join(models_dir, f'{name}_metadata.json'), 'r') as f:
+            metadata = json.load(f)
+        if has_artifact(name, models_dir):
+            model = cls(load_artifact(artifact_path(name, models_dir)), metadata, 'arrays', input_range, fill_means)
+            error = model.example_error()
+            if error > EXAMPLE_TOLERANCE:
+                raise ArtifactError(f"Artifact for '{name}' does not reproduce example_output (error {error:.3g})")
+            return model
+
+        with open(os.path.join(models_dir, f'{name}.pkl'), 'rb') as f:
+            model = cls(pickle.load(f), metadata, 'pickle', input_range, fill_means)
+        if compile and type(model.model).__name__ in EXPORTERS:
+            compiled = cls(compile_estimator(model.model), metadata, 'compiled', input_range, fill_means)
+            reference_error = compiled.reference_error(model)
+            example_error = compiled.example_error()
+            if reference_error <= COMPILED_TOLERANCE and example_error <= EXAMPLE_TOLERANCE:
+                return compiled
+            print(f"⚠ Model '{name}': compiled inference does not match scikit-learn "
+                  f"(error {reference_error:.3g}, example_output error {example_error:.3g}), using predict_proba")
+        return model
+
+    def example_vector(self):
+        # Sin example_input en los metadatos, el vector de medias
+        return self.metadata.get('example_input') or self.schema.means
+
+    def example_error(self):
+        """Diferencia máxima de predict_proba(example_input) con example_output (0 si no hay)"""
+        expected = (self.metadata.get('example_output') or {}).get('probabilities')
+        names = self.metadata.get('classes')
+        if not expected or not names or len(expected) != len(names) or not set(self.classes) <= set(names):
+            return 0.0
+        probabilities = self.predict_proba([self.example_vector()])[0]
+        # example_output sigue el orden de 'classes'; predict_proba, el de self.classes
+        return float(max(abs(p - expected[names.index(c)]) for c, p in zip(self.classes, probabilities)))
+
+    def reference_error(self, reference):
+        """Diferencia máxima de predict_proba(example_input) con la de otro modelo"""
+        vector = [self.example_vector()]
+        return float(abs(self.predict_proba(vector)[0] - reference.predict_proba(vector)[0]).max())
+
+    def feature_vector(self, data):
+        """Mapea el JSON de entrada a la lista de features en orden posicional
+
+        Acepta una lista ``features`` ya ordenada o claves por feature, tanto
+        normalizadas ('sepal_length') como el nombre original de los metadatos.
+        Lanza ValidationError (HTTP 400) con tipos o rangos no válidos, claves
+        desconocidas o features ausentes (salvo con fill_means: su media).
+        """
+        return self.schema.vector(data)
+
+    def feature_matrix(self, batch):
+        """Construye la matriz (n, features) de un lote
+
+        ``batch`` puede ser una lista de registros JSON o un dict columnar
+        ``{feature: [valores...]}``; en el caso columnar cada columna se
+        valida y convierte directamente en un array sin construir dicts por fila.
+        """
+        return self.schema.matrix(batch)
+
+    def predict_proba(self, rows):
+        """Probabilidades por clase para una lista de vectores de features"""
+        if self.runner is not None:
+            import numpy as np
+            return self.runner(np.asarray(rows, dtype=np.float64))
+        return self.model.predict_proba(rows)
+
+    def predict(self, data):
+        """Inferencia de un único registro JSON"""
+        return self.predict_vector(self.feature_vector(data))
+
+    def predict_vector(self, vector):
+        """Inferencia de un vector de features ya validado (sin volver a validarlo)"""
+        self._check_width(len(vector))
+        probabilities = [float(p) for p in self.predict_proba([vector])[0]]
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return self._result(vector, probabilities, best)
+
+    def predict_batch(self, batch):
+        """Inferencia vectorizada: una sola llamada a predict_proba por lote"""
+        return self.predict_matrix(self.feature_matrix(batch))
+
+    def predict_matrix(self, X):
+        """Inferencia de una matriz (o lista de vectores) de features ya validada"""
+        import numpy as np
+
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2:
+            raise ValidationError([(None, f'Expected a 2-D feature matrix, got {X.ndim} dimension(s)')])
+        self._check_width(X.shape[1])
+        probabilities = self.predict_proba(X)
+        best = probabilities.argmax(axis=1)
+        return [
+            self._result(row, p, i)
+            for row, p, i in zip(X.tolist(), probabilities.tolist(), best.tolist())
+        ]
+
+    def _check_width(self, n):
+        # Un vector o matriz con otro número de features desplazaría los valores
+        if n != len(self.feature_keys):
+            raise ValidationError([(None, f'Expected {len(self.feature_keys)} features per row, got {n}')])
+
+    def _result(self, vector, probabilities, best):
+        return {
+            'prediction': self.classes[best],
+            'confidence': probabilities[best],
+            'probabilities': dict(zip(self.classes, probabilities)),
+            'input_features': dict(zip(self.feature_keys, vector))
+        }
+
+
+class ModelRegistry:
+    """Modelos de models/ cargados bajo demanda con un máximo de residentes (LRU)"""
+
+    def __init__(self, models_dir=MODELS_DIR, max_resident=8, compile=True, input_range='off', fill_means=False):
+        self.models_dir = models_dir
+        self.max_resident = max(1, int(max_resident))
+        self.compile = compile
+        self.input_range = input_range
+        self.fill_means = fill_means
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._resident = OrderedDict()   # nombre -> PickledModel, el más antiguo primero
+        self._available = {}             # nombre -> metadatos
+        self._runners = {}               # nombre -> runner de predict_proba
+        self.loads = 0
+        self.evictions = 0
+        self.load_times = {}             # nombre -> ms de la última carga
+        self.discover()
+
+    def discover(self):
+        """Escanea models_dir en busca de _metadata.json con su .arrays/ o .pkl"""
+        available = {}
+        for metadata_path in sorted(glob.glob(os.path.join(self.models_dir, '*_metadata.json'))):
+            name = os.path.basename(metadata_path)[:-len('_metadata.json')]
+            if not (has_artifact(name, self.models_dir)
+                    or os.path.exists(os.path.join(self.models_dir, f'{name}.pkl'))):
+                continue
+            try:
+                with open(metadata_path, 'r') as f:
+                    available[name] = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠ Skipping model '{name}': invalid metadata ({e})")
+        with self._lock:
+            self._available = available
+            self._load_locks = {name: self._load_locks.get(name, threading.Lock()) for name in available}
+        return list(available)
+
+    def names(self):
+        return list(self._available)
+
+    def __contains__(self, name):
+        return name in self._available
+
+    def get(self, name):
+        """Devuelve el modelo, cargándolo si no está residente"""
+        with self._lock:
+            model = self._resident.get(name)
+            if model is not None:
+                self._resident.move_to_end(name)
+                return model
+            if name not in self._available:
+                raise KeyError(f"Unknown model '{name}'")
+            load_lock = self._load_locks[name]
+
+        # Un lock por modelo: peticiones concurrentes no cargan dos veces
+        with load_lock:
+            with self._lock:
+                model = self._resident.get(name)
+                if model is not None:
+                    self._resident.move_to_end(name)
+                    return model
+            load_start = time.perf_counter()
+            model = PickledModel.load(name, self.models_dir, self.compile, self.input_range, self.fill_means)
+            with self._lock:
+                model.runner = self._runners.get(name)
+                self._resident[name] = model
+                self.loads += 1
+                self.load_times[name] = (time.perf_counter() - load_start) * 1000
+                while len(self._resident) > self.max_resident:
+                    self._resident.popitem(last=False)
+                    self.evictions += 1
+            return model
+
+    def set_runner(self, name, runner):
+        """Ejecuta predict_proba del modelo con ``runner`` (None: en este proceso)"""
+        with self._lock:
+            self._runners[name] = runner
+            if name in self._resident:
+                self._resident[name].runner = runner
+
+    def describe(self):
+        """Modelos disponibles y estado de la caché de residentes"""
+        with self._lock:
+            return {
+                'max_resident': self.max_resident,
+                'loads': self.loads,
+                'evictions': self.evictions,
+                'models': [
+                    {
+                        'name': name,
+                        'model_name': metadata.get('model_name', name),
+                        'task': metadata.get('task'),
+                        'format': 'arrays' if has_artifact(name, self.models_dir) else 'pickle',
+                        'resident': name in self._resident,
+                        'engine': self._resident[name].source if name in self._resident else None,
+                        'process_pool': self._runners.get(name) is not None
+                    }
+                    for name, metadata in self._available.items()
+                ]
+            }
@@ -0,0 +1,436 @@
+"""
+Model Process Pools
+===================
+
+Pools de procesos dedicados por modelo.
+
+Un ProcessPool tiene ``processes`` procesos propios de un modelo (o de un
+grupo de modelos). El cómputo de un modelo pesado ya no retiene el GIL del
+servidor ni frena a los modelos ligeros, y las ejecuciones concurrentes del
+mismo modelo usan varios núcleos de verdad. Cada pool tiene su tamaño: la
+carga de un modelo nunca ocupa los procesos de otro.
+
+Transporte, por proceso:
+
+- Cada llamada viaja por un Pipe como pickle (protocolo 5). Los arrays NumPy
+  de la entrada van fuera de banda: se copian una vez a un segmento de
+  memoria compartida y el modelo los usa ahí mismo, sin deserializarlos
+- La salida vuelve igual, por un segmento que escribe el proceso; el
+  servidor copia los arrays una vez al recibirlos para que el segmento se
+  pueda reutilizar en la llamada siguiente
+- Los segmentos se reutilizan entre llamadas y crecen bajo demanda
+
+Los procesos heredan por fork las funciones y los modelos ya cargados, sin
+volver a importar el servidor. Un fork desde un proceso con varios hilos
+copiaría en el hijo los locks que otros hilos tuvieran cogidos (logging,
+stdout, registro de modelos...), así que el servidor solo hace un fork por
+pool: el de un proceso lanzador de un solo hilo, creado en start() antes de
+arrancar hilos (hook post_fork de gunicorn, arranque del servidor). Los
+procesos del pool, y los que sustituyen a uno caído, los crea el lanzador
+con su propio fork y le pasa al servidor el extremo de su pipe. ``targets``
+se llama justo antes de crear el lanzador y devuelve {operación: función}.
+
+Uso:
+    pool = ProcessPool('Chest X-Ray Classifier', lambda: {'predict': predict}, processes=2)
+    pool.start()
+    result = pool.call('predict', data)
+"""
+
+import multiprocessing
+import os
+import pickle
+import queue
+import signal
+import threading
+import time
+from multiprocessing import reduction, resource_tracker, shared_memory
+from multiprocessing.connection import Connection
+
+# Tamaño inicial de cada segmento de memoria compartida (bytes)
+MIN_SEGMENT_BYTES = 1 << 20
+# Alineación de cada array dentro del segmento
+ALIGNMENT = 64
+
+
+class PoolError(RuntimeError):
+    """Error de la función en el proceso del pool, o proceso caído"""
+
+
+def _aligned(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class _Segment:
+    """Segmento de memoria compartida propio, reutilizable, que crece bajo demanda"""
+
+    def __init__(self, size=0):
+        self.shm = None
+        if size:
+            self.ensure(size)
+
+    @property
+    def name(self):
+        return self.shm.name if self.shm is not None else None
+
+    @property
+    def size(self):
+        return self.shm.size if self.shm is not None else 0
+
+    def ensure(self, size):
+        if self.shm is not None and self.shm.size >= size:
+            return
+        capacity = MIN_SEGMENT_BYTES
+        while capacity < size:
+            capacity *= 2
+        new = shared_memory.SharedMemory(create=True, size=capacity)
+        self.unlink()
+        self.shm = new
+
+    def write(self, buffers):
+        """Copia los buffers al segmento; devuelve [(offset, bytes)]"""
+        buffers = [buffer.raw() for buffer in buffers]
+        if not buffers:
+            return []
+        self.ensure(sum(_aligned(buffer.nbytes) for buffer in buffers))
+        layout = []
+        offset = 0
+        for buffer in buffers:
+            self.shm.buf[offset:offset + buffer.nbytes] = buffer
+            layout.append((offset, buffer.nbytes))
+            offset += _aligned(buffer.nbytes)
+        return layout
+
+    def unlink(self):
+        if self.shm is not None:
+            _close(self.shm)
+            self.shm.unlink()
+            self.shm = None
+
+
+class _Attached:
+    """Segmento de otro proceso, abierto por nombre (se reabre si cambia)"""
+
+    def __init__(self):
+        self.shm = None
+
+    def views(self, name, layout):
+        if not layout:
+            return []
+        if self.shm is None or self.shm.name != name:
+            self.close()
+            self.shm = shared_memory.SharedMemory(name=name)
+        return [self.shm.buf[offset:offset + size] for offset, size in layout]
+
+    def close(self):
+        if self.shm is not None:
+            _close(self.shm)
+            self.shm = None
+
+
+def _close(shm):
+    try:
+        shm.close()
+    except BufferError:
+        pass  # Aún hay arrays sobre el segmento: se libera con ellos
+
+
+def _dumps(value, segment):
+    """(pickle, disposición de los buffers fuera de banda en ``segment``)"""
+    buffers = []
+    data = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    return data, segment.write(buffers)
+
+
+# ============================================================================
+# PROCESO DEL POOL
+# ============================================================================
+
+def _serve(conn, targets):
+    """Bucle de un proceso del pool: (operación, entrada) -> (estado, salida)"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C lo gestiona el servidor
+    inputs = _Attached()
+    outputs = _Segment()
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+            conn.send(_handle(targets, message, inputs, outputs))
+    finally:
+        inputs.close()
+        outputs.unlink()
+
+
+def _handle(targets, message, inputs, outputs):
+    op, data, name, layout = message
+    try:
+        # Los arrays de la entrada son vistas del segmento: sin copia
+        arg = pickle.loads(data, buffers=inputs.views(name, layout))
+        data, layout = _dumps(targets[op](arg), outputs)
+        return 'ok', data, outputs.name, layout
+    except Exception as e:
+        return 'error', f'{type(e).__name__}: {e}', None, None
+
+
+def _spawner(control, targets):
+    """Proceso lanzador: por cada petición, fork de un proceso del pool
+
+    Devuelve por ``control`` el pid del proceso y el descriptor de su pipe.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # Los procesos terminados no quedan zombis
+    while True:
+        try:
+            message = control.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        conn, child_conn = multiprocessing.Pipe()
+        pid = os.fork()
+        if pid == 0:
+            control.close()
+            conn.close()
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            try:
+                _serve(child_conn, targets)
+            finally:
+                os._exit(0)
+        child_conn.close()
+        control.send(pid)
+        reduction.send_handle(control, conn.fileno(), os.getppid())
+        conn.close()
+
+
+# ============================================================================
+# POOL
+# ============================================================================
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+
+
+class _Worker:
+    """Un proceso del pool con su pipe y sus segmentos"""
+
+    def __init__(self, pid, conn):
+        self.pid = pid
+        self.conn = conn
+        self.inputs = _Segment(MIN_SEGMENT_BYTES)
+        self.outputs = _Attached()
+        # True desde que se empieza a enviar una petición hasta leer su
+        # respuesta: si algo falla entre medias, el pipe queda desincronizado
+        self.pending = False
+
+    def call(self, op, arg):
+        data, layout = _dumps(arg, self.inputs)
+        self.pending = True
+        self.conn.send((op, data, self.inputs.name, layout))
+        status, data, name, layout = self.conn.recv()
+        self.pending = False
+        if status != 'ok':
+            raise PoolError(data)
+        # Copia única de los arrays de la salida: el segmento se reutiliza
+        views = self.outputs.views(name, layout)
+        try:
+            return pickle.loads(data, buffers=[bytearray(view) for view in views])
+        finally:
+            for view in views:
+                view.release()
+
+    def stop(self, timeout=1.0):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        deadline = time.monotonic() + timeout
+        while _alive(self.pid) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        if _alive(self.pid):
+            os.kill(self.pid, signal.SIGTERM)
+        self.conn.close()
+        self.outputs.close()
+        self.inputs.unlink()
+
+
+class _DeadWorker:
+    """Hueco de un proceso que no se pudo sustituir (lanzador caído)
+
+    Vuelve a la cola de libres como cualquier proceso, para que el pool no
+    pierda el hueco, y hace fallar de inmediato las llamadas que lo reciben.
+    """
+
+    pid = None
+    pending = False
+
+    def __init__(self, error):
+        self.error = error
+
+    def call(self, op, arg):
+        raise PoolError(self.error)
+
+    def stop(self, timeout=1.0):
+        pass
+
+
+class ProcessPool:
+    """``processes`` procesos que ejecutan las funciones de ``targets()``
+
+    start() crea el lanzador y los procesos; hay que llamarlo antes de
+    arrancar hilos en el proceso (si no, lo hace el primer call()). call()
+    espera (como mucho ``wait_timeout`` segundos) a un proceso libre, le envía
+    la entrada y devuelve la salida (o lanza PoolError). Un proceso que muere
+    se sustituye; si no se puede (lanzador caído), su hueco queda marcado y
+    las llamadas que lo reciben fallan sin esperar.
+    """
+
+    def __init__(self, name, targets, processes=1, wait_timeout=30.0):
+        self.name = name
+        self.targets = targets
+        self.processes = max(1, int(processes))
+        self.wait_timeout = wait_timeout
+        self._context = multiprocessing.get_context('fork')
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        self._workers = []
+        self._ops = None
+        self._spawner = None
+        self._control = None
+        self._pid = None
+
+        # Estadísticas
+        self.calls = 0
+        self.errors = 0
+        self.restarts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.busy_total = 0.0
+
+    def call(self, op, arg):
+        """Ejecuta ``targets()[op](arg)`` en un proceso del pool"""
+        self._ensure_started()
+        queued = time.perf_counter()
+        try:
+            worker = self._idle.get(timeout=self.wait_timeout)
+        except queue.Empty:
+            self._record(time.perf_counter() - queued, 0.0, True)
+            raise PoolError(f"No process of pool '{self.name}' free after {self.wait_timeout}s") from None
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = worker.call(op, arg)
+            failed = False
+            return result
+        except (EOFError, OSError) as e:
+            # Proceso caído (p. ej. sin memoria): se sustituye en finally
+            raise PoolError(f"Process of pool '{self.name}' exited: {str(e) or type(e).__name__}") from None
+        finally:
+            if worker.pending:
+                # Caído, o interrumpido entre el envío y la respuesta (cualquier
+                # otra excepción): su respuesta sin leer le llegaría al siguiente
+                worker = self._replace(worker)
+            self._idle.put(worker)
+            self._record(started - queued, time.perf_counter() - started, failed)
+
+    def start(self):
+        """Crea el lanzador y los procesos en este proceso (idempotente)"""
+        self._ensure_started()
+
+    def _ensure_started(self):
+        # Una vez por proceso, y de nuevo tras un fork (los procesos
+        # heredados pertenecen al proceso padre)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._ops = self.targets()
+            # Antes del fork: el lanzador y los procesos comparten con el
+            # servidor el resource tracker que limpia los segmentos si algo falla
+            resource_tracker.ensure_running()
+            self._control, child_control = self._context.Pipe()
+            self._spawner = self._context.Process(target=_spawner, args=(child_control, self._ops),
+                                                  name=f'pool-{self.name}', daemon=True)
+            self._spawner.start()
+            child_control.close()
+            self._idle = queue.Queue()
+            self._workers = [self._start() for _ in range(self.processes)]
+            for worker in self._workers:
+                self._idle.put(worker)
+            self._pid = os.getpid()
+
+    def _start(self):
+        # Con self._lock: una petición al lanzador cada vez
+        try:
+            self._control.send(True)
+            pid = self._control.recv()
+            fd = reduction.recv_handle(self._control)
+        except (EOFError, OSError) as e:
+            raise PoolError(f"Spawner of pool '{self.name}' exited: {str(e) or type(e).__name__}") from None
+        return _Worker(pid, Connection(fd))
+
+    def _replace(self, worker):
+        with self._lock:
+            index = self._workers.index(worker)
+            try:
+                worker.stop(timeout=0)
+            except OSError:
+                pass
+            try:
+                self._workers[index] = self._start()
+                self.restarts += 1
+            except PoolError as e:
+                # Nunca lanza: el hueco vuelve siempre a la cola de libres
+                self._workers[index] = _DeadWorker(str(e))
+            return self._workers[index]
+
+    def _record(self, waited, busy, failed):
+        with self._lock:
+            self.calls += 1
+            self.errors += failed
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self.busy_total += busy
+
+    def close(self):
+        """Detiene los procesos y libera los segmentos (solo en el proceso que los creó)"""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            for worker in self._workers:
+                worker.stop()
+            self._workers = []
+            try:
+                self._control.send(None)
+            except OSError:
+                pass
+            self._spawner.join(1.0)
+            if self._spawner.is_alive():
+                self._spawner.terminate()
+            self._control.close()
+            self._pid = None
+
+    def stats(self):
+        with self._lock:
+            calls = self.calls
+            return {
+                'processes': self.processes,
+                'spawner_pid': self._spawner.pid if self._spawner is not None else None,
+                'pids': [worker.pid for worker in self._workers],
+                'idle': self._idle.qsize(),
+                'calls': calls,
+                'errors': self.errors,
+                'restarts': self.restarts,
+                'avg_wait_ms': round(self.wait_total / calls * 1000, 3) if calls else 0.0,
+                'max_wait_ms': round(self.wait_max * 1000, 3),
+                'avg_call_ms': round(self.busy_total / calls * 1000, 3) if calls else 0.0,
+                'dead': sum(worker.pid is None for worker in self._workers),
+                'segment_bytes': sum(worker.inputs.size for worker in self._workers if worker.pid is not None)
+            }
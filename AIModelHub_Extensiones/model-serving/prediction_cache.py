@@ -0,0 +1,82 @@
+"""
+Prediction Cache
+================
+
+Caché de respuestas por modelo, indexada por un hash canónico del JSON de
+entrada. Entradas limitadas en número (LRU) y en tiempo de vida (TTL).
+
+Solo tiene sentido para modelos deterministas: cada modelo se activa de
+forma explícita (ver MODEL_SERVER_CACHE_MODELS en mock_server.py).
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+MISS = object()
+
+
+def canonical_key(data):
+    """Hash estable del JSON de entrada (independiente del orden de claves)"""
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).digest()
+
+
+class PredictionCache:
+    """Caché LRU con TTL, segura para varios hilos"""
+
+    def __init__(self, max_entries=10000, ttl=300.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl)
+        self._entries = OrderedDict()    # key -> (expira_en, valor)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Valor en caché o MISS"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISS
+            expires_at, value = entry
+            if self.ttl > 0 and expires_at < now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
@@ -40,4 +40,13 @@ echo -e "${YELLOW}[3/3]${NC} Starting server..."
 echo ""
 
 # Start the server
-python3 mock_server.py
+#   ./start-mock-server.sh               -> Flask development server
+#   ./start-mock-server.sh --production  -> gunicorn, multi-process (see gunicorn.conf.py)
+#   ./start-mock-server.sh --async       -> asyncio/ASGI server (see async_server.py)
+if [ "$1" == "--production" ] || [ "$MODEL_SERVER_MODE" == "production" ]; then
+    exec gunicorn -c gunicorn.conf.py mock_server:app
+elif [ "$1" == "--async" ] || [ "$MODEL_SERVER_MODE" == "async" ]; then
+    exec python3 async_server.py
+else
+    python3 mock_server.py
+fi
@@ -0,0 +1,228 @@
+"""
+Request Tracing
+===============
+
+Traza de cada petición a un modelo:
+
+- Trace id propagado desde la petición entrante (``traceparent`` W3C,
+  ``X-Request-Id`` o ``X-Trace-Id``; el backend EDC envía el id de la
+  ejecución) o generado si no viene. Se devuelve en ``X-Trace-Id`` y queda
+  en el execution log, así que una ejecución de la UI se puede seguir de
+  punta a punta
+- Tiempo de cada etapa (parse, validate, queue, inference, serialize, log)
+  con ``time.perf_counter_ns``: monótono y de alta resolución. Se devuelve
+  en la cabecera estándar ``Server-Timing`` y se agrega en /metrics
+- Perfilador por muestreo opcional: mientras dura una petición se muestrea
+  la pila de su hilo y, si supera el umbral, las muestras se vuelcan en
+  formato "folded" (flamegraph.pl, speedscope) para ver dónde se fue el tiempo
+
+La traza en curso vive en una ContextVar: vale igual para los hilos de Flask
+que para las tareas de Quart, y el código que no atiende una petición
+(trabajos en segundo plano, micro-batcher) simplemente no mide nada.
+"""
+
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+STAGES = ('parse', 'validate', 'queue', 'inference', 'serialize', 'log')
+
+_TRACEPARENT = re.compile(r'^[0-9a-f]{2}-([0-9a-f]{32})-[0-9a-f]{16}-[0-9a-f]{2}$')
+_REQUEST_ID = re.compile(r'^[\w.:-]{1,128}$')
+
+_current = contextvars.ContextVar('request_trace', default=None)
+
+
+def incoming_trace_id(headers):
+    """Trace id de las cabeceras de la petición, o uno nuevo"""
+    match = _TRACEPARENT.match(headers.get('traceparent', '').strip().lower())
+    if match and match.group(1) != '0' * 32:
+        return match.group(1)
+    for name in ('X-Request-Id', 'X-Trace-Id'):
+        value = headers.get(name, '').strip()
+        if _REQUEST_ID.match(value):
+            return value
+    return uuid.uuid4().hex
+
+
+class RequestTrace:
+    """Trace id y nanosegundos acumulados por etapa de una petición"""
+
+    __slots__ = ('trace_id', 'start_ns', 'stages', '_token', '_samples')
+
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.start_ns = time.perf_counter_ns()
+        self.stages = {}
+        self._token = None
+        self._samples = None
+
+    def add(self, stage, ns):
+        self.stages[stage] = self.stages.get(stage, 0) + ns
+
+    def elapsed(self):
+        """Segundos desde el inicio de la petición"""
+        return (time.perf_counter_ns() - self.start_ns) / 1e9
+
+    def seconds(self):
+        """{etapa: segundos}"""
+        return {stage: ns / 1e9 for stage, ns in self.stages.items()}
+
+    def server_timing(self):
+        """Valor de la cabecera Server-Timing (milisegundos)"""
+        parts = [f'{stage};dur={ns / 1e6:.3f}' for stage, ns in self.stages.items()]
+        parts.append(f'total;dur={self.elapsed() * 1000:.3f}')
+        return ', '.join(parts)
+
+
+def begin(headers):
+    """Abre la traza de la petición actual"""
+    trace = RequestTrace(incoming_trace_id(headers))
+    trace._token = _current.set(trace)
+    return trace
+
+
+def end(trace):
+    if trace._token is not None:
+        _current.reset(trace._token)
+        trace._token = None
+
+
+def current():
+    """Traza de la petición en curso, o None"""
+    return _current.get()
+
+
+class _Stage:
+    __slots__ = ('name', 'trace', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.trace = _current.get()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        if self.trace is not None:
+            self.trace.add(self.name, time.perf_counter_ns() - self.start)
+        return False
+
+
+def stage(name):
+    """``with stage('inference'):`` suma el tiempo del bloque a la etapa (sin traza, no hace nada)"""
+    return _Stage(name)
+
+
+# ============================================================================
+# PERFILADOR POR MUESTREO
+# ============================================================================
+
+def _fold(frame, max_depth=256):
+    """Pila de un frame como 'fichero:función;...' desde la raíz"""
+    names = []
+    while frame is not None and len(names) < max_depth:
+        code = frame.f_code
+        names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """Muestrea la pila de los hilos que atienden una petición
+
+    Un único hilo toma una muestra cada ``interval`` segundos de los hilos
+    registrados con begin(). Al terminar, si la petición ha durado al menos
+    ``threshold`` segundos, sus muestras se escriben en
+    ``out_dir/<fecha>-<trace id>.folded`` (una línea "pila recuento" por pila
+    distinta); se conservan los ``max_files`` volcados más recientes.
+    Solo para servidores con un hilo por petición.
+    """
+
+    def __init__(self, threshold, out_dir, interval=0.005, max_files=100):
+        self.threshold = float(threshold)
+        self.out_dir = out_dir
+        self.interval = float(interval)
+        self.max_files = int(max_files)
+        self._active = {}       # id de hilo -> {pila: muestras}
+        self._lock = threading.Lock()
+        self._pid = None
+        self.samples = 0
+        self.dumps = 0
+        self.last_dump = None
+
+    def begin(self, trace):
+        self._ensure_started()
+        trace._samples = {}
+        with self._lock:
+            self._active[threading.get_ident()] = trace._samples
+
+    def end(self, trace):
+        """Deja de muestrear; devuelve la ruta del volcado o None"""
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+        samples, trace._samples = trace._samples, None
+        if not samples or trace.elapsed() < self.threshold:
+            return None
+        return self._dump(trace, samples)
+
+    def _ensure_started(self):
+        # Hilo creado en el primer uso, y de nuevo tras un fork
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._active = {}
+            threading.Thread(target=self._run, name='sampling-profiler', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stack = _fold(frame)
+                        samples[stack] = samples.get(stack, 0) + 1
+                        self.samples += 1
+
+    def _dump(self, trace, samples):
+        os.makedirs(self.out_dir, exist_ok=True)
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{trace.trace_id}.folded"
+        path = os.path.join(self.out_dir, name)
+        with open(path, 'w') as f:
+            for stack, count in sorted(samples.items()):
+                f.write(f'{stack} {count}\n')
+        self.dumps += 1
+        self.last_dump = path
+        self._prune()
+        return path
+
+    def _prune(self):
+        dumps = sorted(f for f in os.listdir(self.out_dir) if f.endswith('.folded'))
+        for old in dumps[:max(0, len(dumps) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.out_dir, old))
+            except OSError:
+                pass
+
+    def stats(self):
+        return {
+            'threshold_ms': round(self.threshold * 1000, 3),
+            'interval_ms': round(self.interval * 1000, 3),
+            'out_dir': self.out_dir,
+            'samples': self.samples,
+            'dumps': self.dumps,
+            'last_dump': self.last_dump
+        }
@@ -0,0 +1,117 @@
+"""
+Streaming Uploads
+=================
+
+Entrada binaria para los modelos de imagen y audio, sin base64 ni JSON.
+
+El cuerpo binario se lee por trozos y cada trozo se procesa al llegar
+(tamaño, hash, cabecera del formato) sin guardarlo: el modelo solo recibe
+ese resumen. El límite de tamaño se comprueba antes de leer (Content-Length)
+y mientras se lee (cuerpos chunked), así que la memoria por petición está
+acotada sea cual sea el tamaño del fichero.
+
+Un multipart no va por trozos: el framework lo parsea entero antes de que
+se pueda leer el campo ``file`` (werkzeug lo guarda en un fichero temporal,
+Quart lo recibe en memoria), siempre dentro de UPLOAD_MAX_BYTES. Para
+ficheros grandes es mejor enviar el cuerpo binario.
+"""
+
+import hashlib
+import os
+import struct
+
+UPLOAD_MAX_BYTES = int(os.environ.get('MODEL_SERVER_UPLOAD_MAX_BYTES', 50 * 1024 * 1024))
+# Campos de texto de un multipart (parámetros del modelo): no hay más que unos pocos
+UPLOAD_FORM_MEMORY_BYTES = 64 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# Bytes iniciales que se conservan para identificar el formato
+HEAD_BYTES = 4096
+
+UPLOAD_MIMETYPES = ('application/octet-stream', 'multipart/form-data', 'application/dicom')
+
+
+class UploadTooLarge(ValueError):
+    """El cuerpo supera UPLOAD_MAX_BYTES, o el límite del resto de peticiones (HTTP 413)"""
+
+
+def is_upload(mimetype):
+    """True si el Content-Type corresponde a una subida binaria"""
+    return mimetype in UPLOAD_MIMETYPES or mimetype.startswith(('image/', 'audio/'))
+
+
+class StreamingUpload:
+    """Resume una subida trozo a trozo (tamaño, hash y cabecera) con memoria acotada"""
+
+    def __init__(self, content_length=None, max_bytes=UPLOAD_MAX_BYTES):
+        self.max_bytes = max_bytes
+        if content_length is not None and content_length > max_bytes:
+            raise UploadTooLarge(f'Upload of {content_length} bytes exceeds the limit of {max_bytes} bytes')
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.head = b''
+
+    def feed(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f'Upload exceeds the limit of {self.max_bytes} bytes')
+        if len(self.head) < HEAD_BYTES:
+            self.head += chunk[:HEAD_BYTES - len(self.head)]
+        self.digest.update(chunk)
+
+    def read_from(self, stream, chunk_size=CHUNK_SIZE):
+        """Consume un stream de fichero (request.stream, FileStorage.stream...)"""
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                return self
+            self.feed(chunk)
+
+    def describe(self, kind):
+        """Resumen de la subida: tamaño, hash y datos de la cabecera"""
+        if self.size == 0:
+            raise ValueError('Empty upload')
+        summary = {'bytes': self.size, 'sha256': self.digest.hexdigest()}
+        summary.update(image_header(self.head) if kind == 'image' else audio_header(self.head, self.size))
+        return summary
+
+
+def image_header(head):
+    """Formato (y dimensiones si la cabecera las incluye) de una imagen"""
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and len(head) >= 24:
+        width, height = struct.unpack('>II', head[16:24])
+        return {'format': 'png', 'width': width, 'height': height}
+    if head.startswith(b'\xff\xd8\xff'):
+        return {'format': 'jpeg'}
+    if head[128:132] == b'DICM':
+        return {'format': 'dicom'}
+    return {'format': 'unknown'}
+
+
+def audio_header(head, size):
+    """Formato y duración (WAV PCM) de un audio"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        info = {'format': 'wav'}
+        offset = 12
+        data_size = None
+        while offset + 8 <= len(head):
+            chunk_id = head[offset:offset + 4]
+            chunk_size = struct.unpack('<I', head[offset + 4:offset + 8])[0]
+            if chunk_id == b'fmt ' and offset + 24 <= len(head):
+                channels, sample_rate, byte_rate = struct.unpack('<HII', head[offset + 10:offset + 20])
+                info.update({'channels': channels, 'sample_rate': sample_rate, 'byte_rate': byte_rate})
+            elif chunk_id == b'data':
+                # Con la cabecera dinámica de un stream, el tamaño puede faltar
+                data_size = min(chunk_size, size - offset - 8)
+                break
+            offset += 8 + chunk_size + (chunk_size & 1)
+        if info.get('byte_rate') and data_size is not None:
+            info['duration_seconds'] = round(data_size / info['byte_rate'], 3)
+        return info
+    if head.startswith(b'fLaC'):
+        return {'format': 'flac'}
+    if head.startswith(b'OggS'):
+        return {'format': 'ogg'}
+    if head.startswith(b'ID3') or head[:2] in (b'\xff\xfb', b'\xff\xf3', b'\xff\xf2'):
+        return {'format': 'mp3'}
+    return {'format': 'unknown'}
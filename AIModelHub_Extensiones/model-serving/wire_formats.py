@@ -0,0 +1,175 @@
+"""
+Wire Formats
+============
+
+Formatos de petición y respuesta de los endpoints de predicción, negociados
+con Content-Type y Accept:
+
+- JSON (por defecto), codificado con orjson si está instalado
+- MessagePack (application/msgpack): el mismo modelo de datos que JSON, en
+  binario y sin coste de parseo de texto
+- Apache Arrow IPC stream (application/vnd.apache.arrow.stream): tablas
+  columnares, solo en los endpoints /batch. Cada columna llega al modelo
+  como un array NumPy, sin construir un dict por fila
+
+orjson, msgpack y pyarrow son opcionales: sin ellos se usa el módulo json y
+los formatos binarios responden 415.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depende del entorno
+    msgpack = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+ARROW = 'application/vnd.apache.arrow.stream'
+
+MSGPACK_TYPES = (MSGPACK, 'application/x-msgpack')
+BINARY_TYPES = MSGPACK_TYPES + (ARROW,)
+
+
+class UnsupportedFormat(ValueError):
+    """Formato no disponible para este endpoint o sin su dependencia (HTTP 415)"""
+
+
+def _pyarrow():
+    # Import diferido: pyarrow tarda en importarse y solo lo usan los clientes Arrow
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def available_formats(batch=False):
+    """Tipos MIME que el servidor puede producir"""
+    formats = [JSON]
+    if msgpack is not None:
+        formats.append(MSGPACK)
+    if batch and _pyarrow() is not None:
+        formats.append(ARROW)
+    return formats
+
+
+def is_binary(mimetype):
+    return mimetype in BINARY_TYPES
+
+
+def response_format(accept_mimetypes, batch=False):
+    """Mejor formato de respuesta para la cabecera Accept (JSON por defecto)"""
+    formats = available_formats(batch)
+    if 'application/x-msgpack' in accept_mimetypes.values() and MSGPACK in formats:
+        return MSGPACK
+    return accept_mimetypes.best_match(formats, default=JSON) or JSON
+
+
+def input_error(mimetype, batch=False):
+    """Motivo por el que no se acepta un cuerpo binario, o None"""
+    if mimetype in MSGPACK_TYPES and msgpack is None:
+        return 'MessagePack support requires the msgpack package'
+    if mimetype == ARROW:
+        if not batch:
+            return 'Arrow tables are only accepted by /batch endpoints'
+        if _pyarrow() is None:
+            return 'Arrow support requires the pyarrow package'
+    return None
+
+
+# ----------------------------------------------------------------------
+# Decodificación
+# ----------------------------------------------------------------------
+
+def decode(mimetype, body, batch=False):
+    """Cuerpo binario (MessagePack o Arrow) como objeto Python"""
+    error = input_error(mimetype, batch)
+    if error is not None:
+        raise UnsupportedFormat(error)
+
+    if mimetype in MSGPACK_TYPES:
+        return msgpack.unpackb(body, raw=False)
+
+    if mimetype == ARROW:
+        pa = _pyarrow()
+        table = pa.ipc.open_stream(body).read_all()
+        return {'columns': {
+            name: column.to_numpy(zero_copy_only=False)
+            for name, column in zip(table.column_names, table.columns)
+        }}
+
+    raise UnsupportedFormat(f'Unsupported Content-Type {mimetype}')
+
+
+# ----------------------------------------------------------------------
+# Codificación
+# ----------------------------------------------------------------------
+
+def _plain(value):
+    """Tipos NumPy -> tipos Python (para MessagePack)"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f'Cannot serialize {type(value).__name__}')
+
+
+def encode(obj, mimetype):
+    """Respuesta en MessagePack o Arrow (bytes)"""
+    if mimetype == MSGPACK:
+        return msgpack.packb(obj, default=_plain)
+
+    if mimetype == ARROW:
+        # Tabla con una fila por resultado; el resto de campos, en los metadatos
+        pa = _pyarrow()
+        results = obj.get('results', [])
+        metadata = {key: json_dumps(value) for key, value in obj.items() if key != 'results'}
+        table = pa.Table.from_pylist(results).replace_schema_metadata(metadata)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    raise UnsupportedFormat(f'Cannot encode {mimetype}')
+
+
+def json_dumps(obj):
+    """JSON compacto (bytes), con orjson si está disponible"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS, default=_plain)
+    return json.dumps(obj, separators=(',', ':'), default=_plain).encode('utf-8')
+
+
+def fast_json_provider(base):
+    """Proveedor JSON de Flask / Quart (subclase de ``base``) basado en orjson
+
+    Mantiene el comportamiento del proveedor por defecto (claves ordenadas,
+    indentado en modo debug, tipos extra vía ``default``).
+    """
+    if orjson is None:
+        return base
+
+    class FastJSONProvider(base):
+        def dumps(self, obj, **kwargs):
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            if kwargs.get('sort_keys', self.sort_keys):
+                option |= orjson.OPT_SORT_KEYS
+            if kwargs.get('indent'):
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode('utf-8')
+            except TypeError:
+                # Casos que orjson no admite (p. ej. enteros de más de 64 bits)
+                return super().dumps(obj, **kwargs)
+
+        def loads(self, s, **kwargs):
+            if kwargs:
+                return super().loads(s, **kwargs)
+            return orjson.loads(s)
+
+    return FastJSONProvider
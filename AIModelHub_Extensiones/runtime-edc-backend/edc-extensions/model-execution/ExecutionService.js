@@ -18,6 +18,10 @@ class ExecutionService {
   constructor(pool) {
     this.pool = pool;
     this.defaultTimeout = 30000; // 30 seconds
+    // Part of the timeout kept for inference and network after the model
+    // server's admission queue (share of the timeout, at least minInferenceMargin ms)
+    this.inferenceMarginRatio = 0.2;
+    this.minInferenceMargin = 500;
     this.maxRetries = 0; // No retries by default to keep it simple
   }
 
@@ -147,6 +151,11 @@ class ExecutionService {
       const headers = {
         'Content-Type': 'application/json',
         'User-Agent': 'AIModelHub-Orchestrator/1.0',
+        // Deadline for the model server's admission queue (ms): less than the
+        // client timeout, so an admitted request still has time to run
+        'X-Execution-Timeout': String(this.queueDeadline(timeout, options.inferenceMargin)),
+        // Correlates this execution with the model server's log (X-Trace-Id, Server-Timing)
+        'X-Request-Id': executionId,
         ...(options.headers || {})
       };
 
@@ -168,6 +177,9 @@ class ExecutionService {
 
       console.log(`[Execution Service] Response status: ${response.status}`);
       console.log(`[Execution Service] Execution time: ${executionTime}ms`);
+      if (response.headers['server-timing']) {
+        console.log(`[Execution Service] Server timing (${response.headers['x-trace-id'] || executionId}): ${response.headers['server-timing']}`);
+      }
 
       // Step 7: Handle response based on status code
       if (response.status >= 200 && response.status < 300) {
@@ -318,6 +330,20 @@ class ExecutionService {
     return result.rows;
   }
 
+  /**
+   * Admission queue deadline sent to the model server
+   * @param {number} timeout - Client timeout for the whole request (ms)
+   * @param {number} [inferenceMargin] - Time reserved for inference and network (ms)
+   * @returns {number} Queue deadline (ms), at least 1
+   * @private
+   */
+  queueDeadline(timeout, inferenceMargin) {
+    const margin = inferenceMargin !== undefined
+      ? inferenceMargin
+      : Math.max(this.minInferenceMargin, timeout * this.inferenceMarginRatio);
+    return Math.max(1, Math.floor(timeout - margin));
+  }
+
   /**
    * Extract error message from HTTP response
    * @private